@@ -0,0 +1,57 @@
+#####################################################
+#                                                   #
+#                 관리자 라우터 정의                   #
+#                                                   #
+#####################################################
+
+from fastapi import APIRouter, Body, Depends, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+from config.dependencies import require_admin
+from config.metrics import WORKSPACE_TIERS
+from config.profiler import PROFILER_MAX_SECONDS, ProfilerBusy, profiler
+from tools.notion.store import async_store
+from typing import Optional
+
+# 모든 엔드포인트는 X-Admin-Token 헤더가 ADMIN_TOKEN 과 같아야 함
+router = APIRouter(prefix="/admin", tags=["admin"], dependencies=[Depends(require_admin)])
+
+
+# 다음 requests 개 요청이 끝나거나 seconds 가 지날 때까지 샘플링 프로파일러를 켜고 결과를 반환
+#   format=folded: flamegraph.pl / speedscope 에 바로 넣을 수 있는 folded stack 텍스트
+#   format=json: 요약(샘플 수, 함수별 self/total)과 folded 줄 목록
+@router.post("/profile")
+async def profile(
+    seconds: Optional[float] = Query(None, gt=0, le=PROFILER_MAX_SECONDS),
+    requests: Optional[int] = Query(None, ge=1),
+    all_threads: bool = Query(False),
+    format: str = Query("folded", pattern="^(folded|json)$"),
+):
+    if seconds is None and requests is None:
+        raise HTTPException(status_code=400, detail="seconds 또는 requests 중 하나는 필요합니다")
+    try:
+        report = await profiler.profile(seconds=seconds, requests=requests, all_threads=all_threads)
+    except ProfilerBusy:
+        raise HTTPException(status_code=409, detail="이미 프로파일링 중입니다")
+
+    if format == "json":
+        return report
+    return PlainTextResponse(
+        "\n".join(report["folded"]) + "\n",
+        headers={
+            "X-Profile-Samples": str(report["samples"]),
+            "X-Profile-Requests": str(report["requests"]),
+            "X-Profile-Seconds": str(report["seconds"]),
+        },
+    )
+
+
+# 워크스페이스 등급 설정. 핫패스 메트릭의 tier 라벨로 쓰이며 NOTION_WORKSPACE_TIERS 중 하나여야 함
+@router.put("/workspaces/{workspace_id}/tier")
+async def set_workspace_tier(workspace_id: str, tier: str = Body(..., embed=True)):
+    if tier not in WORKSPACE_TIERS:
+        raise HTTPException(status_code=400, detail=f"tier 는 {', '.join(WORKSPACE_TIERS)} 중 하나여야 합니다")
+    try:
+        await async_store.set_workspace_tier(workspace_id=workspace_id, tier=tier)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="workspace not found")
+    return {"workspace_id": workspace_id, "tier": tier}
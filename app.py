@@ -4,16 +4,45 @@
 #                                                   #
 #####################################################
 
+import time
+
+_import_started = time.perf_counter()
+
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse
 from prometheus_fastapi_instrumentator import Instrumentator
 from logs.logging_util import LoggerSingleton
 from contextlib import asynccontextmanager
-from config.clients import initialize_clients
+from config.clients import ClientContainer, initialize_clients
+from config.metrics import init_tier_metrics
+from config.profiler import ProfilerMiddleware
+from config.tracing import TRACING_ENABLED, TracingMiddleware, langsmith_sink, trace_exporter
+from admin.router import router as admin_router
 from test.router import router as test_router
 from tools.notion.OAuth import router as notion_oauth_router
-from tools.notion.webhook import router as notion_webhook_router
+from tools.notion.api_client import notion_api
+from tools.notion.webhook import router as notion_webhook_router, event_workers as notion_event_workers
+from tools.notion.page_cache import page_cache as notion_page_cache
+from tools.notion.embeddings import router as notion_search_router, embedding_pipeline as notion_embedding_pipeline
+from config.startup import STARTUP_PREWARM, startup_timer
+from typing import List
+import asyncio
 import logging
 
+startup_timer.record("import", time.perf_counter() - _import_started)
+
+
+async def _prewarm(names: List[str]) -> None:
+    # 실패해도 클라이언트는 처음 사용할 때 다시 만들어지므로 준비 상태는 막지 않음
+    try:
+        with startup_timer.phase("prewarm"):
+            await client_container.warm(names)
+    except Exception as e:
+        logger.exception("클라이언트 미리 데우기 실패: %s", e)
+    finally:
+        startup_timer.ready = True
+        logger.info("%s clients=%s", startup_timer.summary(), client_container.initialized())
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     logger.info(
@@ -37,12 +66,51 @@ async def lifespan(app: FastAPI):
     # )
 
     # 앱 상테에 클라이언트 컨테이너를 저장할 객체 초기화
+    # 클라이언트는 처음 사용할 때 생성됨 (config/clients.py)
     global client_container
-    client_container = initialize_clients()
+    with startup_timer.phase("clients"):
+        client_container = initialize_clients()
     app.state.client_container = client_container
+    # Notion API 클라이언트(속도 제한/재시도)는 공유 httpx 클라이언트 위에 처음 쓸 때 만들어짐
+    notion_api.bind(lambda: client_container.notion_http_client)
+    # 페이지 캐시는 Notion API 클라이언트를 처음 갱신할 때 가져감
+    notion_page_cache.bind(notion_api.get)
+    # 임베딩 파이프라인은 채팅과 같은 OpenAI 클라이언트/동시성 제한기를 사용
+    notion_embedding_pipeline.bind(lambda: client_container.openai_client, lambda: client_container.openai_limiter)
+
+    # 트레이스는 버퍼에 모아 백그라운드에서 LangSmith 로 배치 전송 (LANGSMITH_TRACING=true 일 때)
+    if TRACING_ENABLED:
+        trace_exporter.bind(langsmith_sink(lambda: client_container.langsmith_client))
+        await trace_exporter.start()
+
+    # 등급별 핫패스 메트릭 시계열 생성
+    with startup_timer.phase("metrics"):
+        init_tier_metrics()
+
+    # Notion 웹훅 이벤트 워커 시작
+    with startup_timer.phase("event_workers"):
+        await notion_event_workers.start()
+
+    # STARTUP_PREWARM 에 적은 클라이언트는 트래픽 전에 미리 생성 (끝날 때까지 /ready 는 503)
+    prewarm = ClientContainer.CLIENTS if STARTUP_PREWARM == ["all"] else STARTUP_PREWARM
+    prewarm_task = None
+    if prewarm:
+        prewarm_task = asyncio.create_task(_prewarm(list(prewarm)))
+    else:
+        startup_timer.ready = True
+        logger.info(startup_timer.summary())
 
     yield
+    if prewarm_task is not None and not prewarm_task.done():
+        prewarm_task.cancel()
     # 종료시 클린업 작업은 여기서
+    await notion_event_workers.stop()
+    await notion_page_cache.aclose()
+    await notion_embedding_pipeline.aclose()
+    # 이벤트 처리/임베딩까지 끝난 뒤 남은 스팬 전송
+    await trace_exporter.stop()
+    # 공유 HTTP 커넥션 풀 정리
+    await client_container.aclose()
     # Todo: 데이터베이스 연결 해제 로직 추가 필요
     # Todo: 기타 리소스 정리 로직 추가 필요
     logger.info(
@@ -63,13 +131,29 @@ app = FastAPI(lifespan=lifespan)
 # Prometheus FastAPI 미들웨어 설정
 Instrumentator().instrument(app).expose(app)
 
+# 요청 트레이스 / 관리자 프로파일러 요청 수 집계 (꺼져 있으면 그대로 통과)
+app.add_middleware(TracingMiddleware)
+app.add_middleware(ProfilerMiddleware)
+
 # 라우터 등록
-routers = [test_router, notion_oauth_router, notion_webhook_router]
+routers = [test_router, notion_oauth_router, notion_webhook_router, notion_search_router, admin_router]
 
 for router in routers:
     app.include_router(router)
 
 # 라우터에 client_container 전달은 app.state를 통해 처리합니다.
 
+
+# 준비 상태 확인 (기동과 클라이언트 미리 데우기가 끝나야 200)
+@app.get("/ready")
+async def ready():
+    report = startup_timer.report()
+    if not startup_timer.ready:
+        return JSONResponse(report, status_code=503)
+    report["clients"] = {
+        name: round(seconds * 1000, 1) for name, seconds in app.state.client_container.init_seconds.items()
+    }
+    return report
+
 # 로거 설정
 logger = LoggerSingleton.get_logger(logger_name="app", level=logging.INFO)
\ No newline at end of file
@@ -0,0 +1,418 @@
+#####################################################
+#                                                   #
+#        webhook / OAuth / LLM 엔드포인트 벤치마크        #
+#                                                   #
+#####################################################
+
+# 사용 예
+#   python -m bench.run --scenarios webhook --workspaces 1k,10k,100k --body-sizes 1k,64k,1m \
+#       --rate 200 --duration 10 --output bench_output.json
+#   python -m bench.run --baseline bench_output.json --max-regression 0.2   # 이전 결과 대비 회귀 시 종료 코드 1
+#
+# 동작
+#   - 시나리오(시나리오 x 워크스페이스 수 x 본문 크기)마다 빈 임시 디렉터리에서 별도 프로세스를 띄웁니다.
+#     저장소 경로가 import 시점의 작업 디렉터리로 정해지고, 메모리(RSS)도 시나리오별로 따로 재기 위함입니다.
+#   - 각 프로세스는 저장소에 N개의 워크스페이스/웹훅을 채운 뒤, 앱 lifespan 을 실행하고
+#     ASGI 로 직접 요청을 목표 속도(open-loop)로 보냅니다.
+#   - Notion/OpenAI API 는 bench/stubs.py 의 로컬 대역 서버로 대체합니다.
+#   - --tracing 이면 트레이스를 켜고 LangSmith 대신 로컬 대역 서버로 보냅니다 (추적 오버헤드 비교용).
+#   - 결과(처리량, p50/p95/p99 지연, RSS)는 JSON 으로 출력합니다.
+
+import argparse
+import asyncio
+import hashlib
+import hmac
+import json
+import logging
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+_REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+##### 공통 #####
+
+def _parse_size(text: str) -> int:
+    text = text.strip().lower()
+    for suffix, factor in (("k", 1000), ("m", 1000 ** 2)):
+        if text.endswith(suffix):
+            return int(float(text[:-1]) * factor)
+    return int(text)
+
+
+def _parse_bytes(text: str) -> int:
+    text = text.strip().lower()
+    for suffix, factor in (("k", 1024), ("m", 1024 ** 2)):
+        if text.endswith(suffix):
+            return int(float(text[:-1]) * factor)
+    return int(text)
+
+
+def _rss_mb() -> float:
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return _max_rss_mb()
+
+
+def _max_rss_mb() -> float:
+    # 리눅스는 KB, macOS 는 바이트 단위
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return usage / (1024 * 1024) if sys.platform == "darwin" else usage / 1024
+
+
+def _percentile(sorted_values: List[float], pct: float) -> Optional[float]:
+    if not sorted_values:
+        return None
+    index = max(0, min(len(sorted_values) - 1, int(round(pct / 100 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+##### 시나리오 실행 (자식 프로세스) #####
+
+def _webhook_body_tail(body_bytes: int) -> bytes:
+    """'{"id":"<event id>",' 뒤에 붙일 본문. events 배열을 목표 크기만큼 채웁니다."""
+    event = {
+        "type": "page.content_updated",
+        "page_id": "00000000-0000-0000-0000-000000000000",
+        "data": {"id": "00000000-0000-0000-0000-000000000000", "pad": "x" * 400},
+    }
+    encoded = json.dumps(event, separators=(",", ":"))
+    count = max(1, body_bytes // (len(encoded) + 1))
+    return ('"type":"batch","events":[' + ",".join([encoded] * count) + "]}").encode("utf-8")
+
+
+def _seed_store(count: int) -> float:
+    from tools.notion import store
+
+    started = time.perf_counter()
+    for i in range(count):
+        store.upsert_workspace(
+            workspace_id=f"bench-ws-{i}",
+            access_token=f"bench-token-{i}",
+            webhook_id=f"bench-wh-{i}",
+            webhook_secret=f"bench-secret-{i}",
+        )
+    store.flush()
+    return time.perf_counter() - started
+
+
+async def _replay(
+    send: Callable[[int], Awaitable[int]], rate: float, duration: float
+) -> Tuple[List[float], Dict[str, int], float]:
+    """목표 속도로 요청을 보내고 (지연 목록, 상태 코드별 개수, 경과 시간)을 반환합니다.
+
+    응답을 기다리지 않고 예정된 시각에 다음 요청을 보내므로(open-loop) 서버가 느려지면 지연이 그대로 드러납니다.
+    """
+    loop = asyncio.get_running_loop()
+    total = max(1, int(rate * duration))
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+
+    async def timed(i: int) -> None:
+        started = time.perf_counter()
+        try:
+            status = str(await send(i))
+        except Exception as e:
+            status = type(e).__name__
+        latencies.append(time.perf_counter() - started)
+        statuses[status] = statuses.get(status, 0) + 1
+
+    started = loop.time()
+    tasks = []
+    for i in range(total):
+        delay = started + i / rate - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(timed(i)))
+    await asyncio.gather(*tasks)
+    return latencies, statuses, loop.time() - started
+
+
+async def _run_scenario(scenario: Dict[str, Any]) -> Dict[str, Any]:
+    import httpx
+
+    rng = random.Random(scenario["seed"])
+    workspaces = scenario["workspaces"]
+    seed_seconds = _seed_store(workspaces)
+    rss_after_seed = _rss_mb()
+
+    import app as appmod
+    from tools.notion import webhook
+
+    kind = scenario["scenario"]
+    if kind == "webhook":
+        tail = _webhook_body_tail(scenario["body_bytes"])
+
+        async def send(i: int) -> int:
+            n = rng.randrange(workspaces)
+            body = b'{"id":"bench-evt-%d",' % i + tail
+            signature = hmac.new(f"bench-secret-{n}".encode(), body, hashlib.sha256).hexdigest()
+            resp = await client.post(
+                "/notion/webhook",
+                content=body,
+                headers={
+                    "Content-Type": "application/json",
+                    "X-Notion-Webhook-Id": f"bench-wh-{n}",
+                    "X-Notion-Signature": f"sha256={signature}",
+                },
+            )
+            return resp.status_code
+    elif kind == "oauth":
+        async def send(i: int) -> int:
+            resp = await client.get("/notion/oauth/callback", params={"code": f"bench-{i}"})
+            return resp.status_code
+    elif kind == "llm":
+        repeat = scenario["llm_repeat"]
+
+        async def send(i: int) -> int:
+            # repeat 비율만큼 이전에 보낸 프롬프트를 다시 보내 캐시 효과를 봄
+            k = rng.randrange(max(1, i)) if i and rng.random() < repeat else i
+            resp = await client.post("/test/test", json={"prompt": f"bench prompt {k}"})
+            return resp.status_code
+    else:
+        raise ValueError(f"unknown scenario: {kind}")
+
+    async with appmod.app.router.lifespan_context(appmod.app):
+        transport = httpx.ASGITransport(app=appmod.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+            latencies, statuses, elapsed = await _replay(send, scenario["rate"], scenario["duration"])
+
+            # 웹훅은 큐에 쌓인 이벤트를 워커가 모두 처리하는 데 걸린 시간도 기록
+            drain_seconds = None
+            if kind == "webhook":
+                drain_started = time.perf_counter()
+                while webhook.event_queue.depth() > 0 and time.perf_counter() - drain_started < 60:
+                    await asyncio.sleep(0.05)
+                drain_seconds = time.perf_counter() - drain_started
+
+    latencies.sort()
+    ok = sum(count for status, count in statuses.items() if status.startswith("2"))
+    ms = lambda v: round(v * 1000, 3) if v is not None else None  # noqa: E731
+    return {
+        **{k: scenario[k] for k in ("scenario", "backend", "workspaces", "body_bytes", "rate", "duration")},
+        "requests": len(latencies),
+        "ok": ok,
+        "statuses": statuses,
+        "throughput_rps": round(ok / elapsed, 2) if elapsed > 0 else None,
+        "p50_ms": ms(_percentile(latencies, 50)),
+        "p95_ms": ms(_percentile(latencies, 95)),
+        "p99_ms": ms(_percentile(latencies, 99)),
+        "max_ms": ms(latencies[-1] if latencies else None),
+        "seed_seconds": round(seed_seconds, 3),
+        "queue_drain_seconds": round(drain_seconds, 3) if drain_seconds is not None else None,
+        "rss_mb_after_seed": round(rss_after_seed, 1),
+        "rss_mb_end": round(_rss_mb(), 1),
+        "max_rss_mb": round(_max_rss_mb(), 1),
+    }
+
+
+def _worker(raw: str, verbose: bool) -> None:
+    if not verbose:
+        # 요청/이벤트마다 남는 INFO 로그가 측정을 흐리지 않도록 끔
+        logging.disable(logging.INFO)
+    sys.path.insert(0, _REPO_ROOT)
+    result = asyncio.run(_run_scenario(json.loads(raw)))
+    # 부모 프로세스는 마지막 줄만 읽음
+    print(json.dumps(result), flush=True)
+
+
+##### 시나리오 구성 및 비교 (부모 프로세스) #####
+
+def _scenarios(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    scenarios = []
+    for backend in args.backends.split(","):
+        for kind in args.scenarios.split(","):
+            # LLM 시나리오는 저장소 크기와 무관하므로 가장 작은 크기로 한 번만 실행
+            sizes = [min(args.workspaces)] if kind == "llm" else args.workspaces
+            bodies = args.body_sizes if kind == "webhook" else [None]
+            for workspaces in sizes:
+                for body_bytes in bodies:
+                    scenarios.append({
+                        "scenario": kind,
+                        "backend": backend,
+                        "workspaces": workspaces,
+                        "body_bytes": body_bytes,
+                        "rate": args.rate,
+                        "duration": args.duration,
+                        "seed": args.seed,
+                        "llm_repeat": args.llm_repeat,
+                    })
+    return scenarios
+
+
+def _run_child(scenario: Dict[str, Any], env: Dict[str, str], verbose: bool) -> Dict[str, Any]:
+    with tempfile.TemporaryDirectory(prefix="easyconnect-bench-") as workdir:
+        child_env = dict(env, NOTION_STORE_BACKEND=scenario["backend"])
+        proc = subprocess.run(
+            [sys.executable, "-m", "bench.run", "--worker", json.dumps(scenario)] + (["--verbose"] if verbose else []),
+            cwd=workdir,
+            env=child_env,
+            stdout=subprocess.PIPE,
+            stderr=None if verbose else subprocess.PIPE,
+            text=True,
+        )
+    lines = [line for line in proc.stdout.splitlines() if line.strip()]
+    if proc.returncode != 0 or not lines:
+        return {**scenario, "error": (proc.stderr or "")[-2000:] or f"exit code {proc.returncode}"}
+    return json.loads(lines[-1])
+
+
+def _key(result: Dict[str, Any]) -> Tuple[Any, ...]:
+    return (result["scenario"], result["backend"], result["workspaces"], result["body_bytes"])
+
+
+def compare(results: List[Dict[str, Any]], baseline: List[Dict[str, Any]], max_regression: float) -> List[str]:
+    """기준 결과 대비 p95 지연이 늘거나 처리량이 줄어든 비율이 한도를 넘는 항목을 반환합니다."""
+    previous = {_key(r): r for r in baseline if "error" not in r}
+    regressions = []
+    for result in results:
+        before = previous.get(_key(result))
+        if before is None:
+            continue
+        if "error" in result:
+            regressions.append(f"{_key(result)}: failed ({result['error'].splitlines()[-1] if result['error'] else ''})")
+            continue
+        if before.get("p95_ms") and result.get("p95_ms") is not None:
+            change = result["p95_ms"] / before["p95_ms"] - 1
+            if change > max_regression:
+                regressions.append(f"{_key(result)}: p95 {before['p95_ms']}ms -> {result['p95_ms']}ms (+{change:.0%})")
+        if before.get("throughput_rps") and result.get("throughput_rps") is not None:
+            change = 1 - result["throughput_rps"] / before["throughput_rps"]
+            if change > max_regression:
+                regressions.append(
+                    f"{_key(result)}: throughput {before['throughput_rps']} -> {result['throughput_rps']} rps (-{change:.0%})"
+                )
+    return regressions
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=_REPO_ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="EasyConnect 엔드포인트 벤치마크")
+    parser.add_argument("--scenarios", default="webhook", help="webhook,oauth,llm 중 쉼표로 구분")
+    parser.add_argument("--workspaces", default="1k,10k,100k", help="저장소에 채울 워크스페이스 수 목록")
+    parser.add_argument("--body-sizes", default="1k,64k,1m", help="웹훅 본문 크기 목록")
+    parser.add_argument("--backends", default="journal", help="journal,sqlite 중 쉼표로 구분")
+    parser.add_argument("--rate", type=float, default=200.0, help="초당 요청 수 (open-loop)")
+    parser.add_argument("--duration", type=float, default=10.0, help="시나리오별 요청 시간(초)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--llm-repeat", type=float, default=0.5, help="LLM 시나리오에서 이전 프롬프트를 다시 보내는 비율")
+    parser.add_argument("--notion-latency", type=float, default=0.02, help="Notion 대역 서버 응답 지연(초)")
+    parser.add_argument("--openai-latency", type=float, default=0.2, help="OpenAI 대역 서버 응답 지연(초)")
+    parser.add_argument(
+        "--notion-rate", type=float, default=1000.0, help="Notion API 토큰 버킷 속도 (실서비스 기본값 3은 OAuth 시나리오를 가림)"
+    )
+    parser.add_argument("--tracing", action="store_true", help="요청 트레이스를 켜고 LangSmith 대역 서버로 전송")
+    parser.add_argument("--output", help="결과 JSON 파일 (없으면 표준 출력)")
+    parser.add_argument("--baseline", help="비교할 이전 결과 JSON")
+    parser.add_argument("--max-regression", type=float, default=0.2, help="허용하는 p95/처리량 악화 비율")
+    parser.add_argument("--verbose", action="store_true", help="앱 로그를 그대로 출력")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        _worker(args.worker, args.verbose)
+        return 0
+
+    args.workspaces = sorted(_parse_size(v) for v in args.workspaces.split(","))
+    args.body_sizes = [_parse_bytes(v) for v in args.body_sizes.split(",")]
+
+    sys.path.insert(0, _REPO_ROOT)
+    from bench.stubs import create_langsmith_stub, create_notion_stub, create_openai_stub, serve
+
+    notion_server, notion_url = serve(create_notion_stub(args.notion_latency))
+    openai_server, openai_url = serve(create_openai_stub(args.openai_latency))
+    env = dict(
+        os.environ,
+        PYTHONPATH=os.pathsep.join(p for p in (_REPO_ROOT, os.environ.get("PYTHONPATH")) if p),
+        NOTION_API_BASE=notion_url,
+        NOTION_CLIENT_ID="bench-client",
+        NOTION_CLIENT_SECRET="bench-secret",
+        NOTION_REDIRECT_URI="http://bench/notion/oauth/callback",
+        NOTION_WEBHOOK_CALLBACK_URL="http://bench/notion/webhook",
+        OPENAI_BASE_URL=f"{openai_url}/v1",
+        OPENAI_API_KEY=os.environ.get("OPENAI_API_KEY", "bench"),
+        LANGSMITH_TRACING="true" if args.tracing else "false",
+        NOTION_API_RATE_PER_SEC=str(args.notion_rate),
+        NOTION_API_BURST=str(args.notion_rate),
+        # 큰 본문은 요청 하나에 이벤트가 수백 개라 기본 큐 한도(10000)로는 금방 503이 됨
+        NOTION_EVENT_QUEUE_MAX_DEPTH=os.environ.get("NOTION_EVENT_QUEUE_MAX_DEPTH", "10000000"),
+    )
+
+    langsmith_server = None
+    if args.tracing:
+        langsmith_server, langsmith_url = serve(create_langsmith_stub())
+        env.update(LANGSMITH_ENDPOINT=langsmith_url, LANGSMITH_API_KEY="bench")
+
+    results = []
+    try:
+        for scenario in _scenarios(args):
+            label = f"{scenario['scenario']}/{scenario['backend']} ws={scenario['workspaces']} body={scenario['body_bytes']}"
+            print(f"[bench] {label} ...", file=sys.stderr, flush=True)
+            result = _run_child(scenario, env, args.verbose)
+            results.append(result)
+            if "error" in result:
+                print(f"[bench] {label} 실패\n{result['error']}", file=sys.stderr, flush=True)
+            else:
+                print(
+                    f"[bench] {label} {result['throughput_rps']} rps "
+                    f"p50={result['p50_ms']}ms p95={result['p95_ms']}ms p99={result['p99_ms']}ms rss={result['max_rss_mb']}MB",
+                    file=sys.stderr,
+                    flush=True,
+                )
+    finally:
+        notion_server.should_exit = True
+        openai_server.should_exit = True
+        if langsmith_server is not None:
+            langsmith_server.should_exit = True
+
+    report = {
+        "meta": {
+            "git_revision": _git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "args": {k: v for k, v in vars(args).items() if k not in ("worker", "output", "baseline")},
+        },
+        "results": results,
+    }
+    encoded = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(encoded + "\n")
+    else:
+        print(encoded)
+
+    failed = [r for r in results if "error" in r]
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = compare(results, json.load(f).get("results", []), args.max_regression)
+        for line in regressions:
+            print(f"[bench] 회귀: {line}", file=sys.stderr)
+        if regressions:
+            return 1
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
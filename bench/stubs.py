@@ -0,0 +1,189 @@
+#####################################################
+#                                                   #
+#    벤치마크용 Notion / OpenAI / LangSmith 대역 서버     #
+#                                                   #
+#####################################################
+
+# 실제 외부 API 대신 같은 모양의 응답을 주는 로컬 서버입니다.
+#   - Notion: OAuth 토큰 교환, 웹훅 구독 생성 (/v1/webhooks 는 404, /v1/subscriptions 는 성공),
+#     페이지/블록 조회
+#   - OpenAI: chat completions (일반 / stream), embeddings
+#   - LangSmith: 트레이스 배치 수신 (/runs/batch), 받은 run 은 GET /_stub/runs 로 확인
+# 응답 지연은 latency 인자로 흉내 냅니다.
+
+import asyncio
+import hashlib
+import itertools
+import json
+import threading
+import time
+from typing import Dict, Tuple
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+
+def create_notion_stub(latency: float = 0.02, block_count: int = 150) -> FastAPI:
+    app = FastAPI()
+    counter = itertools.count()
+
+    @app.post("/v1/oauth/token")
+    async def token(request: Request):
+        body = await request.json()
+        await asyncio.sleep(latency)
+        n = next(counter)
+        return {
+            "access_token": f"stub-token-{n}",
+            "workspace_id": f"oauth-ws-{body.get('code', n)}",
+            "bot_id": f"stub-bot-{n}",
+        }
+
+    @app.post("/v1/webhooks")
+    async def webhooks():
+        await asyncio.sleep(latency)
+        return JSONResponse({"object": "error", "status": 404}, status_code=404)
+
+    @app.post("/v1/subscriptions")
+    async def subscriptions():
+        await asyncio.sleep(latency)
+        return {"id": f"stub-sub-{next(counter)}"}
+
+    # 페이지 캐시용. 페이지마다 last_edited_time 을 두고, /_stub/pages/{id}/edit 로 편집을 흉내 냄
+    edited: Dict[str, str] = {}
+    fetches: Dict[str, int] = {"pages": 0, "blocks": 0}
+
+    @app.get("/v1/pages/{page_id}")
+    async def page(page_id: str):
+        await asyncio.sleep(latency)
+        fetches["pages"] += 1
+        if page_id.startswith("missing"):
+            return JSONResponse({"object": "error", "status": 404}, status_code=404)
+        return {
+            "object": "page",
+            "id": page_id,
+            "last_edited_time": edited.setdefault(page_id, "2024-01-01T00:00:00.000Z"),
+            "properties": {"title": {"title": [{"plain_text": f"page {page_id}"}]}},
+        }
+
+    @app.get("/v1/blocks/{block_id}/children")
+    async def children(block_id: str, start_cursor: int = 0, page_size: int = 100):
+        await asyncio.sleep(latency)
+        fetches["blocks"] += 1
+        end = min(block_count, start_cursor + page_size)
+        return {
+            "object": "list",
+            "results": [
+                {"object": "block", "id": f"{block_id}-{i}", "type": "paragraph",
+                 "paragraph": {"rich_text": [{"plain_text": f"line {i} of {block_id}"}]}}
+                for i in range(start_cursor, end)
+            ],
+            "has_more": end < block_count,
+            "next_cursor": str(end) if end < block_count else None,
+        }
+
+    @app.post("/_stub/pages/{page_id}/edit")
+    async def edit(page_id: str, last_edited_time: str):
+        edited[page_id] = last_edited_time
+        return {"ok": True}
+
+    @app.get("/_stub/stats")
+    async def stats():
+        return fetches
+
+    return app
+
+
+def create_openai_stub(latency: float = 0.2, stream_tokens: int = 50, embedding_dim: int = 256) -> FastAPI:
+    app = FastAPI()
+
+    @app.post("/v1/chat/completions")
+    async def completions(request: Request):
+        body = await request.json()
+        model = body.get("model", "stub")
+        prompt = body["messages"][-1]["content"]
+        if body.get("stream"):
+            async def chunks():
+                await asyncio.sleep(latency)
+                for i in range(stream_tokens):
+                    chunk = {
+                        "id": "stub", "object": "chat.completion.chunk", "created": 0, "model": model,
+                        "choices": [{"index": 0, "delta": {"content": f"t{i} "}, "finish_reason": None}],
+                    }
+                    yield f"data: {json.dumps(chunk)}\n\n"
+                    await asyncio.sleep(0.001)
+                yield "data: [DONE]\n\n"
+
+            return StreamingResponse(chunks(), media_type="text/event-stream")
+
+        await asyncio.sleep(latency)
+        return {
+            "id": "stub", "object": "chat.completion", "created": int(time.time()), "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": f"stub: {prompt[:50]}"}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": len(prompt) // 4 + 1, "completion_tokens": 8, "total_tokens": len(prompt) // 4 + 9},
+        }
+
+    @app.post("/v1/embeddings")
+    async def embeddings(request: Request):
+        body = await request.json()
+        inputs = body["input"] if isinstance(body["input"], list) else [body["input"]]
+        await asyncio.sleep(latency)
+        data = []
+        for index, text in enumerate(inputs):
+            # 같은 입력에는 같은 벡터를 돌려주도록 해시에서 만듦
+            digest = hashlib.sha256(text.encode("utf-8")).digest() * (embedding_dim // 32)
+            data.append({"object": "embedding", "index": index, "embedding": [b / 255.0 - 0.5 for b in digest]})
+        tokens = sum(len(text) // 4 + 1 for text in inputs)
+        return {
+            "object": "list", "model": body.get("model", "stub"), "data": data,
+            "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+        }
+
+    return app
+
+
+def create_langsmith_stub(latency: float = 0.0) -> FastAPI:
+    app = FastAPI()
+    runs: list = []
+
+    @app.get("/info")
+    async def info():
+        # 클라이언트의 자체 백그라운드 스레드도 읽는 값이라 전부 채워 둠
+        return {
+            "version": "stub",
+            "batch_ingest_config": {
+                "use_multipart_endpoint": False,
+                "scale_up_qsize_trigger": 1000,
+                "scale_up_nthreads_limit": 16,
+                "scale_down_nempty_trigger": 4,
+                "size_limit": 100,
+                "size_limit_bytes": 20 * 1024 * 1024,
+            },
+        }
+
+    @app.post("/runs/batch")
+    async def batch(request: Request):
+        body = await request.json()
+        await asyncio.sleep(latency)
+        runs.extend(body.get("post") or [])
+        runs.extend(body.get("patch") or [])
+        return {}
+
+    @app.get("/_stub/runs")
+    async def received():
+        return {"count": len(runs), "runs": runs}
+
+    return app
+
+
+def serve(app: FastAPI, host: str = "127.0.0.1") -> Tuple[uvicorn.Server, str]:
+    """앱을 별도 스레드의 uvicorn으로 띄우고 (서버, base_url)을 반환합니다. 포트는 자동 선택."""
+    server = uvicorn.Server(uvicorn.Config(app, host=host, port=0, log_level="warning", access_log=False))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        if not thread.is_alive():
+            raise RuntimeError("stub server failed to start")
+        time.sleep(0.01)
+    port = server.servers[0].sockets[0].getsockname()[1]
+    return server, f"http://{host}:{port}"
@@ -4,23 +4,533 @@
 #                                                   #
 #####################################################
 
-from langsmith import Client as LangSmithClient
-from openai import AsyncOpenAI
+# openai / langsmith 는 import 에만 수백 ms 가 걸리므로 실제로 클라이언트를 만들 때 불러옵니다.
+# 웹훅만 처리하는 워커는 두 패키지를 전혀 불러오지 않아 콜드 스타트가 빨라집니다.
+import asyncio
+import importlib
+import importlib.util
 import os
+import sys
+import time
+from collections import deque
+from typing import TYPE_CHECKING, Any, AsyncIterator, Callable, Deque, Dict, Iterable, List, Optional
+import httpx
 from dotenv import load_dotenv
 
+from config.metrics import (
+    OPENAI_LIMITER_IN_FLIGHT,
+    OPENAI_LIMITER_LATENCY_BASELINE,
+    OPENAI_LIMITER_LIMIT,
+    OPENAI_LIMITER_QUEUED,
+    OPENAI_LIMITER_QUEUE_WAIT,
+    OPENAI_LIMITER_RATE_LIMITED,
+    OPENAI_LIMITER_SHED,
+    OPENAI_LIMITER_TPM_AVAILABLE,
+    NOTION_HTTP_HOST_WAIT,
+    NOTION_HTTP_IN_FLIGHT,
+    NOTION_HTTP_POOL_CONNECTIONS,
+    NOTION_HTTP_POOL_MAX_CONNECTIONS,
+)
+
+if TYPE_CHECKING:
+    from langsmith import Client as LangSmithClient
+    from openai import AsyncOpenAI
+
+    from config.llm_cache import LLMResponseCache
+
 load_dotenv()
 
+##### Notion HTTP 클라이언트 설정 #####
+NOTION_HTTP_TIMEOUT = float(os.getenv("NOTION_HTTP_TIMEOUT", "30"))
+NOTION_HTTP_CONNECT_TIMEOUT = float(os.getenv("NOTION_HTTP_CONNECT_TIMEOUT", "5"))
+NOTION_HTTP_MAX_CONNECTIONS = int(os.getenv("NOTION_HTTP_MAX_CONNECTIONS", "100"))
+NOTION_HTTP_MAX_KEEPALIVE = int(os.getenv("NOTION_HTTP_MAX_KEEPALIVE", "20"))
+NOTION_HTTP_KEEPALIVE_EXPIRY = float(os.getenv("NOTION_HTTP_KEEPALIVE_EXPIRY", "30"))
+# 호스트 하나에 동시에 보낼 수 있는 최대 요청 수 (0 이하면 제한 없음)
+NOTION_HTTP_MAX_PER_HOST = int(os.getenv("NOTION_HTTP_MAX_PER_HOST", "20"))
+# HTTP/2는 h2 패키지가 설치된 경우에만 사용
+NOTION_HTTP2 = os.getenv("NOTION_HTTP2", "1") == "1" and importlib.util.find_spec("h2") is not None
+
+
+# 응답 본문이 닫힐 때 콜백을 한 번 호출하는 스트림
+class _ReleasingStream(httpx.AsyncByteStream):
+    def __init__(self, stream: httpx.AsyncByteStream, on_close: Callable[[], None]):
+        self._stream = stream
+        self._on_close = on_close
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self) -> None:
+        try:
+            await self._stream.aclose()
+        finally:
+            if self._on_close is not None:
+                on_close, self._on_close = self._on_close, None
+                on_close()
+
+
+# 호스트별 동시 요청 수를 제한하고 커넥션 풀 사용량을 메트릭으로 남기는 전송 계층
+class HostLimitedTransport(httpx.AsyncBaseTransport):
+    def __init__(self, transport: httpx.AsyncHTTPTransport, max_per_host: int):
+        self._transport = transport
+        self._max_per_host = max_per_host
+        self._host_slots: Dict[str, asyncio.Semaphore] = {}
+
+    def _slot(self, host: str) -> asyncio.Semaphore:
+        slot = self._host_slots.get(host)
+        if slot is None:
+            slot = self._host_slots[host] = asyncio.Semaphore(self._max_per_host)
+        return slot
+
+    def _observe_pool(self) -> None:
+        # httpcore 풀의 커넥션 목록은 공개 API가 아니므로 없으면 건너뜀
+        # (httpx/httpcore 가 바뀌어 구조가 달라지면 메트릭만 빠지고 요청은 그대로 처리)
+        pool = getattr(self._transport, "_pool", None)
+        connections = getattr(pool, "connections", None)
+        if connections is None:
+            return
+        try:
+            connections = list(connections)
+            idle = sum(1 for conn in connections if conn.is_idle())
+        except (AttributeError, TypeError):
+            return
+        NOTION_HTTP_POOL_CONNECTIONS.labels(state="idle").set(idle)
+        NOTION_HTTP_POOL_CONNECTIONS.labels(state="active").set(len(connections) - idle)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        host = request.url.host
+        in_flight = NOTION_HTTP_IN_FLIGHT.labels(host=host)
+        if self._max_per_host <= 0:
+            in_flight.inc()
+            try:
+                return await self._transport.handle_async_request(request)
+            finally:
+                in_flight.dec()
+                self._observe_pool()
+
+        slot = self._slot(host)
+        started = time.perf_counter()
+        await slot.acquire()
+        NOTION_HTTP_HOST_WAIT.labels(host=host).observe(time.perf_counter() - started)
+        in_flight.inc()
+        try:
+            response = await self._transport.handle_async_request(request)
+        except BaseException:
+            in_flight.dec()
+            slot.release()
+            self._observe_pool()
+            raise
+
+        # 본문을 다 읽거나 닫을 때까지 커넥션을 쓰고 있으므로 그때 슬롯을 반환
+        def release() -> None:
+            in_flight.dec()
+            slot.release()
+            self._observe_pool()
+
+        response.stream = _ReleasingStream(response.stream, release)
+        return response
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
+        self._observe_pool()
+
+
+def create_notion_http_client() -> httpx.AsyncClient:
+    limits = httpx.Limits(
+        max_connections=NOTION_HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=NOTION_HTTP_MAX_KEEPALIVE,
+        keepalive_expiry=NOTION_HTTP_KEEPALIVE_EXPIRY,
+    )
+    transport = HostLimitedTransport(
+        httpx.AsyncHTTPTransport(limits=limits, http2=NOTION_HTTP2, retries=1),
+        max_per_host=NOTION_HTTP_MAX_PER_HOST,
+    )
+    NOTION_HTTP_POOL_MAX_CONNECTIONS.set(NOTION_HTTP_MAX_CONNECTIONS)
+    return httpx.AsyncClient(
+        transport=transport,
+        timeout=httpx.Timeout(NOTION_HTTP_TIMEOUT, connect=NOTION_HTTP_CONNECT_TIMEOUT),
+    )
+
+##### OpenAI 동시성 제한 설정 #####
+OPENAI_MIN_CONCURRENCY = int(os.getenv("OPENAI_MIN_CONCURRENCY", "1"))
+OPENAI_MAX_CONCURRENCY = int(os.getenv("OPENAI_MAX_CONCURRENCY", "32"))
+OPENAI_INITIAL_CONCURRENCY = int(os.getenv("OPENAI_INITIAL_CONCURRENCY", "4"))
+# 분당 토큰 예산 (0이면 제한 없음)
+OPENAI_TPM_BUDGET = int(os.getenv("OPENAI_TPM_BUDGET", "200000"))
+# 대기열에서 이 시간(초)을 넘게 기다리거나 대기열이 가득 차면 요청을 거절
+OPENAI_MAX_QUEUE_WAIT = float(os.getenv("OPENAI_MAX_QUEUE_WAIT", "10"))
+OPENAI_MAX_QUEUE = int(os.getenv("OPENAI_MAX_QUEUE", "1000"))
+# 기준 지연의 몇 배를 넘으면 혼잡으로 보고 한도를 줄일지
+OPENAI_LATENCY_TOLERANCE = float(os.getenv("OPENAI_LATENCY_TOLERANCE", "2.0"))
+# 응답 길이를 모를 때 가정하는 출력 토큰 수
+OPENAI_DEFAULT_COMPLETION_TOKENS = 256
+
+
+# 대기열이 가득 찼거나 기다리는 시간이 한도를 넘어 요청을 거절함
+class OpenAIOverloaded(Exception):
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(f"openai limiter overloaded ({reason})")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+def estimate_tokens(messages: Optional[Iterable[Dict[str, Any]]], max_tokens: Optional[int] = None) -> int:
+    # 대략 4글자당 1토큰으로 프롬프트를 추정하고 출력 한도를 더함
+    messages = list(messages or ())
+    chars = 0
+    for message in messages:
+        content = message.get("content")
+        if isinstance(content, str):
+            chars += len(content)
+        elif isinstance(content, list):
+            chars += sum(len(part.get("text", "")) for part in content if isinstance(part, dict))
+    return chars // 4 + 4 * len(messages) + (max_tokens or OPENAI_DEFAULT_COMPLETION_TOKENS)
+
+
+class _Waiter:
+    __slots__ = ("future", "tokens", "enqueued_at")
+
+    def __init__(self, future: asyncio.Future, tokens: int):
+        self.future = future
+        self.tokens = tokens
+        self.enqueued_at = time.monotonic()
+
+
+class LimiterPermit:
+    # 한 요청이 쥐고 있는 슬롯. release 는 여러 번 불러도 한 번만 반영
+    def __init__(self, limiter: "AdaptiveLimiter", tokens: int):
+        self._limiter = limiter
+        self.tokens = tokens
+        self._started = time.monotonic()
+        self._latency: Optional[float] = None
+        self._released = False
+
+    def observe(self) -> None:
+        # 스트리밍은 전체 생성 시간 대신 첫 응답까지의 지연으로 혼잡도를 판단
+        if self._latency is None:
+            self._latency = time.monotonic() - self._started
+
+    def settle(self, actual_tokens: Optional[int]) -> None:
+        # 실제 사용량을 알면 추정치와의 차이를 예산에 반영
+        if actual_tokens is not None and not self._released:
+            self._limiter._adjust_budget(self.tokens - actual_tokens)
+            self.tokens = actual_tokens
+
+    def release(self, error: Optional[BaseException] = None) -> None:
+        if self._released:
+            return
+        self._released = True
+        self.observe()
+        self._limiter._release(self._latency, error)
+
+
+class AdaptiveLimiter:
+    """OpenAI 요청의 동시 실행 수를 AIMD 방식으로 조절하는 제한기.
+
+    - 지연이 기준치 안이면 한도를 조금씩 늘리고(가산 증가), 429를 받으면 절반으로 줄임(승산 감소)
+    - 분당 토큰 예산을 프롬프트 길이로 추정해 차감하고, 부족하면 채워질 때까지 대기
+    - 대기열은 도착 순서대로 처리하며, 마감 시간을 넘긴 요청은 OpenAIOverloaded 로 거절
+    """
+
+    def __init__(
+        self,
+        *,
+        min_limit: int = OPENAI_MIN_CONCURRENCY,
+        max_limit: int = OPENAI_MAX_CONCURRENCY,
+        initial_limit: int = OPENAI_INITIAL_CONCURRENCY,
+        tpm_budget: int = OPENAI_TPM_BUDGET,
+        max_queue_wait: float = OPENAI_MAX_QUEUE_WAIT,
+        max_queue: int = OPENAI_MAX_QUEUE,
+        latency_tolerance: float = OPENAI_LATENCY_TOLERANCE,
+    ):
+        self._min_limit = max(1, min_limit)
+        self._max_limit = max(self._min_limit, max_limit)
+        self._limit = float(min(self._max_limit, max(self._min_limit, initial_limit)))
+        self._max_queue_wait = max_queue_wait
+        self._max_queue = max_queue
+        self._latency_tolerance = latency_tolerance
+
+        self._tpm_budget = tpm_budget
+        self._tpm_tokens = float(tpm_budget)
+        self._tpm_updated = time.monotonic()
+
+        self._in_flight = 0
+        self._waiters: Deque[_Waiter] = deque()
+        self._baseline: Optional[float] = None
+        self._paused_until = 0.0
+        self._last_decrease = 0.0
+        self._wakeup: Optional[asyncio.TimerHandle] = None
+
+        OPENAI_LIMITER_LIMIT.set(self.limit)
+        OPENAI_LIMITER_TPM_AVAILABLE.set(self._tpm_tokens)
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    # ---------------------------------------------------------------- 토큰 예산
+
+    def _refill(self, now: float) -> None:
+        if self._tpm_budget <= 0:
+            return
+        self._tpm_tokens = min(self._tpm_budget, self._tpm_tokens + (now - self._tpm_updated) * self._tpm_budget / 60.0)
+        self._tpm_updated = now
+        OPENAI_LIMITER_TPM_AVAILABLE.set(self._tpm_tokens)
+
+    def _adjust_budget(self, delta: int) -> None:
+        if self._tpm_budget <= 0:
+            return
+        self._refill(time.monotonic())
+        self._tpm_tokens = min(self._tpm_budget, self._tpm_tokens + delta)
+        OPENAI_LIMITER_TPM_AVAILABLE.set(self._tpm_tokens)
+        self._dispatch()
+
+    # ---------------------------------------------------------------- 대기열
+
+    def _schedule(self, delay: float) -> None:
+        if self._wakeup is not None:
+            self._wakeup.cancel()
+        self._wakeup = asyncio.get_running_loop().call_later(max(0.0, delay), self._dispatch)
+
+    def _dispatch(self) -> None:
+        # 앞에서부터 슬롯과 토큰 예산이 허락하는 만큼 입장시킴
+        now = time.monotonic()
+        self._refill(now)
+        while self._waiters:
+            waiter = self._waiters[0]
+            if waiter.future.done():
+                self._waiters.popleft()
+                continue
+            if self._in_flight >= self.limit:
+                break
+            if now < self._paused_until:
+                self._schedule(self._paused_until - now)
+                break
+            if self._tpm_budget > 0:
+                # 예산보다 큰 요청은 예산이 가득 찼을 때 입장
+                needed = min(waiter.tokens, self._tpm_budget)
+                if self._tpm_tokens < needed:
+                    self._schedule((needed - self._tpm_tokens) * 60.0 / self._tpm_budget)
+                    break
+                self._tpm_tokens -= waiter.tokens
+                OPENAI_LIMITER_TPM_AVAILABLE.set(self._tpm_tokens)
+            self._waiters.popleft()
+            self._in_flight += 1
+            OPENAI_LIMITER_QUEUE_WAIT.observe(now - waiter.enqueued_at)
+            waiter.future.set_result(None)
+        OPENAI_LIMITER_IN_FLIGHT.set(self._in_flight)
+        OPENAI_LIMITER_QUEUED.set(len(self._waiters))
+
+    async def acquire(
+        self,
+        *,
+        messages: Optional[List[Dict[str, Any]]] = None,
+        max_tokens: Optional[int] = None,
+        timeout: Optional[float] = None,
+    ) -> LimiterPermit:
+        # 슬롯을 얻을 때까지 기다림. timeout 은 max_queue_wait 보다 짧게만 줄일 수 있음
+        tokens = estimate_tokens(messages, max_tokens)
+        wait = self._max_queue_wait if timeout is None else min(timeout, self._max_queue_wait)
+        if len(self._waiters) >= self._max_queue:
+            OPENAI_LIMITER_SHED.labels(reason="queue_full").inc()
+            raise OpenAIOverloaded("queue_full", wait)
+
+        waiter = _Waiter(asyncio.get_running_loop().create_future(), tokens)
+        self._waiters.append(waiter)
+        self._dispatch()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), wait)
+        except asyncio.TimeoutError:
+            # 마감과 입장이 겹쳤으면 입장한 것으로 처리
+            if not waiter.future.done():
+                waiter.future.cancel()
+                self._dispatch()
+                OPENAI_LIMITER_SHED.labels(reason="deadline").inc()
+                raise OpenAIOverloaded("deadline", wait)
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                LimiterPermit(self, tokens).release(asyncio.CancelledError())
+            else:
+                waiter.future.cancel()
+                self._dispatch()
+            raise
+        return LimiterPermit(self, tokens)
+
+    def slot(self, **kwargs: Any) -> "_PermitContext":
+        # async with limiter.slot(messages=...) as permit: ... 형태로 사용
+        return _PermitContext(self, kwargs)
+
+    # ---------------------------------------------------------------- AIMD
+
+    def _release(self, latency: Optional[float], error: Optional[BaseException]) -> None:
+        self._in_flight = max(0, self._in_flight - 1)
+        if error is None and latency is not None:
+            self._on_success(latency)
+        elif _is_openai_timeout(error):
+            self._decrease(0.9)
+        self._dispatch()
+
+    def _on_success(self, latency: float) -> None:
+        # 기준 지연은 최근 최소값을 따라가되 천천히 올라가게 하여 부하 변화에 적응
+        if self._baseline is None or latency < self._baseline:
+            self._baseline = latency
+        else:
+            self._baseline *= 1.01
+        OPENAI_LIMITER_LATENCY_BASELINE.set(self._baseline)
+
+        if latency > self._baseline * self._latency_tolerance:
+            self._decrease(0.9)
+        else:
+            self._limit = min(self._max_limit, self._limit + 1.0 / self._limit)
+        OPENAI_LIMITER_LIMIT.set(self.limit)
+
+    def _decrease(self, factor: float) -> None:
+        # 동시에 끝난 요청들로 한꺼번에 줄지 않도록 짧은 간격을 둠
+        now = time.monotonic()
+        if now - self._last_decrease < 1.0:
+            return
+        self._last_decrease = now
+        self._limit = max(self._min_limit, self._limit * factor)
+        OPENAI_LIMITER_LIMIT.set(self.limit)
+
+    def on_rate_limited(self, retry_after: Optional[float] = None) -> None:
+        OPENAI_LIMITER_RATE_LIMITED.inc()
+        self._decrease(0.5)
+        if retry_after:
+            self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+
+    async def observe_response(self, response: httpx.Response) -> None:
+        # OpenAI SDK 내부 재시도까지 포함해 모든 429 응답을 관찰하는 httpx 훅
+        if response.status_code == 429:
+            retry_after = response.headers.get("retry-after")
+            try:
+                self.on_rate_limited(float(retry_after) if retry_after else None)
+            except ValueError:
+                self.on_rate_limited(None)
+
+
+class _PermitContext:
+    def __init__(self, limiter: AdaptiveLimiter, kwargs: Dict[str, Any]):
+        self._limiter = limiter
+        self._kwargs = kwargs
+        self._permit: Optional[LimiterPermit] = None
+
+    async def __aenter__(self) -> LimiterPermit:
+        self._permit = await self._limiter.acquire(**self._kwargs)
+        return self._permit
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        self._permit.release(exc)
+
+
+def _is_openai_timeout(error: Optional[BaseException]) -> bool:
+    # openai 가 아직 import 되지 않았다면 openai 예외일 수도 없음
+    openai = sys.modules.get("openai")
+    return openai is not None and isinstance(error, openai.APITimeoutError)
+
+
+def create_openai_client(limiter: AdaptiveLimiter) -> "AsyncOpenAI":
+    from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+
+    return AsyncOpenAI(
+        api_key=os.getenv("OPENAI_API_KEY"),
+        http_client=DefaultAsyncHttpxClient(event_hooks={"response": [limiter.observe_response]}),
+    )
+
+# 클라이언트 이름 -> 생성에 필요한 무거운 모듈 (미리 데우기에서 스레드로 import)
+_CLIENT_MODULES: Dict[str, List[str]] = {
+    "openai_client": ["openai"],
+    "openai_limiter": [],
+    "langsmith_client": ["langsmith"],
+    "llm_cache": ["config.llm_cache"],
+    "notion_http_client": [],
+}
+
+
 # 모든 클라이언트 인스턴스를 담을 컨테이너 클래스
+# 각 클라이언트는 처음 접근할 때 만들어집니다 (config/dependencies.py 의 getter 를 통해).
 class ClientContainer:
+    CLIENTS = tuple(_CLIENT_MODULES)
+
     def __init__(self):
-        self.openai_client = None
-        self.langsmith_client = None
+        self._openai_client: Optional["AsyncOpenAI"] = None
+        self._openai_limiter: Optional[AdaptiveLimiter] = None
+        self._langsmith_client: Optional["LangSmithClient"] = None
+        self._notion_http_client: Optional[httpx.AsyncClient] = None
+        self._llm_cache: Optional["LLMResponseCache"] = None
+        # 클라이언트 이름 -> 생성에 걸린 시간(초)
+        self.init_seconds: Dict[str, float] = {}
 
-# 클라이언트들을 초기화하는 함수
-def initialize_clients() -> ClientContainer:
-    container = ClientContainer()
-    container.openai_client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-    container.langsmith_client = LangSmithClient()
+    def _timed(self, name: str, factory: Callable[[], Any]) -> Any:
+        started = time.perf_counter()
+        client = factory()
+        self.init_seconds[name] = time.perf_counter() - started
+        return client
+
+    @property
+    def openai_limiter(self) -> AdaptiveLimiter:
+        if self._openai_limiter is None:
+            self._openai_limiter = self._timed("openai_limiter", AdaptiveLimiter)
+        return self._openai_limiter
+
+    @property
+    def openai_client(self) -> "AsyncOpenAI":
+        if self._openai_client is None:
+            self._openai_client = self._timed("openai_client", lambda: create_openai_client(self.openai_limiter))
+        return self._openai_client
+
+    @property
+    def langsmith_client(self) -> "LangSmithClient":
+        if self._langsmith_client is None:
+            def create():
+                from langsmith import Client as LangSmithClient
 
-    return container
+                return LangSmithClient()
+
+            self._langsmith_client = self._timed("langsmith_client", create)
+        return self._langsmith_client
+
+    @property
+    def llm_cache(self) -> "LLMResponseCache":
+        if self._llm_cache is None:
+            def create():
+                from config.llm_cache import create_llm_cache
+
+                return create_llm_cache(limiter=self.openai_limiter)
+
+            self._llm_cache = self._timed("llm_cache", create)
+        return self._llm_cache
+
+    @property
+    def notion_http_client(self) -> httpx.AsyncClient:
+        if self._notion_http_client is None:
+            self._notion_http_client = self._timed("notion_http_client", create_notion_http_client)
+        return self._notion_http_client
+
+    def initialized(self) -> List[str]:
+        return [name for name in self.CLIENTS if getattr(self, f"_{name}") is not None]
+
+    async def warm(self, names: Iterable[str]) -> None:
+        """지정한 클라이언트를 미리 만듭니다. 무거운 import 는 스레드에서 하여 이벤트 루프를 막지 않습니다."""
+        names = [name for name in names if name in _CLIENT_MODULES]
+        modules = [module for name in names for module in _CLIENT_MODULES[name]]
+        if modules:
+            await asyncio.to_thread(lambda: [importlib.import_module(module) for module in modules])
+        for name in names:
+            getattr(self, name)
+
+    # 앱 종료 시 열린 커넥션 정리 (만들어진 클라이언트만)
+    async def aclose(self):
+        if self._llm_cache is not None:
+            self._llm_cache.close()
+        if self._openai_client is not None:
+            await self._openai_client.close()
+        if self._notion_http_client is not None:
+            await self._notion_http_client.aclose()
+            self._notion_http_client = None
+
+# 클라이언트 컨테이너를 만드는 함수. 실제 클라이언트는 처음 사용할 때 생성
+def initialize_clients() -> ClientContainer:
+    return ClientContainer()
@@ -4,18 +4,51 @@
 #                                                   #
 #####################################################
 
-from fastapi import Request
-from openai import AsyncOpenAI
-from langsmith import Client as LangSmithClient
+import hmac
+import os
+import httpx
+from fastapi import Header, HTTPException, Request
+from typing import TYPE_CHECKING, Optional
+from config.clients import AdaptiveLimiter
+
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
+    from langsmith import Client as LangSmithClient
+    from config.llm_cache import LLMResponseCache
 
 ##### 클라이언트 의존성 주입 함수 정의 #####
-# app.py lifespan 에서 초기화된 클라이언트를 반환
+# app.py lifespan 에서 만든 컨테이너의 클라이언트를 반환 (처음 요청될 때 생성됨)
 # Depends를 위한 헬퍼 함수
 
 # openai
-def get_openai_client(request: Request) -> AsyncOpenAI:
+def get_openai_client(request: Request) -> "AsyncOpenAI":
     return request.app.state.client_container.openai_client
 
+# openai 동시성 제한기
+def get_openai_limiter(request: Request) -> AdaptiveLimiter:
+    return request.app.state.client_container.openai_limiter
+
 # langsmith
-def get_langsmith_client(request: Request) -> LangSmithClient:
-    return request.app.state.client_container.langsmith_client
\ No newline at end of file
+def get_langsmith_client(request: Request) -> "LangSmithClient":
+    return request.app.state.client_container.langsmith_client
+
+# llm 응답 캐시 (openai 호출 앞단)
+def get_llm_cache(request: Request) -> "LLMResponseCache":
+    return request.app.state.client_container.llm_cache
+
+# notion api (공유 커넥션 풀)
+def get_notion_http_client(request: Request) -> httpx.AsyncClient:
+    return request.app.state.client_container.notion_http_client
+
+##### 관리자 엔드포인트 인증 #####
+# ADMIN_TOKEN 이 설정되지 않으면 관리자 엔드포인트는 없는 것처럼 404 로 응답
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+def is_admin_token(token: Optional[str]) -> bool:
+    return bool(ADMIN_TOKEN and token and hmac.compare_digest(token.encode("utf-8"), ADMIN_TOKEN.encode("utf-8")))
+
+def require_admin(x_admin_token: Optional[str] = Header(None)) -> None:
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not is_admin_token(x_admin_token):
+        raise HTTPException(status_code=401, detail="invalid admin token")
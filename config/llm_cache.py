@@ -0,0 +1,222 @@
+#####################################################
+#                                                   #
+#                  LLM 응답 캐시 정의                  #
+#                                                   #
+#####################################################
+
+# 같은 모델 + 메시지 + 파라미터로 들어온 요청은 이전 응답을 재사용합니다.
+#   - 키: 정규화한 요청 내용의 sha256
+#   - 메모리 LRU 계층 + 선택적 SQLite 디스크 계층, 항목별 TTL
+#   - 동시에 들어온 같은 요청은 OpenAI 호출 하나로 합침 (single-flight)
+# 로컬 가짜 서버로 시험할 때는 OPENAI_BASE_URL 환경변수로 AsyncOpenAI 의 주소를 바꿉니다.
+
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any, Dict, Optional, Tuple
+
+from config.metrics import LLM_CACHE_COALESCED, LLM_CACHE_LOOKUPS, LLM_CACHE_SIZE
+
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
+    from openai.types.chat import ChatCompletion
+
+    from config.clients import AdaptiveLimiter
+
+##### 캐시 설정 #####
+LLM_CACHE_CAPACITY = int(os.getenv("LLM_CACHE_CAPACITY", "1000"))
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", "3600"))
+# 1이면 data/llm_cache.db 에도 보관하여 재시작 후에도 재사용
+LLM_CACHE_PERSIST = os.getenv("LLM_CACHE_PERSIST", "0") == "1"
+LLM_CACHE_DB_FILE = os.path.join(os.getcwd(), "data", "llm_cache.db")
+
+# 응답 내용에 영향을 주지 않는 요청 옵션은 키에서 제외
+_REQUEST_OPTIONS = {"timeout", "extra_headers", "extra_query", "extra_body", "user", "stream", "stream_options"}
+
+
+def _normalize(value: Any) -> Any:
+    if isinstance(value, str):
+        return unicodedata.normalize("NFC", value).strip()
+    if isinstance(value, dict):
+        return {k: _normalize(v) for k, v in value.items() if v is not None}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    return value
+
+
+def cache_key(params: Dict[str, Any]) -> str:
+    """model + messages + 나머지 파라미터를 정규화한 digest를 반환합니다."""
+    normalized = {k: _normalize(v) for k, v in params.items() if k not in _REQUEST_OPTIONS and v is not None}
+    encoded = json.dumps(normalized, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+class LLMResponseCache:
+    """AsyncOpenAI chat completion 호출 앞에 두는 응답 캐시."""
+
+    def __init__(
+        self,
+        *,
+        capacity: int = 1000,
+        ttl: float = 3600.0,
+        db_file: Optional[str] = None,
+        limiter: Optional["AdaptiveLimiter"] = None,
+    ) -> None:
+        self._capacity = capacity
+        self._ttl = ttl
+        # 캐시 미스로 실제 OpenAI를 호출할 때만 동시성 제한을 거침
+        self._limiter = limiter
+        # key -> (응답, 만료 시각)
+        self._entries: "OrderedDict[str, Tuple[ChatCompletion, float]]" = OrderedDict()
+        self._in_flight: Dict[str, asyncio.Task] = {}
+
+        self._db_file = db_file
+        self._conn: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        self._db_writes = 0
+
+    # ------------------------------------------------------------------ 메모리 계층
+
+    def _lookup_memory(self, key: str, now: float) -> Optional["ChatCompletion"]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[1] <= now:
+            del self._entries[key]
+            LLM_CACHE_SIZE.set(len(self._entries))
+            return None
+        self._entries.move_to_end(key)
+        return entry[0]
+
+    def _remember(self, key: str, response: "ChatCompletion", expires_at: float) -> None:
+        if self._capacity <= 0:
+            return
+        self._entries[key] = (response, expires_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._capacity:
+            self._entries.popitem(last=False)
+        LLM_CACHE_SIZE.set(len(self._entries))
+
+    # ------------------------------------------------------------------ 디스크 계층
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self._db_file) or ".", exist_ok=True)
+            conn = sqlite3.connect(self._db_file, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, response TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._conn = conn
+        return self._conn
+
+    def _lookup_db(self, key: str, now: float) -> Optional[Tuple[str, float]]:
+        with self._db_lock:
+            row = self._connection().execute(
+                "SELECT response, expires_at FROM responses WHERE key = ? AND expires_at > ?", (key, now)
+            ).fetchone()
+        return (row[0], row[1]) if row else None
+
+    def _store_db(self, key: str, response: str, expires_at: float) -> None:
+        with self._db_lock:
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, response, expires_at) VALUES (?, ?, ?)",
+                (key, response, expires_at),
+            )
+            self._db_writes += 1
+            # 가끔씩 만료된 응답을 정리
+            if self._db_writes % 1000 == 0:
+                conn.execute("DELETE FROM responses WHERE expires_at <= ?", (time.time(),))
+
+    # ------------------------------------------------------------------ API
+
+    async def chat_completion(self, client: "AsyncOpenAI", *, ttl: Optional[float] = None, **params: Any) -> "ChatCompletion":
+        """client.chat.completions.create(**params) 와 같지만 같은 요청이면 캐시된 응답을 반환합니다.
+
+        ttl 로 이 응답의 보관 시간을 바꿀 수 있습니다. 스트리밍 요청은 캐시하지 않습니다.
+        """
+        response, _ = await self.lookup(client, ttl=ttl, **params)
+        return response
+
+    async def lookup(self, client: "AsyncOpenAI", *, ttl: Optional[float] = None, **params: Any) -> Tuple[Any, str]:
+        """chat_completion 과 같고, 응답과 함께 출처(memory, disk, coalesced, upstream)를 반환합니다.
+
+        토큰 비용은 upstream 인 경우에만 발생합니다.
+        """
+        if params.get("stream"):
+            return await client.chat.completions.create(**params), "upstream"
+
+        key = cache_key(params)
+        cached = self._lookup_memory(key, time.time())
+        if cached is not None:
+            LLM_CACHE_LOOKUPS.labels(result="memory").inc()
+            return cached, "memory"
+
+        # 같은 요청이 진행 중이면 그 결과를 공유. 기다리던 쪽이 취소되어도 호출은 유지
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._fill(client, key, params, self._ttl if ttl is None else ttl))
+            self._in_flight[key] = task
+            task.add_done_callback(lambda t: self._forget(key, t))
+            return await asyncio.shield(task)
+
+        LLM_CACHE_COALESCED.inc()
+        response, _ = await asyncio.shield(task)
+        return response, "coalesced"
+
+    def _forget(self, key: str, task: asyncio.Task) -> None:
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        if not task.cancelled():
+            task.exception()
+
+    async def _fill(self, client: "AsyncOpenAI", key: str, params: Dict[str, Any], ttl: float) -> Tuple["ChatCompletion", str]:
+        if self._db_file:
+            row = await asyncio.to_thread(self._lookup_db, key, time.time())
+            if row is not None:
+                from openai.types.chat import ChatCompletion
+
+                response = ChatCompletion.model_validate_json(row[0])
+                self._remember(key, response, row[1])
+                LLM_CACHE_LOOKUPS.labels(result="disk").inc()
+                return response, "disk"
+
+        LLM_CACHE_LOOKUPS.labels(result="miss").inc()
+        if self._limiter is None:
+            response = await client.chat.completions.create(**params)
+        else:
+            async with self._limiter.slot(
+                messages=params.get("messages"),
+                max_tokens=params.get("max_completion_tokens") or params.get("max_tokens"),
+            ) as permit:
+                response = await client.chat.completions.create(**params)
+                permit.settle(response.usage.total_tokens if response.usage else None)
+        expires_at = time.time() + ttl
+        if ttl > 0 and response.choices:
+            self._remember(key, response, expires_at)
+            if self._db_file:
+                await asyncio.to_thread(self._store_db, key, response.model_dump_json(), expires_at)
+        return response, "upstream"
+
+    def close(self) -> None:
+        with self._db_lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+def create_llm_cache(limiter: Optional["AdaptiveLimiter"] = None) -> LLMResponseCache:
+    return LLMResponseCache(
+        capacity=LLM_CACHE_CAPACITY,
+        ttl=LLM_CACHE_TTL,
+        db_file=LLM_CACHE_DB_FILE if LLM_CACHE_PERSIST else None,
+        limiter=limiter,
+    )
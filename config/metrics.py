@@ -0,0 +1,359 @@
+#####################################################
+#                                                   #
+#               Prometheus 메트릭 정의                 #
+#                                                   #
+#####################################################
+
+# 메트릭은 기본 레지스트리에 한 번만 등록되며,
+# app.py 의 Instrumentator().expose(app) 가 노출하는 /metrics 에 함께 포함됩니다.
+
+import os
+from typing import Any
+
+from prometheus_client import Counter, Gauge, Histogram
+
+
+##### 워크스페이스 등급 #####
+# 핫패스 메트릭은 워크스페이스 등급(레코드의 tier 값, PUT /admin/workspaces/{id}/tier 로 설정)으로 구분합니다.
+# 라벨 값이 늘어나지 않도록 목록에 없는 값은 기본 등급으로 취급합니다.
+
+WORKSPACE_TIERS = tuple(
+    t.strip() for t in os.getenv("NOTION_WORKSPACE_TIERS", "free,standard,enterprise").split(",") if t.strip()
+)
+DEFAULT_WORKSPACE_TIER = os.getenv("NOTION_DEFAULT_WORKSPACE_TIER", "standard")
+# 워크스페이스와 무관하거나 식별 전인 요청
+NO_TIER = "none"
+
+
+def normalize_tier(value: Any) -> str:
+    return value if value in WORKSPACE_TIERS else DEFAULT_WORKSPACE_TIER
+
+
+##### Notion 웹훅 #####
+
+# 웹훅 식별자 없이 저장된 시크릿을 순회하여 서명을 검증한 횟수
+NOTION_SIGNATURE_FALLBACK_SCANS = Counter(
+    "notion_webhook_signature_fallback_scans_total",
+    "Webhook signature verifications that fell back to scanning stored secrets",
+)
+# 순회로 일치하는 시크릿을 찾지 못해 거절한 횟수 (no_match: 전부 확인, scan_limit: 순회 한도에서 멈춤)
+NOTION_SIGNATURE_FALLBACK_REJECTS = Counter(
+    "notion_webhook_signature_fallback_rejects_total",
+    "Webhook deliveries without a webhook id rejected by the secret scan, by reason",
+    ["reason"],
+)
+
+
+##### Notion 이벤트 큐 #####
+
+NOTION_EVENT_QUEUE_DEPTH = Gauge(
+    "notion_event_queue_depth",
+    "Webhook events waiting in the durable queue (ready or leased)",
+)
+NOTION_EVENT_QUEUE_LAG = Histogram(
+    "notion_event_queue_lag_seconds",
+    "Delay between enqueueing a webhook event and a worker starting on it",
+    buckets=(0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300),
+)
+NOTION_EVENT_QUEUE_PROCESSED = Counter(
+    "notion_event_queue_processed_total",
+    "Webhook events taken off the queue, by result",
+    ["result"],
+)
+NOTION_EVENT_QUEUE_REJECTED = Counter(
+    "notion_event_queue_rejected_total",
+    "Webhook deliveries rejected because the queue was full",
+)
+NOTION_EVENT_WORKERS = Gauge(
+    "notion_event_workers",
+    "Configured webhook event workers",
+)
+NOTION_EVENT_WORKERS_BUSY = Gauge(
+    "notion_event_workers_busy",
+    "Webhook event workers currently running a handler",
+)
+NOTION_EVENT_ITEM_HANDLED = Counter(
+    "notion_event_item_handled_total",
+    "Webhook event items run through a registered handler, by handler and result",
+    ["handler", "result"],
+)
+NOTION_EVENT_ITEM_SECONDS = Histogram(
+    "notion_event_item_seconds",
+    "Time spent in a registered handler for one event item",
+    ["handler"],
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+
+
+##### Notion 중복 전달 캐시 #####
+
+NOTION_DEDUP_LOOKUPS = Counter(
+    "notion_webhook_dedup_lookups_total",
+    "Webhook delivery dedup lookups, by result (hit = duplicate delivery)",
+    ["result"],
+)
+NOTION_DEDUP_EVICTIONS = Counter(
+    "notion_webhook_dedup_evictions_total",
+    "Entries evicted from the in-memory webhook dedup cache, by reason",
+    ["reason"],
+)
+
+
+##### Notion HTTP 클라이언트 #####
+
+NOTION_HTTP_POOL_CONNECTIONS = Gauge(
+    "notion_http_pool_connections",
+    "Connections held by the shared Notion HTTP client pool, by state",
+    ["state"],
+)
+NOTION_HTTP_POOL_MAX_CONNECTIONS = Gauge(
+    "notion_http_pool_max_connections",
+    "Configured connection limit of the shared Notion HTTP client pool",
+)
+NOTION_HTTP_IN_FLIGHT = Gauge(
+    "notion_http_in_flight_requests",
+    "Requests currently sent through the shared Notion HTTP client, by host",
+    ["host"],
+)
+NOTION_HTTP_HOST_WAIT = Histogram(
+    "notion_http_host_wait_seconds",
+    "Time a request waited for a free per-host connection slot",
+    ["host"],
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+
+
+##### Notion API 호출 (속도 제한/재시도) #####
+
+NOTION_API_QUEUE_WAIT = Histogram(
+    "notion_api_rate_limit_wait_seconds",
+    "Time an outbound Notion API request waited for a rate-limit token",
+    buckets=(0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60),
+)
+NOTION_API_RETRIES = Counter(
+    "notion_api_retries_total",
+    "Outbound Notion API requests retried, by reason",
+    ["reason"],
+)
+NOTION_API_COALESCED = Counter(
+    "notion_api_coalesced_requests_total",
+    "GET requests served by joining an identical request already in flight",
+)
+NOTION_API_RESPONSES = Counter(
+    "notion_api_responses_total",
+    "Outbound Notion API responses, by method and status class",
+    ["method", "status"],
+)
+
+
+##### Notion 저장소 조회 캐시 #####
+
+NOTION_STORE_CACHE_LOOKUPS = Counter(
+    "notion_store_cache_lookups_total",
+    "Store read-cache lookups, by result",
+    ["result"],
+)
+NOTION_STORE_CACHE_HIT_RATIO = Gauge(
+    "notion_store_cache_hit_ratio",
+    "Fraction of store read-cache lookups served from the cache since start",
+)
+NOTION_STORE_CACHE_SIZE = Gauge(
+    "notion_store_cache_entries",
+    "Entries currently held in the store read cache",
+)
+
+
+##### Notion 페이지 캐시 #####
+
+NOTION_PAGE_CACHE_LOOKUPS = Counter(
+    "notion_page_cache_lookups_total",
+    "Page cache reads, by result (hit, miss, stale)",
+    ["result"],
+)
+NOTION_PAGE_CACHE_REFRESHES = Counter(
+    "notion_page_cache_refreshes_total",
+    "Page refreshes, by result (updated, unchanged, skipped, gone, error)",
+    ["result"],
+)
+NOTION_PAGE_CACHE_COALESCED = Counter(
+    "notion_page_cache_coalesced_events_total",
+    "Page change events folded into a refresh already waiting in the debounce window",
+)
+NOTION_PAGE_CACHE_ENTRIES = Gauge(
+    "notion_page_cache_entries",
+    "Pages currently held in the page cache",
+)
+NOTION_PAGE_CACHE_BYTES = Gauge(
+    "notion_page_cache_bytes",
+    "Approximate encoded size of the pages held in the page cache",
+)
+
+
+##### Notion 임베딩/검색 #####
+
+NOTION_EMBEDDING_ITEMS = Counter(
+    "notion_embedding_items_total",
+    "Pages handled by the embedding pipeline, by result (embedded, reused, unchanged, deleted, failed)",
+    ["result"],
+)
+NOTION_EMBEDDING_BATCH_SIZE = Histogram(
+    "notion_embedding_batch_size",
+    "Inputs sent per embeddings API request",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 2048),
+)
+NOTION_EMBEDDING_PENDING = Gauge(
+    "notion_embedding_pending",
+    "Pages waiting for the next embedding batch",
+)
+NOTION_EMBEDDING_SEARCH_SECONDS = Histogram(
+    "notion_embedding_search_seconds",
+    "Top-k similarity scan time over a workspace index (excludes query embedding)",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1),
+)
+
+
+##### 트레이스 전송 #####
+
+TRACE_SPANS_EXPORTED = Counter(
+    "trace_spans_exported_total",
+    "Trace spans handed to the trace sink in a batch",
+)
+TRACE_SPANS_DROPPED = Counter(
+    "trace_spans_dropped_total",
+    "Trace spans discarded before export, by reason (buffer_full, export_error, shutdown)",
+    ["reason"],
+)
+TRACE_BUFFERED = Gauge(
+    "trace_spans_buffered",
+    "Finished trace spans waiting for the next export batch",
+)
+TRACE_EXPORT_SECONDS = Histogram(
+    "trace_export_seconds",
+    "Time to send one batch of trace spans",
+    buckets=(0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+PROFILER_SAMPLES = Counter(
+    "profiler_samples_total",
+    "Stack samples taken by the on-demand sampling profiler",
+)
+
+
+##### LLM 응답 캐시 #####
+
+LLM_CACHE_LOOKUPS = Counter(
+    "llm_cache_lookups_total",
+    "LLM response cache lookups, by tier that answered (memory, disk, miss)",
+    ["result"],
+)
+LLM_CACHE_COALESCED = Counter(
+    "llm_cache_coalesced_requests_total",
+    "LLM requests that joined an identical request already in flight",
+)
+LLM_CACHE_SIZE = Gauge(
+    "llm_cache_entries",
+    "Entries currently held in the in-memory LLM response cache",
+)
+
+
+##### OpenAI 동시성 제한 #####
+
+OPENAI_LIMITER_LIMIT = Gauge(
+    "openai_limiter_concurrency_limit",
+    "Current adaptive limit on in-flight OpenAI requests",
+)
+OPENAI_LIMITER_IN_FLIGHT = Gauge(
+    "openai_limiter_in_flight",
+    "OpenAI requests currently holding a limiter slot",
+)
+OPENAI_LIMITER_QUEUED = Gauge(
+    "openai_limiter_queued",
+    "OpenAI requests waiting for a limiter slot",
+)
+OPENAI_LIMITER_QUEUE_WAIT = Histogram(
+    "openai_limiter_queue_wait_seconds",
+    "Time an OpenAI request waited for a limiter slot",
+    buckets=(0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+OPENAI_LIMITER_SHED = Counter(
+    "openai_limiter_shed_total",
+    "OpenAI requests rejected by the limiter, by reason",
+    ["reason"],
+)
+OPENAI_LIMITER_RATE_LIMITED = Counter(
+    "openai_limiter_rate_limited_total",
+    "429 responses received from OpenAI",
+)
+OPENAI_LIMITER_TPM_AVAILABLE = Gauge(
+    "openai_limiter_tpm_tokens_available",
+    "Estimated tokens left in the tokens-per-minute budget",
+)
+OPENAI_LIMITER_LATENCY_BASELINE = Gauge(
+    "openai_limiter_latency_baseline_seconds",
+    "Baseline OpenAI latency the limiter compares new samples against",
+)
+
+
+
+##### 핫패스 (워크스페이스 등급별) #####
+
+# 마이크로초 단위부터 보는 지연 버킷
+_FAST_BUCKETS = (0.00001, 0.00005, 0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5)
+
+NOTION_STORE_OP_SECONDS = Histogram(
+    "notion_store_op_seconds",
+    "Store backend operation latency (reads that missed the cache, writes), by operation and tier",
+    ["op", "tier"],
+    buckets=_FAST_BUCKETS,
+)
+NOTION_STORE_OP_BYTES = Histogram(
+    "notion_store_op_bytes",
+    "Serialized record bytes read from or written to the store backend, by operation and tier",
+    ["op", "tier"],
+    buckets=(64, 256, 1024, 4096, 16384, 65536, 262144, 1048576),
+)
+NOTION_WEBHOOK_HMAC_SECONDS = Histogram(
+    "notion_webhook_hmac_verify_seconds",
+    "Time spent verifying a webhook signature after the body was received, by tier",
+    ["tier"],
+    buckets=_FAST_BUCKETS,
+)
+NOTION_WEBHOOK_SECRETS_TRIED = Histogram(
+    "notion_webhook_secrets_tried",
+    "Webhook secrets tried to verify one delivery, by tier",
+    ["tier"],
+    buckets=(0, 1, 2, 4, 8, 16, 32, 64, 128, 256, 1024),
+)
+NOTION_WEBHOOK_EVENTS_PER_DELIVERY = Histogram(
+    "notion_webhook_events_per_delivery",
+    "Events carried by one accepted webhook delivery, by tier",
+    ["tier"],
+    buckets=(1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 5000),
+)
+NOTION_EVENT_HANDLER_SECONDS = Histogram(
+    "notion_event_handler_seconds",
+    "Time spent in the webhook event handler per queued event, by tier",
+    ["tier"],
+    buckets=_FAST_BUCKETS,
+)
+OPENAI_REQUEST_SECONDS = Histogram(
+    "openai_request_seconds",
+    "OpenAI chat completion latency as seen by the caller, by model, source and tier",
+    ["model", "source", "tier"],
+    buckets=(0.005, 0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 20, 40, 80),
+)
+OPENAI_TOKENS = Counter(
+    "openai_tokens_total",
+    "Tokens billed by OpenAI, by model, kind (prompt, completion) and tier",
+    ["model", "kind", "tier"],
+)
+
+
+def init_tier_metrics() -> None:
+    """앱 시작 시 등급별 시계열을 0으로 미리 만들어 대시보드/알림이 처음부터 값을 보게 합니다."""
+    for tier in WORKSPACE_TIERS + (NO_TIER,):
+        NOTION_WEBHOOK_HMAC_SECONDS.labels(tier=tier)
+        NOTION_WEBHOOK_SECRETS_TRIED.labels(tier=tier)
+        NOTION_WEBHOOK_EVENTS_PER_DELIVERY.labels(tier=tier)
+        NOTION_EVENT_HANDLER_SECONDS.labels(tier=tier)
+        for op in ("read", "scan", "secret_lookup", "write", "durable_write"):
+            NOTION_STORE_OP_SECONDS.labels(op=op, tier=tier)
@@ -0,0 +1,198 @@
+#####################################################
+#                                                   #
+#              요청 구간 샘플링 프로파일러               #
+#                                                   #
+#####################################################
+
+# 관리자 엔드포인트(admin/router.py)로 켜면, 다음 N개 요청이 끝나거나 지정한 시간이 지날 때까지
+# 별도 스레드가 일정 간격으로 스택을 채취합니다.
+#   - 기본은 이벤트 루프 스레드만, all_threads 면 asyncio.to_thread 작업 스레드 등도 함께 채취
+#   - 채취 중에는 코드 객체 튜플로 세기만 하고, 끝난 뒤 한 번만 "a;b;c 개수" 형식(folded stack)으로 바꿉니다.
+#     flamegraph.pl, speedscope 등에 그대로 넣을 수 있습니다.
+#   - 꺼져 있을 때 요청마다 드는 비용은 속성 확인 하나입니다.
+
+import asyncio
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+from config.metrics import PROFILER_SAMPLES
+from logs.logging_util import LoggerSingleton
+import logging
+
+
+logger = LoggerSingleton.get_logger(logger_name="profiler", level=logging.INFO)
+
+##### 설정 #####
+# 스택 채취 간격(초)
+_INTERVAL = float(os.getenv("PROFILER_INTERVAL", "0.005"))
+# 한 번에 프로파일링할 수 있는 최대 시간(초). 요청 수만 지정해도 이 시간이 지나면 끝냄
+PROFILER_MAX_SECONDS = float(os.getenv("PROFILER_MAX_SECONDS", "120"))
+
+# 보고서에 넣을 함수별 상위 항목 수
+_TOP_FRAMES = 30
+
+StackKey = Tuple[Optional[int], Tuple[Any, ...]]
+
+
+class ProfilerBusy(Exception):
+    pass
+
+
+# 경로는 sys.path 기준 상대 경로로 줄여 표시
+_PATH_PREFIXES = sorted(
+    {os.path.join(os.path.abspath(p), "") for p in sys.path if p},
+    key=len,
+    reverse=True,
+)
+
+
+def _short_path(filename: str) -> str:
+    for prefix in _PATH_PREFIXES:
+        if filename.startswith(prefix):
+            return filename[len(prefix):]
+    return filename
+
+
+def _frame_label(code: Any) -> str:
+    # folded 형식에서 ';' 는 프레임 구분자
+    name = getattr(code, "co_qualname", code.co_name)
+    return f"{name} ({_short_path(code.co_filename)}:{code.co_firstlineno})".replace(";", ",")
+
+
+class _Session:
+    def __init__(self, loop_thread: int, requests: Optional[int], all_threads: bool) -> None:
+        self.loop_thread = loop_thread
+        self.target_requests = requests
+        self.all_threads = all_threads
+        self.requests = 0
+        self.samples = 0
+        self.counts: "Counter[StackKey]" = Counter()
+        self.done = asyncio.Event()
+        self.stop = threading.Event()
+
+
+class SamplingProfiler:
+    """한 번에 한 구간만 프로파일링합니다."""
+
+    def __init__(self, *, interval: float = 0.005) -> None:
+        self._interval = interval
+        self._session: Optional[_Session] = None
+
+    @property
+    def active(self) -> bool:
+        return self._session is not None
+
+    def request_finished(self) -> None:
+        session = self._session
+        if session is None:
+            return
+        session.requests += 1
+        if session.target_requests is not None and session.requests >= session.target_requests:
+            session.done.set()
+
+    async def profile(
+        self, *, seconds: Optional[float] = None, requests: Optional[int] = None, all_threads: bool = False
+    ) -> Dict[str, Any]:
+        """requests 개 요청이 끝나거나 seconds 가 지날 때까지 채취하고 보고서를 반환합니다."""
+        if self._session is not None:
+            raise ProfilerBusy()
+        limit = min(seconds, PROFILER_MAX_SECONDS) if seconds else PROFILER_MAX_SECONDS
+        session = _Session(threading.get_ident(), requests, all_threads)
+        self._session = session
+        sampler = threading.Thread(target=self._sample, args=(session,), name="profiler", daemon=True)
+        logger.info("프로파일링 시작 seconds=%s requests=%s all_threads=%s", limit, requests, all_threads)
+        started = time.perf_counter()
+        sampler.start()
+        try:
+            await asyncio.wait_for(session.done.wait(), limit)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            session.stop.set()
+            self._session = None
+            await asyncio.to_thread(sampler.join)
+        elapsed = time.perf_counter() - started
+        PROFILER_SAMPLES.inc(session.samples)
+        logger.info("프로파일링 종료 seconds=%.1f requests=%d samples=%d", elapsed, session.requests, session.samples)
+        # 스택 수가 많으면 변환에 시간이 걸리므로 스레드에서
+        return await asyncio.to_thread(self._report, session, elapsed)
+
+    def _sample(self, session: _Session) -> None:
+        own = threading.get_ident()
+        counts = session.counts
+        while not session.stop.wait(self._interval):
+            frames = sys._current_frames()
+            if session.all_threads:
+                targets = [(ident, frame) for ident, frame in frames.items() if ident != own]
+            else:
+                frame = frames.get(session.loop_thread)
+                targets = [(None, frame)] if frame is not None else []
+            for ident, frame in targets:
+                stack = []
+                while frame is not None:
+                    stack.append(frame.f_code)
+                    frame = frame.f_back
+                stack.reverse()
+                counts[(ident, tuple(stack))] += 1
+            session.samples += 1
+            del frames, targets
+
+    def _report(self, session: _Session, elapsed: float) -> Dict[str, Any]:
+        thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+        labels: Dict[Any, str] = {}
+
+        def label(code: Any) -> str:
+            text = labels.get(code)
+            if text is None:
+                text = labels[code] = _frame_label(code)
+            return text
+
+        folded: List[Tuple[str, int]] = []
+        self_counts: "Counter[str]" = Counter()
+        total_counts: "Counter[str]" = Counter()
+        for (ident, stack), count in session.counts.items():
+            frames = [label(code) for code in stack]
+            if ident is not None:
+                frames.insert(0, f"[{thread_names.get(ident, f'thread-{ident}')}]")
+            folded.append((";".join(frames), count))
+            if stack:
+                self_counts[frames[-1]] += count
+            for frame in set(frames):
+                total_counts[frame] += count
+        folded.sort(key=lambda item: item[1], reverse=True)
+
+        return {
+            "seconds": round(elapsed, 3),
+            "requests": session.requests,
+            "samples": session.samples,
+            "interval_ms": self._interval * 1000,
+            "threads": "all" if session.all_threads else "event_loop",
+            "top": [
+                {"frame": frame, "self": count, "total": total_counts[frame]}
+                for frame, count in self_counts.most_common(_TOP_FRAMES)
+            ],
+            "folded": [f"{stack} {count}" for stack, count in folded],
+        }
+
+
+profiler = SamplingProfiler(interval=_INTERVAL)
+
+
+class ProfilerMiddleware:
+    """프로파일링 중에 끝난 요청 수를 셉니다."""
+
+    def __init__(self, app: Any) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http" or not profiler.active:
+            await self.app(scope, receive, send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            profiler.request_finished()
@@ -0,0 +1,50 @@
+#####################################################
+#                                                   #
+#               기동 시간 측정 및 준비 상태              #
+#                                                   #
+#####################################################
+
+# 기동 단계(import, lifespan 의 각 단계, 클라이언트 미리 데우기)에 걸린 시간을 모아
+# 기동이 끝나면 한 줄로 로그에 남기고, /ready 응답에도 담습니다.
+
+import os
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List
+
+##### 설정 #####
+# 기동 직후 미리 만들 클라이언트 (쉼표 구분, all 이면 전부). 끝날 때까지 /ready 는 503
+STARTUP_PREWARM = [c.strip() for c in os.getenv("STARTUP_PREWARM", "").split(",") if c.strip()]
+
+
+class StartupTimer:
+    def __init__(self) -> None:
+        self.phases: "OrderedDict[str, float]" = OrderedDict()
+        self.started_at = time.time()
+        self.ready = False
+
+    def record(self, name: str, seconds: float) -> None:
+        self.phases[name] = seconds
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - started)
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "phases_ms": {name: round(seconds * 1000, 1) for name, seconds in self.phases.items()},
+            "total_ms": round(sum(self.phases.values()) * 1000, 1),
+        }
+
+    def summary(self) -> str:
+        parts: List[str] = [f"{name}={seconds * 1000:.1f}ms" for name, seconds in self.phases.items()]
+        return f"기동 시간 total={sum(self.phases.values()) * 1000:.1f}ms " + " ".join(parts)
+
+
+startup_timer = StartupTimer()
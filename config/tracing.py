@@ -0,0 +1,339 @@
+#####################################################
+#                                                   #
+#           요청 트레이스 수집 및 LangSmith 전송          #
+#                                                   #
+#####################################################
+
+# 요청 하나를 루트 스팬으로 두고, 웹훅 서명 검증 / 저장소 접근 / 이벤트 핸들러 / OpenAI 호출을 하위 스팬으로 기록합니다.
+#   - 스팬은 끝날 때 메모리 버퍼에 넣기만 하고, 백그라운드 태스크가 모아서 LangSmith 로 한 번에 보냅니다.
+#     (요청 처리 경로에서는 네트워크 I/O 가 없음)
+#   - 버퍼가 가득 차면 새 스팬을 버리고 trace_spans_dropped_total 로 셉니다.
+#   - 표본 추출은 루트 스팬에서 정하며, 빠진 요청은 하위 스팬도 만들지 않습니다.
+#   - 전송 함수(sink)는 교체할 수 있어 테스트에서는 목록에 모으는 함수나 로컬 대역 서버(bench/stubs.py)를 씁니다.
+#
+# 사용 예
+#   with start_span("store.read", run_type="tool", root=False, table="workspace"):
+#       ...
+#   s = start_span("openai.chat", run_type="llm")   # 스트리밍처럼 with 블록으로 감쌀 수 없는 경우
+#   ...
+#   s.finish(error)
+
+import asyncio
+import os
+import random
+import threading
+import time
+import uuid
+from collections import deque
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Any, Callable, Deque, Dict, List, Optional, Union
+
+from config.metrics import (
+    TRACE_BUFFERED,
+    TRACE_EXPORT_SECONDS,
+    TRACE_SPANS_DROPPED,
+    TRACE_SPANS_EXPORTED,
+)
+from logs.logging_util import LoggerSingleton
+import logging
+
+
+logger = LoggerSingleton.get_logger(logger_name="tracing", level=logging.INFO)
+
+##### 설정 #####
+# LangSmith SDK 와 같은 환경 변수로 켜고 끔
+TRACING_ENABLED = os.getenv("LANGSMITH_TRACING", "false").lower() == "true"
+TRACE_PROJECT = os.getenv("LANGSMITH_PROJECT", "easyconnect")
+# 루트 스팬(요청, 이벤트 처리) 표본 비율
+_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "1.0"))
+# 전송 전 버퍼에 둘 최대 스팬 수
+_BUFFER_SIZE = int(os.getenv("TRACE_BUFFER_SIZE", "10000"))
+# 한 번에 보낼 최대 스팬 수 / 버퍼가 이만큼 차지 않아도 보내는 주기(초)
+_BATCH_SIZE = int(os.getenv("TRACE_BATCH_SIZE", "200"))
+_FLUSH_INTERVAL = float(os.getenv("TRACE_FLUSH_INTERVAL", "2"))
+# 루트 스팬을 만들지 않을 경로 (스크레이프/헬스 체크)
+_EXCLUDE_PATHS = frozenset(
+    p.strip() for p in os.getenv("TRACE_EXCLUDE_PATHS", "/metrics,/ready").split(",") if p.strip()
+)
+
+# 배치를 받아 전송하는 함수. 전송 스레드에서 호출됨
+TraceSink = Callable[[List[Dict[str, Any]]], None]
+
+
+def _iso(ts: float) -> str:
+    return datetime.fromtimestamp(ts, timezone.utc).isoformat()
+
+
+class Span:
+    """끝난 뒤 버퍼로 들어가는 스팬. 부모는 참조로만 들고 있다가 전송할 때 LangSmith 형식으로 바꿉니다."""
+
+    __slots__ = (
+        "id", "trace_id", "parent", "name", "run_type", "inputs", "outputs", "error",
+        "start", "end", "_perf", "_token", "_dotted_order",
+    )
+
+    def __init__(self, name: str, run_type: str, parent: Optional["Span"], inputs: Dict[str, Any]) -> None:
+        self.id = uuid.uuid4()
+        self.parent = parent
+        self.trace_id = parent.trace_id if parent is not None else self.id
+        self.name = name
+        self.run_type = run_type
+        self.inputs = inputs
+        self.outputs: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self.start = time.time()
+        self.end: Optional[float] = None
+        self._perf = time.perf_counter()
+        self._token = None
+        self._dotted_order: Optional[str] = None
+
+    def set(self, **outputs: Any) -> None:
+        if self.outputs is None:
+            self.outputs = outputs
+        else:
+            self.outputs.update(outputs)
+
+    def finish(self, error: Optional[BaseException] = None) -> None:
+        if self.end is not None:
+            return
+        # 벽시계는 시작 시각만 읽고 길이는 단조 시계로 잼
+        self.end = self.start + (time.perf_counter() - self._perf)
+        if error is not None:
+            self.error = f"{type(error).__name__}: {error}"
+        trace_exporter.submit(self)
+
+    def __enter__(self) -> "Span":
+        self._token = _CURRENT.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        try:
+            _CURRENT.reset(self._token)
+        except ValueError:
+            # 다른 컨텍스트에서 닫히는 경우(스트리밍 응답 등)
+            _CURRENT.set(self.parent)
+        self.finish(exc)
+        return False
+
+    def dotted_order(self) -> str:
+        if self._dotted_order is None:
+            own = datetime.fromtimestamp(self.start, timezone.utc).strftime("%Y%m%dT%H%M%S%fZ") + str(self.id)
+            self._dotted_order = own if self.parent is None else f"{self.parent.dotted_order()}.{own}"
+        return self._dotted_order
+
+    def to_run(self, project: str) -> Dict[str, Any]:
+        return {
+            "id": str(self.id),
+            "trace_id": str(self.trace_id),
+            "parent_run_id": str(self.parent.id) if self.parent is not None else None,
+            "dotted_order": self.dotted_order(),
+            "name": self.name,
+            "run_type": self.run_type,
+            "start_time": _iso(self.start),
+            "end_time": _iso(self.end if self.end is not None else self.start),
+            "inputs": self.inputs,
+            "outputs": self.outputs or {},
+            "error": self.error,
+            "session_name": project,
+        }
+
+
+class _NoopSpan:
+    """추적하지 않을 때 쓰는 빈 스팬. 표본에서 빠진 루트는 컨텍스트에 표시만 남겨 하위 스팬을 막습니다."""
+
+    __slots__ = ("_mark", "_token")
+
+    def __init__(self, mark: bool = False) -> None:
+        self._mark = mark
+        self._token = None
+
+    def set(self, **outputs: Any) -> None:
+        pass
+
+    def finish(self, error: Optional[BaseException] = None) -> None:
+        pass
+
+    def __enter__(self) -> "_NoopSpan":
+        if self._mark:
+            self._token = _CURRENT.set(_SKIPPED)
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        if self._token is not None:
+            try:
+                _CURRENT.reset(self._token)
+            except ValueError:
+                _CURRENT.set(None)
+            self._token = None
+        return False
+
+
+_NOOP = _NoopSpan()
+_SKIPPED: Any = object()
+_CURRENT: ContextVar[Any] = ContextVar("trace_span", default=None)
+
+AnySpan = Union[Span, _NoopSpan]
+
+
+def start_span(name: str, run_type: str = "chain", *, root: bool = True, **inputs: Any) -> AnySpan:
+    """스팬을 시작합니다. with 로 쓰면 하위 스팬의 부모가 되고, 아니면 finish() 로 닫습니다.
+
+    root=False 이면 진행 중인 트레이스 안에서만 기록합니다 (백그라운드 저장소 조회 등은 제외).
+    """
+    if not trace_exporter.running:
+        return _NOOP
+    parent = _CURRENT.get()
+    if parent is _SKIPPED:
+        return _NOOP
+    if parent is None:
+        if not root:
+            return _NOOP
+        if _SAMPLE_RATE < 1.0 and random.random() >= _SAMPLE_RATE:
+            return _NoopSpan(mark=True)
+    return Span(name, run_type, parent, inputs)
+
+
+class TraceExporter:
+    """끝난 스팬을 모아 sink 로 배치 전송합니다. 전송은 스레드에서 하여 이벤트 루프를 막지 않습니다."""
+
+    def __init__(
+        self,
+        *,
+        project: str = "easyconnect",
+        buffer_size: int = 10000,
+        batch_size: int = 200,
+        flush_interval: float = 2.0,
+    ) -> None:
+        self._project = project
+        self._buffer_size = max(1, buffer_size)
+        self._batch_size = max(1, batch_size)
+        self._flush_interval = flush_interval
+        self._buffer: Deque[Span] = deque()
+        self._sink: Optional[TraceSink] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: Optional[int] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        # labels() 조회를 스팬마다 하지 않도록 미리 만들어 둠
+        self._dropped = {
+            reason: TRACE_SPANS_DROPPED.labels(reason=reason) for reason in ("buffer_full", "export_error", "shutdown")
+        }
+        TRACE_BUFFERED.set_function(lambda: len(self._buffer))
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    def bind(self, sink: TraceSink) -> None:
+        self._sink = sink
+
+    def submit(self, span_: Span) -> None:
+        if len(self._buffer) >= self._buffer_size:
+            self._dropped["buffer_full"].inc()
+            return
+        self._buffer.append(span_)
+        if len(self._buffer) == self._batch_size and self._wake is not None:
+            if threading.get_ident() == self._loop_thread:
+                self._wake.set()
+            else:
+                self._loop.call_soon_threadsafe(self._wake.set)
+
+    async def start(self) -> None:
+        if self._task is not None:
+            return
+        if self._sink is None:
+            raise RuntimeError("TraceExporter is not bound to a sink")
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+        self._wake = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self._flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            await self.flush()
+
+    def _take(self) -> List[Span]:
+        batch: List[Span] = []
+        while self._buffer and len(batch) < self._batch_size:
+            batch.append(self._buffer.popleft())
+        return batch
+
+    def _send(self, batch: List[Span]) -> None:
+        # LangSmith 형식 변환도 전송 스레드에서
+        self._sink([s.to_run(self._project) for s in batch])
+
+    async def flush(self) -> None:
+        """버퍼의 스팬을 모두 보냅니다. 실패한 배치는 다시 보내지 않고 버립니다."""
+        while self._buffer:
+            batch = self._take()
+            started = time.perf_counter()
+            try:
+                await asyncio.to_thread(self._send, batch)
+            except Exception as e:
+                self._dropped["export_error"].inc(len(batch))
+                logger.warning("트레이스 전송 실패 spans=%d buffered=%d: %r", len(batch), len(self._buffer), e)
+                return
+            finally:
+                TRACE_EXPORT_SECONDS.observe(time.perf_counter() - started)
+            TRACE_SPANS_EXPORTED.inc(len(batch))
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        """전송 태스크를 멈추고 남은 스팬을 보냅니다. 제한 시간을 넘기면 나머지는 버립니다."""
+        if self._task is None:
+            return
+        task, self._task = self._task, None
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        try:
+            await asyncio.wait_for(self.flush(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning("종료 중 트레이스 전송 시간 초과 dropped=%d", len(self._buffer))
+        if self._buffer:
+            self._dropped["shutdown"].inc(len(self._buffer))
+            self._buffer.clear()
+
+
+def langsmith_sink(client_provider: Callable[[], Any]) -> TraceSink:
+    """LangSmith 클라이언트로 배치를 보내는 sink. 표본 추출은 이미 했으므로 pre_sampled 로 보냅니다."""
+    def send(runs: List[Dict[str, Any]]) -> None:
+        client_provider().batch_ingest_runs(create=runs, pre_sampled=True)
+    return send
+
+
+trace_exporter = TraceExporter(
+    project=TRACE_PROJECT,
+    buffer_size=_BUFFER_SIZE,
+    batch_size=_BATCH_SIZE,
+    flush_interval=_FLUSH_INTERVAL,
+)
+
+
+class TracingMiddleware:
+    """HTTP 요청마다 루트 스팬을 엽니다. 추적이 꺼져 있으면 그대로 통과시킵니다."""
+
+    def __init__(self, app: Any) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http" or not trace_exporter.running or scope["path"] in _EXCLUDE_PATHS:
+            await self.app(scope, receive, send)
+            return
+
+        with start_span(f"{scope['method']} {scope['path']}", method=scope["method"], path=scope["path"]) as root:
+            status = {"code": 500}
+
+            async def send_with_status(message: Dict[str, Any]) -> None:
+                if message["type"] == "http.response.start":
+                    status["code"] = message["status"]
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_with_status)
+            finally:
+                root.set(status_code=status["code"])
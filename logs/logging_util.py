@@ -0,0 +1,209 @@
+#####################################################
+#                                                   #
+#                  로거 생성 및 관리                    #
+#                                                   #
+#####################################################
+
+# 모든 모듈은 LoggerSingleton.get_logger 로 로거를 받습니다.
+#   - 로거는 QueueHandler 에 기록만 넘기고, 실제 포맷/출력은 백그라운드 리스너 스레드가 합니다.
+#     이벤트 루프에서는 stdout 쓰기나 메시지 포맷(% 치환) 비용이 들지 않습니다.
+#   - 출력은 한 줄에 하나의 JSON 객체입니다 (LOG_FORMAT=text 이면 사람이 읽는 형식).
+#   - 큐가 가득 차면 기다리지 않고 버리며, 버린 개수는 다음 출력에 경고로 남깁니다.
+#   - 항목마다 찍히는 핫패스 로그는 get_sampled_logger 로 초당 개수/표본 비율을 제한합니다.
+#
+# 포맷은 리스너 스레드에서 하므로, 로그 인자로 넘긴 객체를 기록 직후 바꾸면 바뀐 값이 찍힐 수 있습니다.
+
+import atexit
+import datetime
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import threading
+import time
+from typing import Any, Dict, Optional
+
+##### 설정 #####
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+# 지정하면 get_logger 의 level 인자보다 우선
+LOG_LEVEL = os.getenv("LOG_LEVEL")
+
+# LogRecord 기본 속성. 이 밖의 속성(extra=...)은 JSON 필드로 그대로 출력
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "taskName"}
+
+
+class JsonFormatter(logging.Formatter):
+    """기록 하나를 JSON 한 줄로 만듭니다."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "ts": datetime.datetime.fromtimestamp(record.created, datetime.timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        if record.stack_info:
+            entry["stack"] = self.formatStack(record.stack_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class _NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """포맷하지 않고 기록을 그대로 큐에 넣는 핸들러. 큐가 가득 차면 버립니다."""
+
+    def __init__(self, log_queue: "queue.Queue[logging.LogRecord]") -> None:
+        super().__init__(log_queue)
+        self._dropped = 0
+        self._dropped_lock = threading.Lock()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # 기본 구현은 여기서 메시지를 포맷하지만, 같은 프로세스의 리스너가 원본을 받으므로 미룸
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        if self._dropped:
+            with self._dropped_lock:
+                dropped, self._dropped = self._dropped, 0
+            if dropped:
+                notice = logging.LogRecord(
+                    record.name, logging.WARNING, __file__, 0, "로그 큐가 가득 차 %d건을 버림", (dropped,), None
+                )
+                try:
+                    self.queue.put_nowait(notice)
+                except queue.Full:
+                    with self._dropped_lock:
+                        self._dropped += dropped
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with self._dropped_lock:
+                self._dropped += 1
+
+
+class SampledLogger:
+    """초당 개수와 표본 비율로 출력을 제한하는 로거 래퍼.
+
+    제한에 걸린 호출은 레벨 확인과 카운터 증가만 하고 돌아가며,
+    그동안 건너뛴 개수는 다음으로 출력되는 기록의 suppressed 필드에 담깁니다.
+    인자를 만드는 비용이 큰 경우 `if sampled.should_log(): sampled.info(...)` 처럼 먼저 확인하세요.
+    """
+
+    def __init__(self, logger: logging.Logger, *, rate: float, burst: float, sample: float) -> None:
+        self.logger = logger
+        self._rate = rate
+        self._burst = max(1.0, burst)
+        self._sample = sample
+        self._tokens = self._burst
+        self._updated = time.monotonic()
+        self._suppressed = 0
+        self._lock = threading.Lock()
+        self._allowed = False
+
+    def should_log(self, level: int = logging.INFO) -> bool:
+        """이번 호출을 출력할지 정합니다. True 를 받았으면 바로 다음 로그 호출이 출력됩니다."""
+        if not self.logger.isEnabledFor(level):
+            return False
+        with self._lock:
+            if self._allowed:
+                return True
+            if self._sample < 1.0 and random.random() >= self._sample:
+                self._suppressed += 1
+                return False
+            if self._rate > 0:
+                now = time.monotonic()
+                self._tokens = min(self._burst, self._tokens + (now - self._updated) * self._rate)
+                self._updated = now
+                if self._tokens < 1.0:
+                    self._suppressed += 1
+                    return False
+                self._tokens -= 1.0
+            self._allowed = True
+            return True
+
+    def log(self, level: int, msg: str, *args: Any, **kwargs: Any) -> None:
+        if not self.should_log(level):
+            return
+        with self._lock:
+            self._allowed = False
+            suppressed, self._suppressed = self._suppressed, 0
+        if suppressed:
+            kwargs["extra"] = {**kwargs.get("extra", {}), "suppressed": suppressed}
+        kwargs.setdefault("stacklevel", 2)
+        self.logger.log(level, msg, *args, **kwargs)
+
+    def debug(self, msg: str, *args: Any, **kwargs: Any) -> None:
+        kwargs.setdefault("stacklevel", 3)
+        self.log(logging.DEBUG, msg, *args, **kwargs)
+
+    def info(self, msg: str, *args: Any, **kwargs: Any) -> None:
+        kwargs.setdefault("stacklevel", 3)
+        self.log(logging.INFO, msg, *args, **kwargs)
+
+    def warning(self, msg: str, *args: Any, **kwargs: Any) -> None:
+        kwargs.setdefault("stacklevel", 3)
+        self.log(logging.WARNING, msg, *args, **kwargs)
+
+
+class LoggerSingleton:
+    """프로세스 전체가 하나의 로그 큐와 리스너 스레드를 공유하도록 로거를 만들어 줍니다."""
+
+    _lock = threading.Lock()
+    _loggers: Dict[str, logging.Logger] = {}
+    _handler: Optional[_NonBlockingQueueHandler] = None
+    _listener: Optional[logging.handlers.QueueListener] = None
+
+    @classmethod
+    def _queue_handler(cls) -> _NonBlockingQueueHandler:
+        if cls._handler is None:
+            output = logging.StreamHandler(sys.stdout)
+            if LOG_FORMAT == "text":
+                output.setFormatter(logging.Formatter("%(asctime)s %(levelname)s [%(name)s] %(message)s"))
+            else:
+                output.setFormatter(JsonFormatter())
+            log_queue: "queue.Queue[logging.LogRecord]" = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+            cls._listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=True)
+            cls._listener.start()
+            cls._handler = _NonBlockingQueueHandler(log_queue)
+            atexit.register(cls.shutdown)
+        return cls._handler
+
+    @classmethod
+    def get_logger(cls, logger_name: str, level: int = logging.INFO) -> logging.Logger:
+        with cls._lock:
+            logger = cls._loggers.get(logger_name)
+            if logger is None:
+                logger = logging.getLogger(logger_name)
+                logger.setLevel(LOG_LEVEL.upper() if LOG_LEVEL else level)
+                logger.addHandler(cls._queue_handler())
+                logger.propagate = False
+                cls._loggers[logger_name] = logger
+            return logger
+
+    @classmethod
+    def get_sampled_logger(
+        cls,
+        logger_name: str,
+        level: int = logging.INFO,
+        *,
+        rate: float = 10.0,
+        burst: float = 50.0,
+        sample: float = 1.0,
+    ) -> SampledLogger:
+        """rate: 초당 최대 출력 수 (0이면 제한 없음), burst: 순간 허용량, sample: 출력 후보로 남길 비율."""
+        return SampledLogger(cls.get_logger(logger_name, level), rate=rate, burst=burst, sample=sample)
+
+    @classmethod
+    def shutdown(cls) -> None:
+        """큐에 남은 기록을 모두 출력하고 리스너 스레드를 멈춥니다."""
+        with cls._lock:
+            listener, cls._listener = cls._listener, None
+        if listener is not None:
+            listener.stop()
@@ -7,30 +7,158 @@
 from fastapi import APIRouter
 from config.dependencies import (
     get_openai_client,
-    get_langsmith_client
+    get_openai_limiter,
+    get_langsmith_client,
+    get_llm_cache
 )
-from fastapi import Depends, Body
-from openai import AsyncOpenAI
+from config.clients import AdaptiveLimiter, LimiterPermit, OpenAIOverloaded
+from config.metrics import NO_TIER, OPENAI_REQUEST_SECONDS, OPENAI_TOKENS
+from config.tracing import start_span
+from fastapi import Depends, Body, HTTPException
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+from config.llm_cache import LLMResponseCache
 from logs.logging_util import LoggerSingleton
+from typing import TYPE_CHECKING, AsyncIterator, Dict, List, Optional
+import asyncio
+import json
 import logging
+import os
+import time
+
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
 
 # 로거 설정
 logger = LoggerSingleton.get_logger(logger_name="test", level=logging.INFO)
 
 router = APIRouter(prefix="/test")
 
+MODEL = "gpt-4o-mini"
+
+# 응답 로그에 남길 최대 글자 수 (0 이면 자르지 않음)
+_LOG_RESPONSE_CHARS = int(os.getenv("LOG_RESPONSE_MAX_CHARS", "4000"))
+
+
+# 응답 전문은 로그 리스너 스레드에서 포맷되므로 남기되, 너무 길면 잘라서 기록
+def _clip(text: str) -> str:
+    if _LOG_RESPONSE_CHARS and len(text) > _LOG_RESPONSE_CHARS:
+        return f"{text[:_LOG_RESPONSE_CHARS]}...(+{len(text) - _LOG_RESPONSE_CHARS} chars)"
+    return text
+
+
+# 실제로 과금된 토큰만 기록 (캐시 응답은 제외)
+def _record_usage(usage: Optional[object]) -> None:
+    if usage is None:
+        return
+    OPENAI_TOKENS.labels(model=MODEL, kind="prompt", tier=NO_TIER).inc(usage.prompt_tokens or 0)
+    OPENAI_TOKENS.labels(model=MODEL, kind="completion", tier=NO_TIER).inc(usage.completion_tokens or 0)
+
+# 스트리밍 응답을 Server-Sent Events 형식으로 전달
+async def _stream_completion(
+    client: "AsyncOpenAI", messages: List[Dict[str, str]], permit: LimiterPermit
+) -> AsyncIterator[str]:
+    started = time.perf_counter()
+    # 스트림은 응답 본문을 보내는 동안 이어지므로 with 대신 마지막에 직접 닫음
+    span = start_span("openai.chat", run_type="llm", root=False, model=MODEL, stream=True)
+    try:
+        upstream = await client.chat.completions.create(
+            model=MODEL,
+            messages=messages,
+            stream=True,
+            # 마지막 청크로 사용량을 받음
+            stream_options={"include_usage": True}
+        )
+    except BaseException as e:
+        permit.release(e)
+        span.finish(e)
+        logger.exception("스트리밍 요청 실패: %s", e)
+        yield f"event: error\ndata: {json.dumps({'detail': 'upstream error'})}\n\n"
+        return
+    permit.observe()
+    # 스트리밍은 첫 응답까지의 지연을 기록
+    OPENAI_REQUEST_SECONDS.labels(model=MODEL, source="stream", tier=NO_TIER).observe(time.perf_counter() - started)
+    parts = []
+    completed = False
+    error = None
+    try:
+        async for chunk in upstream:
+            if chunk.usage is not None:
+                _record_usage(chunk.usage)
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            if delta:
+                parts.append(delta)
+                yield f"data: {json.dumps({'delta': delta}, ensure_ascii=False)}\n\n"
+        completed = True
+        yield "data: [DONE]\n\n"
+    except Exception as e:
+        error = e
+        logger.exception("스트리밍 응답 오류: %s", e)
+        yield f"event: error\ndata: {json.dumps({'detail': 'upstream error'})}\n\n"
+    except BaseException as e:
+        # 클라이언트 연결 끊김(CancelledError/GeneratorExit)은 성공으로 집계하지 않음
+        error = e
+        raise
+    finally:
+        permit.release(error)
+        span.set(chunks=len(parts), completed=completed)
+        span.finish(error)
+        # 취소된 뒤에는 await 가 다시 취소될 수 있으므로 기록을 먼저 남김
+        text = "".join(parts)
+        logger.info(
+            "스트리밍 %s chunks=%d chars=%d: %s",
+            "완료" if completed else "중단", len(parts), len(text), _clip(text),
+        )
+        # 클라이언트 연결이 끊기면 여기서 업스트림 요청을 닫아 남은 토큰 생성을 중단
+        await asyncio.shield(upstream.close())
+
+
 @router.post("/test")
 async def test(
-    client: AsyncOpenAI = Depends(get_openai_client),
-    prompt: str = Body(..., embed=True)
+    client: "AsyncOpenAI" = Depends(get_openai_client),
+    llm_cache: LLMResponseCache = Depends(get_llm_cache),
+    limiter: AdaptiveLimiter = Depends(get_openai_limiter),
+    prompt: str = Body(..., embed=True),
+    stream: bool = Body(False, embed=True)
 ):
     logger.info("test")
-    response = await client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[
-            {"role": "system", "content": "You are a helpful assistant."},
-            {"role": "user", "content": prompt}
-        ]
-    )
-    logger.info(response.choices[0].message.content)
-    return {"message": response.choices[0].message.content}
\ No newline at end of file
+    messages = [
+        {"role": "system", "content": "You are a helpful assistant."},
+        {"role": "user", "content": prompt}
+    ]
+    try:
+        if stream:
+            # 과부하로 거절될 경우 스트림을 열기 전에 503으로 응답하도록 슬롯을 먼저 확보
+            permit = await limiter.acquire(messages=messages)
+        else:
+            # 같은 프롬프트는 캐시된 응답을 재사용
+            started = time.perf_counter()
+            with start_span("openai.chat", run_type="llm", root=False, model=MODEL) as span:
+                response, source = await llm_cache.lookup(
+                    client,
+                    model=MODEL,
+                    messages=messages
+                )
+                span.set(source=source)
+            OPENAI_REQUEST_SECONDS.labels(model=MODEL, source=source, tier=NO_TIER).observe(time.perf_counter() - started)
+            if source == "upstream":
+                _record_usage(response.usage)
+    except OpenAIOverloaded as e:
+        logger.warning("OpenAI 요청 거절 (%s)", e.reason)
+        raise HTTPException(
+            status_code=503,
+            detail="LLM 요청이 많아 잠시 후 다시 시도해 주세요",
+            headers={"Retry-After": str(max(1, int(e.retry_after)))}
+        )
+
+    if stream:
+        return StreamingResponse(
+            _stream_completion(client, messages, permit),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+            # 스트림이 시작되지 못하고 끝난 경우에도 슬롯 반환 (release는 한 번만 반영됨)
+            background=BackgroundTask(permit.release)
+        )
+    content = response.choices[0].message.content
+    logger.info("응답 source=%s chars=%d: %s", source, len(content or ""), _clip(content or ""))
+    return {"message": content}
\ No newline at end of file
@@ -0,0 +1,162 @@
+import asyncio
+
+import httpx
+import pytest
+
+from config.clients import AdaptiveLimiter, OpenAIOverloaded
+
+
+def _limiter(**kwargs):
+    kwargs.setdefault("tpm_budget", 0)
+    kwargs.setdefault("max_queue_wait", 1.0)
+    return AdaptiveLimiter(**kwargs)
+
+
+def test_fast_successes_increase_limit_additively():
+    async def run():
+        limiter = _limiter(min_limit=1, max_limit=8, initial_limit=2)
+        for _ in range(4):
+            async with limiter.slot():
+                pass
+        # 2 -> 2.5 -> 2.9 -> 3.24 -> 3.55
+        assert limiter.limit == 3
+
+    asyncio.run(run())
+
+
+def test_limit_never_exceeds_max():
+    async def run():
+        limiter = _limiter(min_limit=1, max_limit=3, initial_limit=3)
+        for _ in range(20):
+            async with limiter.slot():
+                pass
+        assert limiter.limit == 3
+
+    asyncio.run(run())
+
+
+def test_rate_limit_halves_limit_once_per_window():
+    limiter = _limiter(min_limit=1, max_limit=32, initial_limit=16)
+    limiter.on_rate_limited()
+    assert limiter.limit == 8
+    # 같은 순간에 몰려온 429 로 여러 번 줄지 않음
+    limiter.on_rate_limited()
+    assert limiter.limit == 8
+
+    limiter._last_decrease -= 1.0
+    limiter.on_rate_limited()
+    assert limiter.limit == 4
+
+
+def test_decrease_stops_at_min_limit():
+    limiter = _limiter(min_limit=2, max_limit=32, initial_limit=3)
+    for _ in range(3):
+        limiter._last_decrease -= 1.0
+        limiter.on_rate_limited()
+    assert limiter.limit == 2
+
+
+def test_openai_timeout_decreases_but_other_errors_do_not():
+    openai = pytest.importorskip("openai")
+
+    async def run():
+        limiter = _limiter(min_limit=1, max_limit=32, initial_limit=10)
+        permit = await limiter.acquire()
+        permit.release(ValueError("bad request"))
+        assert limiter.limit == 10
+
+        permit = await limiter.acquire()
+        permit.release(openai.APITimeoutError(request=httpx.Request("POST", "https://api.openai.com")))
+        assert limiter.limit == 9
+
+    asyncio.run(run())
+
+
+def test_slow_response_decreases_limit():
+    limiter = _limiter(min_limit=1, max_limit=32, initial_limit=10, latency_tolerance=2.0)
+    limiter._in_flight = 2
+    limiter._release(0.1, None)
+    limiter._release(0.5, None)
+    assert limiter.limit == 9
+
+
+def test_waiters_are_admitted_in_order():
+    async def run():
+        limiter = _limiter(min_limit=1, max_limit=1, initial_limit=1)
+        held = await limiter.acquire()
+        order = []
+
+        async def wait(name):
+            permit = await limiter.acquire()
+            order.append(name)
+            permit.release()
+
+        tasks = [asyncio.ensure_future(wait(name)) for name in ("a", "b", "c")]
+        await asyncio.sleep(0.01)
+        assert order == []
+        held.release()
+        await asyncio.gather(*tasks)
+        assert order == ["a", "b", "c"]
+
+    asyncio.run(run())
+
+
+def test_waiter_past_deadline_is_shed():
+    async def run():
+        limiter = _limiter(min_limit=1, max_limit=1, initial_limit=1, max_queue_wait=0.05)
+        held = await limiter.acquire()
+        with pytest.raises(OpenAIOverloaded) as excinfo:
+            await limiter.acquire()
+        assert excinfo.value.reason == "deadline"
+
+        # 거절된 요청은 슬롯을 차지하지 않음
+        held.release()
+        permit = await asyncio.wait_for(limiter.acquire(), 0.5)
+        permit.release()
+
+    asyncio.run(run())
+
+
+def test_timeout_argument_only_shortens_deadline():
+    async def run():
+        limiter = _limiter(min_limit=1, max_limit=1, initial_limit=1, max_queue_wait=0.05)
+        held = await limiter.acquire()
+        with pytest.raises(OpenAIOverloaded):
+            await asyncio.wait_for(limiter.acquire(timeout=10), 1)
+        held.release()
+
+    asyncio.run(run())
+
+
+def test_full_queue_is_shed_immediately():
+    async def run():
+        limiter = _limiter(min_limit=1, max_limit=1, initial_limit=1, max_queue=1)
+        held = await limiter.acquire()
+        queued = asyncio.ensure_future(limiter.acquire())
+        await asyncio.sleep(0.01)
+
+        with pytest.raises(OpenAIOverloaded) as excinfo:
+            await limiter.acquire()
+        assert excinfo.value.reason == "queue_full"
+
+        held.release()
+        (await queued).release()
+
+    asyncio.run(run())
+
+
+def test_cancelled_waiter_gives_slot_to_next():
+    async def run():
+        limiter = _limiter(min_limit=1, max_limit=1, initial_limit=1)
+        held = await limiter.acquire()
+        cancelled = asyncio.ensure_future(limiter.acquire())
+        queued = asyncio.ensure_future(limiter.acquire())
+        await asyncio.sleep(0.01)
+
+        cancelled.cancel()
+        held.release()
+        permit = await asyncio.wait_for(queued, 0.5)
+        permit.release()
+        assert limiter._in_flight == 0
+
+    asyncio.run(run())
@@ -0,0 +1,128 @@
+import asyncio
+import time
+
+from tools.notion.dedup import DeliveryDedup, delivery_key
+
+
+def test_delivery_key_prefers_event_id():
+    assert delivery_key("ws", {"id": "evt-1"}, "abc") == "ws:evt-1"
+    assert delivery_key("ws", {"event_id": "evt-2"}, "abc") == "ws:evt-2"
+    assert delivery_key("ws", {"id": 3}, "abc") == "ws:sha256:abc"
+    assert delivery_key("ws", None, "abc") == "ws:sha256:abc"
+
+
+def test_confirmed_delivery_is_duplicate():
+    async def run():
+        dedup = DeliveryDedup()
+        assert not await dedup.check_and_reserve("k")
+        await dedup.confirm("k")
+        assert await dedup.check_and_reserve("k")
+
+    asyncio.run(run())
+
+
+def test_released_delivery_can_be_retried():
+    async def run():
+        dedup = DeliveryDedup()
+        assert not await dedup.check_and_reserve("k")
+        dedup.release("k")
+        assert not await dedup.check_and_reserve("k")
+
+    asyncio.run(run())
+
+
+def test_concurrent_duplicate_waits_for_confirm():
+    async def run():
+        dedup = DeliveryDedup()
+        assert not await dedup.check_and_reserve("k")
+        duplicate = asyncio.ensure_future(dedup.check_and_reserve("k"))
+        await asyncio.sleep(0.01)
+        assert not duplicate.done()
+
+        await dedup.confirm("k")
+        assert await duplicate
+
+    asyncio.run(run())
+
+
+def test_concurrent_duplicate_takes_over_after_release():
+    async def run():
+        dedup = DeliveryDedup()
+        assert not await dedup.check_and_reserve("k")
+        duplicates = [asyncio.ensure_future(dedup.check_and_reserve("k")) for _ in range(2)]
+        await asyncio.sleep(0.01)
+
+        dedup.release("k")
+        await asyncio.sleep(0.01)
+        # 하나만 예약을 이어받고 나머지는 그 결과를 기다림
+        taken = [d for d in duplicates if d.done()]
+        assert len(taken) == 1 and taken[0].result() is False
+        waiting = next(d for d in duplicates if not d.done())
+
+        await dedup.confirm("k")
+        assert await waiting
+
+    asyncio.run(run())
+
+
+def test_cancelled_duplicate_does_not_affect_original():
+    async def run():
+        dedup = DeliveryDedup()
+        assert not await dedup.check_and_reserve("k")
+        duplicate = asyncio.ensure_future(dedup.check_and_reserve("k"))
+        await asyncio.sleep(0.01)
+        duplicate.cancel()
+        await asyncio.sleep(0.01)
+
+        await dedup.confirm("k")
+        assert await dedup.check_and_reserve("k")
+
+    asyncio.run(run())
+
+
+def test_entries_expire_after_ttl():
+    async def run():
+        dedup = DeliveryDedup(ttl=0.05)
+        assert not await dedup.check_and_reserve("k")
+        await dedup.confirm("k")
+        time.sleep(0.06)
+        assert not await dedup.check_and_reserve("k")
+
+    asyncio.run(run())
+
+
+def test_capacity_evicts_least_recently_used():
+    async def run():
+        dedup = DeliveryDedup(capacity=2)
+        for key in ("a", "b"):
+            assert not await dedup.check_and_reserve(key)
+            await dedup.confirm(key)
+        assert await dedup.check_and_reserve("a")
+        assert not await dedup.check_and_reserve("c")
+        await dedup.confirm("c")
+
+        assert await dedup.check_and_reserve("a")
+        assert not await dedup.check_and_reserve("b")
+
+    asyncio.run(run())
+
+
+def test_persisted_deliveries_survive_restart(tmp_path):
+    db_file = str(tmp_path / "dedup.db")
+
+    async def first():
+        dedup = DeliveryDedup(db_file=db_file)
+        assert not await dedup.check_and_reserve("k")
+        await dedup.confirm("k")
+        assert not await dedup.check_and_reserve("released")
+        dedup.release("released")
+        dedup.close()
+
+    async def second():
+        dedup = DeliveryDedup(db_file=db_file)
+        assert await dedup.check_and_reserve("k")
+        assert not await dedup.check_and_reserve("released")
+        dedup.close()
+
+    asyncio.run(first())
+    asyncio.run(second())
@@ -0,0 +1,172 @@
+import asyncio
+import sqlite3
+import time
+
+import pytest
+
+from tools.notion.event_queue import EventQueue, QueueFull
+from tools.notion.handlers import page_key
+
+
+def _queue(tmp_path, **kwargs):
+    kwargs.setdefault("backoff_base", 0.05)
+    kwargs.setdefault("backoff_max", 0.1)
+    return EventQueue(str(tmp_path / "events.db"), **kwargs)
+
+
+def _rows(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / "events.db"))
+    try:
+        return conn.execute("SELECT id, status, attempts, last_error FROM events ORDER BY id").fetchall()
+    finally:
+        conn.close()
+
+
+async def _claim_until(queue, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while True:
+        event = await queue.claim()
+        if event is not None or time.monotonic() > deadline:
+            return event
+        await asyncio.sleep(0.01)
+
+
+def test_enqueue_claim_ack(tmp_path):
+    async def run():
+        queue = _queue(tmp_path)
+        await queue.enqueue("ws-1", [{"id": 1}, {"id": 2}], tier="pro")
+        assert queue.depth() == 2
+
+        first = await queue.claim()
+        second = await queue.claim()
+        assert (first.payload, second.payload) == ({"id": 1}, {"id": 2})
+        assert first.tier == "pro"
+        assert await queue.claim() is None
+
+        assert await queue.ack(first)
+        assert await queue.ack(second)
+        assert queue.depth() == 0
+        queue.close()
+
+    asyncio.run(run())
+
+
+def test_queue_full_rejects_whole_batch(tmp_path):
+    async def run():
+        queue = _queue(tmp_path, max_depth=3)
+        await queue.enqueue("ws-1", [{"id": 1}, {"id": 2}])
+        with pytest.raises(QueueFull):
+            await queue.enqueue("ws-1", [{"id": 3}, {"id": 4}])
+        assert queue.depth() == 2
+        queue.close()
+
+    asyncio.run(run())
+    assert len(_rows(tmp_path)) == 2
+
+
+def test_oversized_batch_is_admitted_into_empty_queue(tmp_path):
+    async def run():
+        queue = _queue(tmp_path, max_depth=2)
+        await queue.enqueue("ws-1", [{"id": i} for i in range(5)])
+        assert queue.depth() == 5
+        queue.close()
+
+    asyncio.run(run())
+
+
+def test_expired_lease_is_reclaimed(tmp_path):
+    async def run():
+        queue = _queue(tmp_path, lease_seconds=0.1)
+        await queue.enqueue("ws-1", [{"id": 1}])
+        first = await queue.claim()
+        assert await queue.claim() is None
+
+        await asyncio.sleep(0.15)
+        second = await queue.claim()
+        assert second is not None and second.id == first.id
+        assert second.lease_token != first.lease_token
+
+        # 늦게 끝난 첫 워커의 완료/재시도는 반영되지 않음
+        assert await queue.ack(second)
+        assert not await queue.ack(first)
+        assert await queue.retry(first, "late")
+        assert queue.depth() == 0
+        queue.close()
+
+    asyncio.run(run())
+    assert _rows(tmp_path) == []
+
+
+def test_retry_backs_off_then_dead_letters(tmp_path):
+    async def run():
+        queue = _queue(tmp_path, max_attempts=3)
+        await queue.enqueue("ws-1", [{"id": 1}])
+
+        event = await queue.claim()
+        assert await queue.retry(event, "boom 1")
+        # 백오프가 끝나기 전에는 꺼내지 않음
+        assert await queue.claim() is None
+        event = await _claim_until(queue)
+        assert event.attempts == 1
+
+        assert await queue.retry(event, "boom 2")
+        event = await _claim_until(queue)
+        assert event.attempts == 2
+
+        assert not await queue.retry(event, "boom 3")
+        assert queue.depth() == 0
+        await asyncio.sleep(0.15)
+        assert await queue.claim() is None
+        queue.close()
+
+    asyncio.run(run())
+    assert _rows(tmp_path) == [(1, "dead", 3, "boom 3")]
+
+
+def test_same_page_events_are_claimed_in_order(tmp_path):
+    async def run():
+        queue = _queue(tmp_path, ordering_key=page_key)
+        await queue.enqueue(
+            "ws-1",
+            [
+                {"id": 1, "entity": {"id": "p1"}},
+                {"id": 2, "entity": {"id": "p1"}},
+                {"id": 3, "entity": {"id": "p2"}},
+            ],
+        )
+        first = await queue.claim()
+        other = await queue.claim()
+        assert (first.payload["id"], other.payload["id"]) == (1, 3)
+        # p1 의 앞선 항목이 재시도 대기 중이어도 뒤 항목은 기다림
+        assert await queue.retry(first, "boom")
+        await asyncio.sleep(0.15)
+        again = await queue.claim()
+        assert again.payload["id"] == 1
+        assert await queue.claim() is None
+
+        await queue.ack(again)
+        assert (await queue.claim()).payload["id"] == 2
+        queue.close()
+
+    asyncio.run(run())
+
+
+def test_wait_available_returns_on_change(tmp_path):
+    async def run():
+        queue = _queue(tmp_path)
+        seen = queue.changes
+        assert await queue.claim() is None
+
+        waiters = [asyncio.ensure_future(queue.wait_available(seen, 5)) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        await queue.enqueue("ws-1", [{"id": 1}])
+        # 모든 대기 중인 워커가 깨어남
+        await asyncio.wait_for(asyncio.gather(*waiters), 1)
+
+        # 이미 바뀐 번호로는 기다리지 않음
+        started = time.monotonic()
+        await queue.wait_available(seen, 5)
+        assert time.monotonic() - started < 0.5
+        queue.close()
+
+    asyncio.run(run())
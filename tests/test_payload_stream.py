@@ -0,0 +1,136 @@
+import json
+
+import pytest
+
+from tools.notion.payload_stream import PayloadStreamParser
+
+
+BODY = json.dumps(
+    {
+        "type": "page.content_updated",
+        "workspace_id": "ws-1",
+        "events": [{"id": "e1", "type": "page.created", "text": "가나다"}, {"id": "e2", "n": 1.5}],
+        "attempt": 2,
+    },
+    ensure_ascii=False,
+).encode("utf-8")
+
+
+def _parse(chunks):
+    events = []
+    parser = PayloadStreamParser(events.append)
+    for chunk in chunks:
+        parser.feed(chunk)
+    parser.close()
+    return parser, events
+
+
+def _split(body, size):
+    return [body[i:i + size] for i in range(0, len(body), size)]
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 64, len(BODY)])
+def test_chunk_boundaries_do_not_change_result(size):
+    parser, events = _parse(_split(BODY, size))
+
+    assert parser.error is None
+    assert parser.done
+    assert parser.fields == {"type": "page.content_updated", "workspace_id": "ws-1", "attempt": 2}
+    assert [json.loads(e) for e in events] == [
+        {"id": "e1", "type": "page.created", "text": "가나다"},
+        {"id": "e2", "n": 1.5},
+    ]
+    assert parser.event_count == 2
+
+
+def test_multibyte_character_split_across_chunks():
+    body = '{"events": [{"t": "한"}]}'.encode("utf-8")
+    split = body.index("한".encode("utf-8")) + 1
+    parser, events = _parse([body[:split], body[split:]])
+
+    assert parser.error is None
+    assert events == ['{"t": "한"}']
+
+
+def test_number_at_chunk_end_waits_for_delimiter():
+    parser, _ = _parse([b'{"attempt": 1', b'2}'])
+
+    assert parser.error is None
+    assert parser.fields == {"attempt": 12}
+
+
+def test_events_are_emitted_before_body_ends():
+    events = []
+    parser = PayloadStreamParser(events.append)
+    parser.feed(b'{"events": [{"id": 1}, ')
+
+    assert events == ['{"id": 1}']
+    assert not parser.done
+
+
+def test_empty_events_array():
+    parser, events = _parse([b'{"type": "x", "events": []}'])
+
+    assert parser.error is None
+    assert parser.has_events
+    assert events == []
+
+
+def test_body_without_events():
+    parser, events = _parse([b'{"type": "x"}'])
+
+    assert parser.error is None
+    assert not parser.has_events
+    assert parser.fields == {"type": "x"}
+
+
+def test_non_object_events_are_skipped():
+    parser, events = _parse([b'{"events": [1, "a", {"id": 1}, null, [2]]}'])
+
+    assert parser.error is None
+    assert events == ['{"id": 1}']
+    assert parser.event_count == 1
+    assert parser.skipped_events == 4
+
+
+@pytest.mark.parametrize(
+    "body",
+    [
+        b'["not", "an", "object"]',
+        b'{"a": 1,}',
+        b'{"a" 1}',
+        b'{"a": 1} trailing',
+        b'{"events": [{"id": 1} {"id": 2}]}',
+        b'{"a": tru}',
+        b'{1: 2}',
+    ],
+)
+def test_malformed_json_sets_error(body):
+    parser, _ = _parse(_split(body, 3))
+
+    assert parser.error is not None
+
+
+def test_truncated_body_is_incomplete():
+    parser, _ = _parse([b'{"events": [{"id": 1}'])
+
+    assert parser.error == "incomplete JSON body"
+
+
+def test_invalid_utf8_sets_error():
+    parser, _ = _parse([b'{"a": "\xff"}'])
+
+    assert parser.error is not None
+    assert parser.error.startswith("invalid utf-8")
+
+
+def test_feed_after_error_is_ignored():
+    events = []
+    parser = PayloadStreamParser(events.append)
+    parser.feed(b"[")
+    error = parser.error
+    parser.feed(b'{"events": [{"id": 1}]}')
+    parser.close()
+
+    assert parser.error == error
+    assert events == []
@@ -0,0 +1,119 @@
+import json
+import os
+import time
+
+from tools.notion.store_backend import WEBHOOK, WORKSPACE
+from tools.notion.store_journal import JournalStore, load_journal_state
+
+
+def _open(directory, **kwargs):
+    return JournalStore(
+        str(directory),
+        os.path.join(str(directory), "notion_store.json"),
+        os.path.join(str(directory), "notion_store.journal"),
+        **kwargs,
+    )
+
+
+def _put(store, table, key, value):
+    return store.update(table, key, lambda existing: [(table, key, value)])
+
+
+def _write_journal(path, records, tail=""):
+    with open(path, "w", encoding="utf-8") as f:
+        for table, key, value in records:
+            f.write(json.dumps({"t": table, "k": key, "v": value}) + "\n")
+        f.write(tail)
+
+
+def test_writes_survive_reopen(tmp_path):
+    store = _open(tmp_path)
+    _put(store, WORKSPACE, "ws-1", {"access_token": "a"})
+    _put(store, WEBHOOK, "wh-1", {"workspace_id": "ws-1"})
+    _put(store, WORKSPACE, "ws-2", {"access_token": "b"})
+    _put(store, WORKSPACE, "ws-2", None)
+    store.close()
+
+    reopened = _open(tmp_path)
+    try:
+        assert reopened.items(WORKSPACE) == [("ws-1", {"access_token": "a"})]
+        assert reopened.get(WEBHOOK, "wh-1") == {"workspace_id": "ws-1"}
+    finally:
+        reopened.close()
+
+
+def test_torn_tail_is_truncated_on_open(tmp_path):
+    journal = tmp_path / "notion_store.journal"
+    _write_journal(journal, [(WORKSPACE, "ws-1", {"n": 1})], tail='{"t": "ws", "k": "ws-2", "v"')
+    valid = len((json.dumps({"t": WORKSPACE, "k": "ws-1", "v": {"n": 1}}) + "\n").encode("utf-8"))
+
+    store = _open(tmp_path)
+    try:
+        assert store.items(WORKSPACE) == [("ws-1", {"n": 1})]
+        assert os.path.getsize(journal) == valid
+        # 잘라낸 뒤 이어 쓴 기록은 다시 열어도 읽힘
+        _put(store, WORKSPACE, "ws-3", {"n": 3})
+    finally:
+        store.close()
+
+    reopened = _open(tmp_path)
+    try:
+        assert dict(reopened.items(WORKSPACE)) == {"ws-1": {"n": 1}, "ws-3": {"n": 3}}
+    finally:
+        reopened.close()
+
+
+def test_replay_stops_at_corrupt_line(tmp_path):
+    journal = tmp_path / "notion_store.journal"
+    _write_journal(journal, [(WORKSPACE, "ws-1", {"n": 1})], tail="not json\n" + json.dumps(
+        {"t": WORKSPACE, "k": "ws-2", "v": {"n": 2}}
+    ) + "\n")
+
+    store = _open(tmp_path)
+    try:
+        assert store.items(WORKSPACE) == [("ws-1", {"n": 1})]
+    finally:
+        store.close()
+
+
+def test_compaction_writes_snapshot_and_rotates_journal(tmp_path):
+    store = _open(tmp_path, compact_bytes=512)
+    try:
+        written = 0
+        for i in range(40):
+            written += _put(store, WORKSPACE, f"ws-{i}", {"n": i})[1]
+        written += _put(store, WORKSPACE, "ws-0", None)[1]
+
+        deadline = time.monotonic() + 5
+        while store._compacting or not (tmp_path / "notion_store.json").exists():
+            assert time.monotonic() < deadline, "compaction did not finish"
+            time.sleep(0.01)
+        assert not (tmp_path / "notion_store.journal.1").exists()
+        # 압축 전에 쓴 기록은 스냅샷으로 옮겨지고 저널에는 그 뒤의 기록만 남음
+        assert os.path.getsize(tmp_path / "notion_store.journal") < written
+    finally:
+        store.close()
+
+    reopened = _open(tmp_path)
+    try:
+        state = dict(reopened.items(WORKSPACE))
+    finally:
+        reopened.close()
+    assert len(state) == 39
+    assert "ws-0" not in state
+    assert state["ws-39"] == {"n": 39}
+
+
+def test_load_journal_state_is_read_only(tmp_path):
+    snapshot = tmp_path / "notion_store.json"
+    journal = tmp_path / "notion_store.journal"
+    snapshot.write_text(json.dumps({"workspaces": {"ws-1": {"n": 1}}, "webhooks": {"wh-1": {"w": 1}}}))
+    _write_journal(journal, [(WORKSPACE, "ws-2", {"n": 2}), (WEBHOOK, "wh-1", None)], tail='{"t": "ws"')
+    size = os.path.getsize(journal)
+
+    state = load_journal_state(str(snapshot), str(journal))
+
+    assert state[WORKSPACE] == {"ws-1": {"n": 1}, "ws-2": {"n": 2}}
+    assert state[WEBHOOK] == {}
+    assert os.path.getsize(journal) == size
+    assert sorted(os.listdir(tmp_path)) == ["notion_store.journal", "notion_store.json"]
@@ -0,0 +1,106 @@
+import numpy as np
+import pytest
+
+from tools.notion.vector_index import UNCHANGED, IndexStore, VectorIndex
+
+
+def _vec(*values):
+    return np.asarray(values, dtype=np.float32)
+
+
+def test_search_ranks_by_cosine_similarity(tmp_path):
+    index = VectorIndex(str(tmp_path / "idx"))
+    index.upsert("m", [("a", "h-a", _vec(1, 0, 0)), ("b", "h-b", _vec(0, 1, 0)), ("c", "h-c", _vec(1, 1, 0))])
+
+    results = index.search(_vec(2, 0, 0), 2)
+
+    assert [page_id for page_id, _ in results] == ["a", "c"]
+    assert results[0][1] == pytest.approx(1.0)
+    assert results[1][1] == pytest.approx(np.sqrt(0.5))
+    index.close()
+
+
+def test_upsert_replaces_existing_page(tmp_path):
+    index = VectorIndex(str(tmp_path / "idx"))
+    index.upsert("m", [("a", "h1", _vec(1, 0)), ("b", "h2", _vec(0, 1))])
+    index.upsert("m", [("a", "h3", _vec(0, 1))])
+
+    results = dict(index.search(_vec(0, 1), 5))
+
+    assert results["a"] == pytest.approx(1.0)
+    assert len(results) == 2
+    assert index.classify([("a", "h3"), ("a", "h1")])[0] == UNCHANGED
+    index.close()
+
+
+def test_delete_removes_page_from_results(tmp_path):
+    index = VectorIndex(str(tmp_path / "idx"))
+    index.upsert("m", [("a", "h-a", _vec(1, 0)), ("b", "h-b", _vec(0.9, 0.1))])
+
+    assert index.delete("a")
+    assert not index.delete("a")
+    assert [page_id for page_id, _ in index.search(_vec(1, 0), 5)] == ["b"]
+
+    # 비워진 행은 다음 페이지가 다시 씀
+    index.upsert("m", [("c", "h-c", _vec(0, 1))])
+    assert [page_id for page_id, _ in index.search(_vec(0, 1), 1)] == ["c"]
+    index.close()
+
+
+def test_classify_reuses_vector_of_same_content(tmp_path):
+    index = VectorIndex(str(tmp_path / "idx"))
+    index.upsert("m", [("a", "same", _vec(3, 4))])
+
+    unchanged, copied, missing = index.classify([("a", "same"), ("b", "same"), ("c", "other")])
+
+    assert unchanged == UNCHANGED
+    np.testing.assert_allclose(copied, _vec(0.6, 0.8), rtol=1e-6)
+    assert missing is None
+    index.close()
+
+
+def test_reopen_and_read_only_view(tmp_path):
+    directory = str(tmp_path / "idx")
+    index = VectorIndex(directory)
+    index.upsert("m", [("a", "h-a", _vec(1, 0)), ("b", "h-b", _vec(0, 1))])
+    index.delete("b")
+    index.close()
+
+    reader = VectorIndex(directory, read_only=True)
+    assert [page_id for page_id, _ in reader.search(_vec(0, 1), 5)] == ["a"]
+    with pytest.raises(PermissionError):
+        reader.delete("a")
+    reader.close()
+
+
+def test_model_change_resets_index(tmp_path):
+    index = VectorIndex(str(tmp_path / "idx"))
+    index.upsert("m1", [("a", "h-a", _vec(1, 0))])
+    index.upsert("m2", [("b", "h-b", _vec(0, 1, 0))])
+
+    assert [page_id for page_id, _ in index.search(_vec(0, 1, 0), 5)] == ["b"]
+    with pytest.raises(ValueError):
+        index.search(_vec(1, 0), 5)
+    index.close()
+
+
+def test_empty_index_and_non_positive_k(tmp_path):
+    index = VectorIndex(str(tmp_path / "idx"))
+    assert index.search(_vec(1, 0), 5) == []
+    index.upsert("m", [("a", "h-a", _vec(1, 0))])
+    assert index.search(_vec(1, 0), 0) == []
+    index.close()
+
+
+def test_index_store_find_does_not_create(tmp_path):
+    store = IndexStore(str(tmp_path / "indexes"))
+    assert store.find("ws-1") is None
+    assert not (tmp_path / "indexes").exists()
+
+    store.get("ws-1").upsert("m", [("a", "h-a", _vec(1, 0))])
+    store.close()
+
+    found = IndexStore(str(tmp_path / "indexes")).find("ws-1")
+    assert found is not None and found.read_only
+    assert [page_id for page_id, _ in found.search(_vec(1, 0), 1)] == ["a"]
+    found.close()
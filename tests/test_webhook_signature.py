@@ -0,0 +1,90 @@
+import asyncio
+import hashlib
+import hmac
+import io
+from collections import OrderedDict
+
+import pytest
+
+from tools.notion import webhook
+
+
+BODY = b'{"type": "page.created", "events": [{"id": "e1"}]}'
+
+SECRETS = [(f"wh-{i}", f"secret-{i}") for i in range(10)]
+
+
+def _sign(secret, body=BODY):
+    return "sha256=" + hmac.new(secret.encode("utf-8"), body, hashlib.sha256).hexdigest()
+
+
+class _FakeStore:
+    def __init__(self, secrets):
+        self.secrets = dict(secrets)
+        self.list_limits = []
+
+    async def get_secret_by_webhook_id(self, webhook_id):
+        return self.secrets.get(webhook_id)
+
+    async def list_webhook_secrets(self, limit=None):
+        self.list_limits.append(limit)
+        return list(self.secrets.items())[:limit]
+
+
+@pytest.fixture
+def store(monkeypatch):
+    fake = _FakeStore(SECRETS)
+    monkeypatch.setattr(webhook, "async_store", fake)
+    monkeypatch.setattr(webhook, "_RECENT_FALLBACK", OrderedDict())
+    monkeypatch.setattr(webhook, "_FALLBACK_SCAN_LIMIT", 64)
+    return fake
+
+
+def _match(signature, webhook_id=None, digest=None):
+    return asyncio.run(webhook._find_signature_match(io.BytesIO(BODY), signature, webhook_id, digest))
+
+
+def test_known_webhook_id_checks_one_secret(store):
+    assert _match(_sign("secret-3"), "wh-3") == ("wh-3", 1)
+    assert _match(_sign("secret-4"), "wh-3") == (None, 1)
+    assert _match(_sign("secret-3"), "unknown") == (None, 0)
+    assert store.list_limits == []
+
+
+def test_precomputed_digest_is_used(store):
+    digest = hmac.new(b"secret-5", BODY, hashlib.sha256).hexdigest()
+    assert _match(digest, "wh-5", digest) == ("wh-5", 1)
+
+
+def test_fallback_scans_secrets_without_webhook_id(store):
+    assert _match(_sign("secret-7")) == ("wh-7", 8)
+
+
+def test_fallback_checks_recent_match_first(store):
+    assert _match(_sign("secret-7")) == ("wh-7", 8)
+    assert _match(_sign("secret-7")) == ("wh-7", 1)
+    # 최근 일치 목록에 있지만 맞지 않으면 나머지를 순회하되 다시 검사하지 않음
+    assert _match(_sign("secret-2")) == ("wh-2", 4)
+
+
+def test_fallback_rejects_unknown_signature(store):
+    assert _match(_sign("other")) == (None, len(SECRETS))
+    assert _match("sha256=00") == (None, len(SECRETS))
+
+
+def test_fallback_stops_at_scan_limit(store, monkeypatch):
+    monkeypatch.setattr(webhook, "_FALLBACK_SCAN_LIMIT", 4)
+
+    assert _match(_sign("secret-2")) == ("wh-2", 3)
+    # 한도 밖의 시크릿은 검사하지 않고 거절
+    webhook._RECENT_FALLBACK.clear()
+    assert _match(_sign("secret-8")) == (None, 4)
+    assert store.list_limits[-1] == 5
+
+
+def test_scan_limit_includes_recent_matches(store, monkeypatch):
+    monkeypatch.setattr(webhook, "_FALLBACK_SCAN_LIMIT", 3)
+    for webhook_id in ("wh-0", "wh-1", "wh-2"):
+        webhook._remember_fallback_match(webhook_id)
+
+    assert _match(_sign("secret-5")) == (None, 3)
@@ -4,16 +4,20 @@
 #                                                   #
 #####################################################
 
+import asyncio
+import json
 import os
 import secrets
 import base64
+import time
+from typing import Any, Dict, Optional, Tuple
 from urllib.parse import urlencode
 
-import httpx
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException
 from fastapi.responses import RedirectResponse, JSONResponse
 
-from tools.notion.store import upsert_workspace, set_webhook_info, set_incoming_secret
+from tools.notion.api_client import NotionApiClient, get_notion_api_client
+from tools.notion.store import async_store
 from logs.logging_util import LoggerSingleton
 import logging
 
@@ -32,6 +36,22 @@ REDIRECT_URI = os.getenv("NOTION_REDIRECT_URI", "")
 # 단일 엔드포인트(콜백) URL - 사용자별 동일 URL 사용
 WEBHOOK_CALLBACK_URL = os.getenv("NOTION_WEBHOOK_CALLBACK_URL", "")
 
+# 웹훅 생성 시 동작이 확인된 (엔드포인트, 본문 형태) 조합을 기록하는 파일
+_WEBHOOK_VARIANT_FILE = os.path.join(os.getcwd(), "data", "notion_webhook_variant.json")
+# 알려진 조합이 없을 때 조합을 차례로 시도하는 전체 제한 시간(초)
+_WEBHOOK_PROBE_DEADLINE = float(os.getenv("NOTION_WEBHOOK_PROBE_DEADLINE", "10"))
+# 알려진 조합이 이 상태 코드로 실패하면 사양이 바뀐 것으로 보고 기록을 지움
+_VARIANT_MISMATCH_STATUS = {400, 404, 405, 410, 415, 422}
+
+_WEBHOOK_PATHS = {"webhooks": "/v1/webhooks", "subscriptions": "/v1/subscriptions"}
+_WEBHOOK_BODY_SHAPES = ("url", "callback_url")
+# 시도 순서 = 우선순위
+_WEBHOOK_VARIANTS = [f"{path}:{shape}" for path in _WEBHOOK_PATHS for shape in _WEBHOOK_BODY_SHAPES]
+
+# 프로세스 전체에서 공유하는 기록 (None = 아직 파일을 읽지 않음, "" = 알려진 조합 없음)
+_known_variant: Optional[str] = None
+_probe_lock = asyncio.Lock()
+
 
 def _require_env_vars() -> None:
     missing = [
@@ -59,7 +79,11 @@ async def notion_oauth_start() -> RedirectResponse:
 
 
 @router.get("/oauth/callback")
-async def notion_oauth_callback(code: str, state: str | None = None):
+async def notion_oauth_callback(
+    code: str,
+    state: str | None = None,
+    client: NotionApiClient = Depends(get_notion_api_client),
+):
     _require_env_vars()
     token_url = f"{NOTION_API_BASE}/v1/oauth/token"
 
@@ -77,27 +101,26 @@ async def notion_oauth_callback(code: str, state: str | None = None):
         "redirect_uri": REDIRECT_URI,
     }
 
-    async with httpx.AsyncClient(timeout=30) as client:
-        resp = await client.post(token_url, headers=headers, json=payload)
-        if resp.status_code >= 400:
-            logger.error("Notion 토큰 교환 실패: %s %s", resp.status_code, resp.text)
-            raise HTTPException(status_code=500, detail="Notion 토큰 교환 실패")
+    resp = await client.post(token_url, headers=headers, json=payload)
+    if resp.status_code >= 400:
+        logger.error("Notion 토큰 교환 실패: %s %s", resp.status_code, resp.text)
+        raise HTTPException(status_code=500, detail="Notion 토큰 교환 실패")
 
-        data = resp.json()
-        access_token = data.get("access_token")
-        workspace_id = data.get("workspace_id")
-        bot_id = data.get("bot_id")
+    data = resp.json()
+    access_token = data.get("access_token")
+    workspace_id = data.get("workspace_id")
+    bot_id = data.get("bot_id")
 
-        if not access_token or not workspace_id:
-            logger.error("토큰 응답 누락: %s", data)
-            raise HTTPException(status_code=500, detail="Notion 토큰 응답 누락")
+    if not access_token or not workspace_id:
+        logger.error("토큰 응답 누락: %s", data)
+        raise HTTPException(status_code=500, detail="Notion 토큰 응답 누락")
 
-        # 워크스페이스 정보 저장
-        upsert_workspace(workspace_id=workspace_id, access_token=access_token, bot_id=bot_id)
+    # 워크스페이스 정보 저장
+    await async_store.upsert_workspace(workspace_id=workspace_id, access_token=access_token, bot_id=bot_id)
 
-        # 사용자 고유 시크릿 발급 (자동화 Webhook 호출 헤더로 사용)
-        incoming_secret = secrets.token_hex(32)
-        set_incoming_secret(workspace_id=workspace_id, secret=incoming_secret)
+    # 사용자 고유 시크릿 발급 (자동화 Webhook 호출 헤더로 사용)
+    incoming_secret = secrets.token_hex(32)
+    await async_store.set_incoming_secret(workspace_id=workspace_id, secret=incoming_secret)
 
     return JSONResponse({
         "ok": True,
@@ -111,44 +134,143 @@ async def notion_oauth_callback(code: str, state: str | None = None):
     })
 
 
-async def _create_user_webhook(*, access_token: str, workspace_id: str, callback_url: str, webhook_secret: str) -> str | None:
-    """Notion 웹훅 구독을 생성합니다. 엔드포인트 사양 변화에 견고하도록 필드명을 호환 처리합니다."""
-    create_urls = [
-        f"{NOTION_API_BASE}/v1/webhooks",
-        f"{NOTION_API_BASE}/v1/subscriptions",
-    ]
+def _load_variant_sync() -> str:
+    try:
+        with open(_WEBHOOK_VARIANT_FILE, "r", encoding="utf-8") as f:
+            variant = json.load(f).get("variant") or ""
+    except (OSError, ValueError):
+        return ""
+    return variant if variant in _WEBHOOK_VARIANTS else ""
+
+
+def _save_variant_sync(variant: str) -> None:
+    os.makedirs(os.path.dirname(_WEBHOOK_VARIANT_FILE), exist_ok=True)
+    tmp = f"{_WEBHOOK_VARIANT_FILE}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"variant": variant, "updated_at": time.time()}, f)
+    os.replace(tmp, _WEBHOOK_VARIANT_FILE)
+
+
+async def _get_known_variant() -> str:
+    global _known_variant
+    if _known_variant is None:
+        _known_variant = await asyncio.to_thread(_load_variant_sync)
+    return _known_variant
+
+
+async def _remember_variant(variant: str) -> None:
+    global _known_variant
+    if _known_variant == variant:
+        return
+    _known_variant = variant
+    try:
+        await asyncio.to_thread(_save_variant_sync, variant)
+    except OSError as e:
+        logger.warning("웹훅 생성 조합 저장 실패: %s", e)
+
 
+def _webhook_request(variant: str, *, workspace_id: str, callback_url: str, webhook_secret: str) -> Tuple[str, Dict[str, Any]]:
+    """조합 이름에 해당하는 (URL, 요청 본문)을 만듭니다. 엔드포인트 사양 변화에 대비한 후보들입니다."""
+    path, shape = variant.split(":", 1)
+    url = f"{NOTION_API_BASE}{_WEBHOOK_PATHS[path]}"
+    if shape == "url":
+        body = {"name": "EasyConnect Webhook", "url": callback_url, "secret": webhook_secret, "active": True}
+    else:
+        body = {"callback_url": callback_url, "secret": webhook_secret, "workspace_id": workspace_id}
+    return url, body
+
+
+async def _try_webhook_variant(
+    client: NotionApiClient,
+    variant: str,
+    headers: Dict[str, str],
+    timeout: Optional[float] = None,
+    **request_fields: str,
+) -> Tuple[Optional[str], Optional[int]]:
+    """조합 하나로 생성을 시도하고 (webhook_id, 실패 상태 코드)를 반환합니다. 예외 시 상태 코드는 None."""
+    url, body = _webhook_request(variant, **request_fields)
+    kwargs = {"timeout": timeout} if timeout is not None else {}
+    try:
+        resp = await client.post(url, headers=headers, json=body, **kwargs)
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        logger.warning("웹훅 생성 시 예외 variant=%s: %r", variant, e)
+        return None, None
+    if resp.status_code >= 300:
+        logger.warning("웹훅 생성 실패 url=%s code=%s resp=%s", url, resp.status_code, resp.text)
+        return None, resp.status_code
+    try:
+        resp_json = resp.json()
+    except ValueError:
+        logger.warning("웹훅 생성 응답 파싱 실패 url=%s resp=%s", url, resp.text)
+        return None, None
+    webhook_id = resp_json.get("id") or resp_json.get("webhook_id") or resp_json.get("subscription_id")
+    logger.info("웹훅 생성 성공 url=%s id=%s", url, webhook_id)
+    return webhook_id, None
+
+
+async def _probe_webhook_variants(
+    client: NotionApiClient, headers: Dict[str, str], skip: Optional[str] = None, **request_fields: str
+) -> Tuple[Optional[str], Optional[str]]:
+    """조합을 우선순위대로 하나씩 시도해 처음 성공한 (조합, webhook_id)를 반환합니다.
+
+    웹훅 생성은 멱등하지 않으므로 동시에 보내지 않습니다. 사양 불일치로 거절된 경우에만 다음 조합으로
+    넘어가고, 시간 초과/예외 등 서버에서 생성됐을 수 있는 실패에서는 중복 구독을 피하려고 멈춥니다.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + _WEBHOOK_PROBE_DEADLINE
+    for variant in _WEBHOOK_VARIANTS:
+        if variant == skip:
+            continue
+        remaining = deadline - loop.time()
+        if remaining <= 0:
+            logger.warning("웹훅 생성 조합 탐색 마감 초과 deadline=%ss", _WEBHOOK_PROBE_DEADLINE)
+            break
+        webhook_id, status = await _try_webhook_variant(client, variant, headers, timeout=remaining, **request_fields)
+        if webhook_id:
+            return variant, webhook_id
+        if status not in _VARIANT_MISMATCH_STATUS:
+            logger.warning("웹훅 생성 조합 탐색 중단 variant=%s code=%s", variant, status)
+            break
+    return None, None
+
+
+async def _create_user_webhook(*, client: NotionApiClient, access_token: str, workspace_id: str, callback_url: str, webhook_secret: str) -> str | None:
+    """Notion 웹훅 구독을 생성합니다.
+
+    동작이 확인된 조합이 있으면 그 조합으로 바로 요청하고, 없거나 사양 불일치로 실패하면
+    나머지 조합을 차례로 시도해 성공한 조합을 기록(프로세스 공유 + 파일 저장)합니다.
+    """
     headers = {
         "Authorization": f"Bearer {access_token}",
         "Content-Type": "application/json",
         "Notion-Version": NOTION_VERSION,
     }
+    request_fields = {"workspace_id": workspace_id, "callback_url": callback_url, "webhook_secret": webhook_secret}
 
-    # 요청 본문 후보 (사양 차이에 대비)
-    bodies = [
-        {"name": "EasyConnect Webhook", "url": callback_url, "secret": webhook_secret, "active": True},
-        {"callback_url": callback_url, "secret": webhook_secret, "workspace_id": workspace_id},
-    ]
+    known = await _get_known_variant()
+    if known:
+        webhook_id, status = await _try_webhook_variant(client, known, headers, **request_fields)
+        if webhook_id:
+            return webhook_id
+        if status not in _VARIANT_MISMATCH_STATUS:
+            # 인증/한도/서버 오류는 조합과 무관하므로 기록을 유지
+            return None
+        logger.warning("기록된 웹훅 생성 조합 실패, 다시 탐색 variant=%s code=%s", known, status)
 
-    async with httpx.AsyncClient(timeout=30) as client:
-        for url in create_urls:
-            for body in bodies:
-                try:
-                    resp = await client.post(url, headers=headers, json=body)
-                    if resp.status_code < 300:
-                        resp_json = resp.json()
-                        webhook_id = (
-                            resp_json.get("id")
-                            or resp_json.get("webhook_id")
-                            or resp_json.get("subscription_id")
-                        )
-                        logger.info("웹훅 생성 성공 url=%s id=%s", url, webhook_id)
-                        return webhook_id
-                    else:
-                        logger.warning("웹훅 생성 실패 url=%s code=%s body=%s resp=%s", url, resp.status_code, body, resp.text)
-                except Exception as e:
-                    logger.exception("웹훅 생성 시 예외: %s", e)
+    # 여러 요청이 동시에 탐색하지 않도록 직렬화하고, 기다리는 동안 다른 요청이 찾았으면 그 조합을 사용
+    async with _probe_lock:
+        current = await _get_known_variant()
+        if current and current != known:
+            webhook_id, _ = await _try_webhook_variant(client, current, headers, **request_fields)
+            if webhook_id:
+                return webhook_id
 
+        variant, webhook_id = await _probe_webhook_variants(client, headers, skip=known or None, **request_fields)
+        if variant:
+            await _remember_variant(variant)
+            return webhook_id
+        if known:
+            await _remember_variant("")
     return None
-
-
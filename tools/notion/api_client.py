@@ -0,0 +1,253 @@
+#####################################################
+#                                                   #
+#        Notion API 호출 속도 제한/재시도 계층          #
+#                                                   #
+#####################################################
+
+# Notion은 통합(integration)당 초당 약 3회로 요청을 제한합니다.
+#   - 인증 헤더(액세스 토큰/클라이언트 자격) 단위로 토큰 버킷을 두어 요청 속도를 맞춥니다.
+#   - 429는 Retry-After 만큼 해당 키의 버킷 전체를 멈춘 뒤 재시도하고,
+#     멱등 요청의 5xx/전송 오류는 지터가 섞인 지수 백오프로 재시도합니다.
+#   - 같은 GET이 동시에 여러 번 들어오면 요청 하나로 합쳐 응답을 공유합니다.
+#   - 앱 전체가 하나의 클라이언트(notion_api)를 공유합니다. app.py lifespan 에서 공유 httpx 클라이언트를
+#     얻는 함수를 bind 하면 처음 쓸 때 만들어지고, httpx 클라이언트가 바뀌면 새로 만듭니다.
+
+import asyncio
+import hashlib
+import os
+import random
+import time
+from collections import OrderedDict
+from email.utils import parsedate_to_datetime
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import httpx
+
+from config.metrics import NOTION_API_COALESCED, NOTION_API_QUEUE_WAIT, NOTION_API_RESPONSES, NOTION_API_RETRIES
+from logs.logging_util import LoggerSingleton
+import logging
+
+
+logger = LoggerSingleton.get_logger(logger_name="notion_api", level=logging.INFO)
+
+_RATE_PER_SEC = float(os.getenv("NOTION_API_RATE_PER_SEC", "3"))
+_BURST = float(os.getenv("NOTION_API_BURST", "3"))
+_MAX_RETRIES = int(os.getenv("NOTION_API_MAX_RETRIES", "4"))
+_BACKOFF_BASE = float(os.getenv("NOTION_API_BACKOFF_BASE", "0.5"))
+_BACKOFF_MAX = float(os.getenv("NOTION_API_BACKOFF_MAX", "30"))
+# 메모리에 유지할 버킷 수 (오래 쓰지 않은 키부터 제거)
+_MAX_BUCKETS = 10000
+
+_IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+_RETRYABLE_STATUS = {500, 502, 503, 504}
+
+
+class _TokenBucket:
+    """예약 방식 토큰 버킷. 토큰이 음수가 되도록 미리 빼고 그만큼 기다리게 하여 도착 순서를 지킵니다."""
+
+    __slots__ = ("rate", "burst", "tokens", "updated", "blocked_until")
+
+    def __init__(self, rate: float, burst: float) -> None:
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    def reserve(self) -> float:
+        """토큰 하나를 예약하고 기다려야 할 시간(초)을 반환합니다."""
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= 1
+        wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+        return max(wait, self.blocked_until - now)
+
+    def refund(self) -> None:
+        self.tokens = min(self.burst, self.tokens + 1)
+
+    def block(self, seconds: float) -> None:
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+
+def _parse_retry_after(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class NotionApiClient:
+    """공유 httpx.AsyncClient 를 감싸 속도 제한, 재시도, GET 합치기를 적용하는 클라이언트.
+
+    rate_key 를 주지 않으면 Authorization 헤더로 키를 정하므로 워크스페이스(토큰)마다 따로 제한됩니다.
+    """
+
+    def __init__(
+        self,
+        client: httpx.AsyncClient,
+        *,
+        rate_per_sec: float = _RATE_PER_SEC,
+        burst: float = _BURST,
+        max_retries: int = _MAX_RETRIES,
+        backoff_base: float = _BACKOFF_BASE,
+        backoff_max: float = _BACKOFF_MAX,
+    ) -> None:
+        self._client = client
+        self._rate = rate_per_sec
+        self._burst = max(1.0, burst)
+        self._max_retries = max_retries
+        self._backoff_base = backoff_base
+        self._backoff_max = backoff_max
+        self._buckets: "OrderedDict[str, _TokenBucket]" = OrderedDict()
+        self._in_flight: Dict[Tuple[Any, ...], asyncio.Task] = {}
+
+    @property
+    def http_client(self) -> httpx.AsyncClient:
+        return self._client
+
+    # ------------------------------------------------------------------ 속도 제한
+
+    def _bucket(self, rate_key: str) -> _TokenBucket:
+        bucket = self._buckets.get(rate_key)
+        if bucket is None:
+            bucket = self._buckets[rate_key] = _TokenBucket(self._rate, self._burst)
+            while len(self._buckets) > _MAX_BUCKETS:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(rate_key)
+        return bucket
+
+    async def _acquire(self, bucket: _TokenBucket) -> None:
+        wait = bucket.reserve()
+        NOTION_API_QUEUE_WAIT.observe(wait)
+        if wait <= 0:
+            return
+        try:
+            await asyncio.sleep(wait)
+        except asyncio.CancelledError:
+            bucket.refund()
+            raise
+
+    @staticmethod
+    def _rate_key_from(request: httpx.Request) -> str:
+        auth = request.headers.get("Authorization", "")
+        # 토큰 원문을 메모리 키로 들고 있지 않도록 해시
+        return hashlib.sha256(auth.encode("utf-8")).hexdigest()[:32] if auth else "anonymous"
+
+    def _backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self._backoff_max, self._backoff_base * (2 ** attempt)))
+
+    # ------------------------------------------------------------------ 요청
+
+    async def _send(self, request: httpx.Request, rate_key: str) -> httpx.Response:
+        bucket = self._bucket(rate_key)
+        retry_all = request.method in _IDEMPOTENT_METHODS
+        attempt = 0
+        while True:
+            await self._acquire(bucket)
+            try:
+                response = await self._client.send(request)
+            except httpx.TransportError as e:
+                if not retry_all or attempt >= self._max_retries:
+                    raise
+                NOTION_API_RETRIES.labels(reason="transport").inc()
+                delay = self._backoff(attempt)
+                logger.warning("Notion API 전송 오류, %.2fs 후 재시도 %s %s: %r", delay, request.method, request.url, e)
+            else:
+                NOTION_API_RESPONSES.labels(method=request.method, status=f"{response.status_code // 100}xx").inc()
+                if response.status_code == 429:
+                    reason = "rate_limited"
+                elif response.status_code in _RETRYABLE_STATUS and retry_all:
+                    reason = "server_error"
+                else:
+                    return response
+                if attempt >= self._max_retries:
+                    return response
+
+                retry_after = _parse_retry_after(response.headers.get("Retry-After"))
+                if retry_after is not None:
+                    # 같은 키로 기다리는 다른 요청도 함께 멈춤
+                    delay = min(self._backoff_max, retry_after) + random.uniform(0, self._backoff_base)
+                    bucket.block(delay)
+                else:
+                    delay = self._backoff(attempt)
+                NOTION_API_RETRIES.labels(reason=reason).inc()
+                logger.warning(
+                    "Notion API %s, %.2fs 후 재시도 %s %s", response.status_code, delay, request.method, request.url
+                )
+                await response.aclose()
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    async def request(self, method: str, url: str, *, rate_key: Optional[str] = None, **kwargs: Any) -> httpx.Response:
+        request = self._client.build_request(method, url, **kwargs)
+        rate_key = rate_key or self._rate_key_from(request)
+        if request.method != "GET":
+            return await self._send(request, rate_key)
+
+        # 같은 GET이 진행 중이면 그 결과를 공유. 요청한 쪽이 취소되어도 진행 중인 요청은 유지
+        key = (rate_key, str(request.url), request.headers.get("Authorization"), request.headers.get("Notion-Version"))
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._send(request, rate_key))
+            self._in_flight[key] = task
+            task.add_done_callback(lambda t: self._forget(key, t))
+        else:
+            NOTION_API_COALESCED.inc()
+        return await asyncio.shield(task)
+
+    def _forget(self, key: Tuple[Any, ...], task: asyncio.Task) -> None:
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        # 기다리던 쪽이 모두 취소된 경우 예외 미확인 경고를 막음
+        if not task.cancelled():
+            task.exception()
+
+    async def get(self, url: str, **kwargs: Any) -> httpx.Response:
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url: str, **kwargs: Any) -> httpx.Response:
+        return await self.request("POST", url, **kwargs)
+
+    async def patch(self, url: str, **kwargs: Any) -> httpx.Response:
+        return await self.request("PATCH", url, **kwargs)
+
+    async def delete(self, url: str, **kwargs: Any) -> httpx.Response:
+        return await self.request("DELETE", url, **kwargs)
+
+
+class SharedNotionApiClient:
+    """공유 httpx 클라이언트 위에 NotionApiClient 하나를 처음 쓸 때 만들어 둡니다."""
+
+    def __init__(self) -> None:
+        self._http_client_provider: Optional[Callable[[], httpx.AsyncClient]] = None
+        self._client: Optional[NotionApiClient] = None
+
+    def bind(self, http_client_provider: Callable[[], httpx.AsyncClient]) -> None:
+        """공유 httpx 클라이언트를 얻는 함수를 연결합니다. 앱 lifespan 에서 호출."""
+        self._http_client_provider = http_client_provider
+        self._client = None
+
+    def get(self) -> NotionApiClient:
+        if self._http_client_provider is None:
+            raise RuntimeError("notion_api is not bound; call notion_api.bind() in the app lifespan")
+        http_client = self._http_client_provider()
+        # 종료 후 다시 만들어진 httpx 클라이언트에는 새 NotionApiClient 를 씌움
+        if self._client is None or self._client.http_client is not http_client:
+            self._client = NotionApiClient(http_client)
+        return self._client
+
+
+notion_api = SharedNotionApiClient()
+
+
+# notion api (속도 제한/재시도 적용) FastAPI 의존성
+def get_notion_api_client() -> NotionApiClient:
+    return notion_api.get()
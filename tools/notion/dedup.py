@@ -0,0 +1,163 @@
+#####################################################
+#                                                   #
+#            Notion 웹훅 중복 전달 방지 캐시            #
+#                                                   #
+#####################################################
+
+# Notion은 전달 실패 시 같은 이벤트를 재전송합니다.
+# 이벤트 id(없으면 본문 digest)를 키로 TTL + LRU 메모리 캐시에 기록하고,
+# 선택적으로 SQLite 영속 계층에도 남겨 재시작 후에도 중복을 걸러냅니다.
+# 원본이 아직 처리(큐 적재) 중일 때 도착한 중복은 원본의 결과를 기다립니다.
+#   - 원본이 적재되면(confirm) 중복으로 응답하고, 실패하면(release) 중복 쪽이 예약을 이어받아 직접 처리합니다.
+
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from config.metrics import NOTION_DEDUP_EVICTIONS, NOTION_DEDUP_LOOKUPS
+
+
+def delivery_key(workspace_id: str, payload: Any, body_sha256: str) -> str:
+    """이벤트 id가 있으면 id, 없으면 본문 sha256(hex)으로 중복 판정 키를 만듭니다."""
+    event_id = None
+    if isinstance(payload, dict):
+        for field in ("id", "event_id", "eventId", "delivery_id"):
+            value = payload.get(field)
+            if isinstance(value, str) and value:
+                event_id = value
+                break
+    if event_id is None:
+        event_id = "sha256:" + body_sha256
+    return f"{workspace_id}:{event_id}"
+
+
+class DeliveryDedup:
+    """TTL + LRU 메모리 계층과 선택적 SQLite 영속 계층으로 구성된 중복 판정 캐시."""
+
+    def __init__(self, *, capacity: int = 100000, ttl: float = 3600.0, db_file: Optional[str] = None) -> None:
+        self._capacity = capacity
+        self._ttl = ttl
+        # key -> 만료 시각
+        self._entries: "OrderedDict[str, float]" = OrderedDict()
+        # 처리 중인 예약 -> 결과(적재되면 True, 해제되면 False)
+        self._inflight: Dict[str, "asyncio.Future[bool]"] = {}
+
+        self._db_file = db_file
+        self._conn: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        self._db_writes = 0
+
+    # ------------------------------------------------------------------ 메모리 계층
+
+    def _lookup_memory(self, key: str, now: float) -> bool:
+        expires_at = self._entries.get(key)
+        if expires_at is None:
+            return False
+        if expires_at <= now:
+            del self._entries[key]
+            NOTION_DEDUP_EVICTIONS.labels(reason="ttl").inc()
+            return False
+        self._entries.move_to_end(key)
+        return True
+
+    def _remember(self, key: str, expires_at: float) -> None:
+        self._entries[key] = expires_at
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._capacity:
+            self._entries.popitem(last=False)
+            NOTION_DEDUP_EVICTIONS.labels(reason="capacity").inc()
+
+    # ------------------------------------------------------------------ 영속 계층
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self._db_file) or ".", exist_ok=True)
+            conn = sqlite3.connect(self._db_file, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS deliveries (key TEXT PRIMARY KEY, expires_at REAL NOT NULL)")
+            self._conn = conn
+        return self._conn
+
+    def _lookup_db(self, key: str, now: float) -> Optional[float]:
+        with self._db_lock:
+            row = self._connection().execute(
+                "SELECT expires_at FROM deliveries WHERE key = ? AND expires_at > ?", (key, now)
+            ).fetchone()
+        return row[0] if row else None
+
+    def _store_db(self, key: str, expires_at: float) -> None:
+        with self._db_lock:
+            conn = self._connection()
+            conn.execute("INSERT OR REPLACE INTO deliveries (key, expires_at) VALUES (?, ?)", (key, expires_at))
+            self._db_writes += 1
+            # 가끔씩 만료된 키를 정리
+            if self._db_writes % 1000 == 0:
+                conn.execute("DELETE FROM deliveries WHERE expires_at <= ?", (time.time(),))
+
+    # ------------------------------------------------------------------ API
+
+    async def check_and_reserve(self, key: str) -> bool:
+        """이미 처리한 전달이면 True, 처음이면 키를 예약하고 False를 반환합니다.
+
+        메모리 예약은 await 전에 끝나므로 동시에 도착한 같은 전달도 한 번만 통과합니다.
+        False 를 받은 쪽은 반드시 confirm(적재 성공) 또는 release(실패) 중 하나를 호출해야 합니다.
+        """
+        while True:
+            inflight = self._inflight.get(key)
+            if inflight is None:
+                break
+            # 기다리는 쪽이 취소되어도 원본의 결과에는 영향이 없도록
+            if await asyncio.shield(inflight):
+                NOTION_DEDUP_LOOKUPS.labels(result="hit").inc()
+                return True
+
+        now = time.time()
+        if self._lookup_memory(key, now):
+            NOTION_DEDUP_LOOKUPS.labels(result="hit").inc()
+            return True
+        self._remember(key, now + self._ttl)
+        self._inflight[key] = asyncio.get_running_loop().create_future()
+
+        if self._db_file:
+            try:
+                expires_at = await asyncio.to_thread(self._lookup_db, key, now)
+            except BaseException:
+                self.release(key)
+                raise
+            if expires_at is not None:
+                self._remember(key, expires_at)
+                self._settle(key, True)
+                NOTION_DEDUP_LOOKUPS.labels(result="hit").inc()
+                return True
+
+        NOTION_DEDUP_LOOKUPS.labels(result="miss").inc()
+        return False
+
+    def _settle(self, key: str, confirmed: bool) -> None:
+        inflight = self._inflight.pop(key, None)
+        if inflight is not None and not inflight.done():
+            inflight.set_result(confirmed)
+
+    async def confirm(self, key: str) -> None:
+        """예약한 전달이 적재되었음을 알리고 영속 계층에 기록합니다."""
+        # 적재는 이미 끝났으므로 기다리던 중복에는 먼저 알림
+        self._settle(key, True)
+        if self._db_file:
+            expires_at = self._entries.get(key, time.time() + self._ttl)
+            await asyncio.to_thread(self._store_db, key, expires_at)
+
+    def release(self, key: str) -> None:
+        """예약을 해제합니다. 기다리던 중복 중 하나가 예약을 이어받습니다."""
+        self._entries.pop(key, None)
+        self._settle(key, False)
+
+    def close(self) -> None:
+        with self._db_lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
@@ -0,0 +1,413 @@
+#####################################################
+#                                                   #
+#          Notion 페이지 임베딩 파이프라인 / 검색           #
+#                                                   #
+#####################################################
+
+# 처리 흐름
+#   - 페이지 캐시(tools/notion/page_cache.py)가 웹훅으로 페이지를 새로 받으면 본문 텍스트를 submit 합니다.
+#   - 모인 페이지는 개수/글자 수 한도에 닿거나 최대 대기 시간이 지나면 embeddings API 한 번으로 보냅니다.
+#     (여러 워크스페이스의 페이지도 한 요청에 함께 보냄)
+#   - 모델 + 텍스트의 해시가 인덱스에 있는 것과 같으면 건너뛰고, 다른 페이지에 같은 내용이 있으면 그 벡터를 복사합니다.
+#   - 벡터는 워크스페이스별 메모리 매핑 인덱스(tools/notion/vector_index.py)에 저장하고,
+#     GET /notion/search 는 질의를 임베딩해 코사인 유사도 상위 k개를 반환합니다.
+#   - 검색은 해당 워크스페이스의 자동화 시크릿(X-Notion-Automation-Secret) 또는 관리자 토큰(X-Admin-Token)이 필요하며,
+#     저장소에 없는 워크스페이스나 인덱스가 없는 워크스페이스는 질의를 임베딩하지 않습니다.
+#   - 기본값은 꺼짐(NOTION_EMBEDDINGS_ENABLED=1 로 켬). 켜면 변경된 페이지마다 임베딩 비용이 듭니다.
+#     캐시에 없던 페이지도 받아야 하므로 켜면 페이지 캐시 prefetch(NOTION_PAGE_CACHE_PREFETCH)도 함께 켜집니다.
+#
+# numpy 는 기동 시간을 늘리지 않도록 인덱스를 처음 열 때 불러옵니다.
+
+import asyncio
+import hashlib
+import os
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Tuple
+
+from fastapi import APIRouter, Header, HTTPException, Query
+
+from config.metrics import (
+    NOTION_EMBEDDING_BATCH_SIZE,
+    NOTION_EMBEDDING_ITEMS,
+    NOTION_EMBEDDING_PENDING,
+    NOTION_EMBEDDING_SEARCH_SECONDS,
+)
+from config.clients import AdaptiveLimiter, OpenAIOverloaded
+from config.dependencies import is_admin_token
+from config.tracing import start_span
+from tools.notion.page_cache import CachedPage, page_cache
+from tools.notion.store import async_store
+from logs.logging_util import LoggerSingleton
+import logging
+
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
+
+    from tools.notion.vector_index import IndexStore
+
+
+logger = LoggerSingleton.get_logger(logger_name="notion_embeddings", level=logging.INFO)
+
+router = APIRouter(prefix="/notion", tags=["notion-search"])
+
+##### 설정 #####
+EMBEDDING_MODEL = os.getenv("NOTION_EMBEDDING_MODEL", "text-embedding-3-small")
+# 1이면 페이지 캐시가 새로 받은 페이지를 임베딩함 (0이면 검색은 기존 인덱스로만 동작)
+_ENABLED = os.getenv("NOTION_EMBEDDINGS_ENABLED", "0") == "1"
+_BATCH_SIZE = int(os.getenv("NOTION_EMBEDDING_BATCH_SIZE", "64"))
+# 한 요청의 입력 글자 수 합 한도 (대략 4글자 = 1토큰)
+_BATCH_MAX_CHARS = int(os.getenv("NOTION_EMBEDDING_BATCH_MAX_CHARS", "400000"))
+# 첫 페이지가 들어온 뒤 배치를 보내기까지 최대 대기 시간(초)
+_MAX_LATENCY = float(os.getenv("NOTION_EMBEDDING_MAX_LATENCY", "2"))
+# 페이지 하나에서 임베딩할 최대 글자 수 (모델 입력 한도 8191 토큰 이내)
+_MAX_INPUT_CHARS = int(os.getenv("NOTION_EMBEDDING_MAX_INPUT_CHARS", "24000"))
+_MAX_OPEN_INDEXES = int(os.getenv("NOTION_EMBEDDING_MAX_OPEN_INDEXES", "64"))
+_INDEX_DIR = os.path.join(os.getcwd(), "data", "embeddings")
+
+# 실패한 배치를 다시 보내기까지의 최대 대기(초)
+_RETRY_MAX = 60.0
+
+PageKey = Tuple[str, str]
+
+
+def _plain_text(rich_text: Any) -> str:
+    if not isinstance(rich_text, list):
+        return ""
+    return "".join(part.get("plain_text", "") for part in rich_text if isinstance(part, dict))
+
+
+def page_title(page: Dict[str, Any]) -> str:
+    properties = page.get("properties") or {}
+    for value in properties.values():
+        if isinstance(value, dict) and (value.get("type") == "title" or "title" in value):
+            return _plain_text(value.get("title"))
+    return ""
+
+
+def page_text(entry: CachedPage) -> str:
+    """페이지 제목과 최상위 블록의 텍스트를 줄 단위로 합칩니다."""
+    title = page_title(entry.page)
+    lines: List[str] = [title] if title else []
+    for block in entry.blocks:
+        body = block.get(block.get("type", ""), {})
+        if isinstance(body, dict):
+            text = _plain_text(body.get("rich_text"))
+            if text:
+                lines.append(text)
+    return "\n".join(lines)
+
+
+def content_hash(model: str, text: str) -> str:
+    return hashlib.sha256(f"{model}\0{text}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingPipeline:
+    """페이지 텍스트를 모아 배치로 임베딩하고 워크스페이스별 인덱스에 기록합니다."""
+
+    def __init__(
+        self,
+        *,
+        index_dir: str,
+        model: str = "text-embedding-3-small",
+        batch_size: int = 64,
+        batch_max_chars: int = 400000,
+        max_latency: float = 2.0,
+        max_input_chars: int = 24000,
+        max_open_indexes: int = 64,
+    ) -> None:
+        self._index_dir = index_dir
+        self._model = model
+        self._batch_size = max(1, batch_size)
+        self._batch_max_chars = batch_max_chars
+        self._max_latency = max_latency
+        self._max_input_chars = max_input_chars
+        self._max_open_indexes = max_open_indexes
+        self._indexes: Optional["IndexStore"] = None
+
+        self._client_provider: Optional[Callable[[], "AsyncOpenAI"]] = None
+        self._limiter_provider: Optional[Callable[[], AdaptiveLimiter]] = None
+
+        # (workspace_id, page_id) -> (해시, 텍스트). 같은 페이지가 다시 오면 최신 내용으로 교체
+        self._pending: "OrderedDict[PageKey, Tuple[str, str]]" = OrderedDict()
+        self._pending_chars = 0
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._flusher: Optional[asyncio.Task] = None
+        self._failures = 0
+
+    def bind(
+        self,
+        client_provider: Callable[[], "AsyncOpenAI"],
+        limiter_provider: Optional[Callable[[], AdaptiveLimiter]] = None,
+    ) -> None:
+        """OpenAI 클라이언트(와 동시성 제한기)를 얻는 함수를 연결합니다. 앱 lifespan 에서 호출."""
+        self._client_provider = client_provider
+        self._limiter_provider = limiter_provider
+
+    def indexes(self) -> "IndexStore":
+        if self._indexes is None:
+            from tools.notion.vector_index import IndexStore
+
+            self._indexes = IndexStore(self._index_dir, max_open=self._max_open_indexes)
+        return self._indexes
+
+    # ------------------------------------------------------------------ 입력
+
+    def on_page_changed(self, workspace_id: str, page_id: str, entry: Optional[CachedPage]) -> None:
+        """페이지 캐시 구독 함수."""
+        if entry is None:
+            self.remove(workspace_id, page_id)
+        else:
+            self.submit(workspace_id, page_id, page_text(entry))
+
+    def submit(self, workspace_id: str, page_id: str, text: str) -> None:
+        if self._client_provider is None:
+            return
+        text = text[: self._max_input_chars]
+        if not text.strip():
+            self.remove(workspace_id, page_id)
+            return
+        key = (workspace_id, page_id)
+        previous = self._pending.pop(key, None)
+        if previous is not None:
+            self._pending_chars -= len(previous[1])
+        self._pending[key] = (content_hash(self._model, text), text)
+        self._pending_chars += len(text)
+        NOTION_EMBEDDING_PENDING.set(len(self._pending))
+
+        if len(self._pending) >= self._batch_size or self._pending_chars >= self._batch_max_chars:
+            self._kick()
+        elif self._timer is None and (self._flusher is None or self._flusher.done()):
+            self._timer = asyncio.get_running_loop().call_later(self._max_latency, self._kick)
+
+    def remove(self, workspace_id: str, page_id: str) -> None:
+        if self._client_provider is None:
+            return
+        previous = self._pending.pop((workspace_id, page_id), None)
+        if previous is not None:
+            self._pending_chars -= len(previous[1])
+            NOTION_EMBEDDING_PENDING.set(len(self._pending))
+        asyncio.get_running_loop().create_task(self._delete(workspace_id, page_id))
+
+    async def _delete(self, workspace_id: str, page_id: str) -> None:
+        def delete() -> bool:
+            # 색인이 없는 워크스페이스에 디렉터리/잠금 파일을 만들지 않도록, 이미 있을 때만 쓰기용으로 엶
+            indexes = self.indexes()
+            if indexes.find(workspace_id) is None:
+                return False
+            return indexes.get(workspace_id).delete(page_id)
+
+        try:
+            if await asyncio.to_thread(delete):
+                NOTION_EMBEDDING_ITEMS.labels(result="deleted").inc()
+        except Exception as e:
+            logger.warning("임베딩 삭제 실패 ws=%s page=%s: %r", workspace_id, page_id, e)
+
+    # ------------------------------------------------------------------ 배치
+
+    def _kick(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._flusher is None or self._flusher.done():
+            self._flusher = asyncio.get_running_loop().create_task(self._flush_loop())
+
+    def _take_batch(self) -> List[Tuple[PageKey, str, str]]:
+        batch: List[Tuple[PageKey, str, str]] = []
+        chars = 0
+        while self._pending and len(batch) < self._batch_size:
+            key, (digest, text) = next(iter(self._pending.items()))
+            if batch and chars + len(text) > self._batch_max_chars:
+                break
+            del self._pending[key]
+            self._pending_chars -= len(text)
+            chars += len(text)
+            batch.append((key, digest, text))
+        NOTION_EMBEDDING_PENDING.set(len(self._pending))
+        return batch
+
+    async def _flush_loop(self) -> None:
+        # 처리하는 동안 들어온 페이지도 이어서 보냄. 실패하면 _process 가 재시도를 예약
+        while self._pending:
+            if not await self._process(self._take_batch()):
+                return
+
+    async def flush(self) -> None:
+        """대기 중인 페이지를 모두 바로 처리합니다."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        await self._flush_loop()
+
+    async def _process(self, batch: List[Tuple[PageKey, str, str]]) -> bool:
+        """배치 하나를 처리합니다. 실패하면 항목을 되돌리고 재시도를 예약한 뒤 False 를 반환합니다."""
+        try:
+            by_workspace: Dict[str, List[Tuple[str, str, str]]] = {}
+            for (workspace_id, page_id), digest, text in batch:
+                by_workspace.setdefault(workspace_id, []).append((page_id, digest, text))
+
+            # 해시 비교와 기존 벡터 재사용은 인덱스 파일을 읽으므로 스레드에서
+            def classify() -> Dict[str, List[Any]]:
+                indexes = self.indexes()
+                return {
+                    ws: indexes.get(ws).classify([(page_id, digest) for page_id, digest, _ in items])
+                    for ws, items in by_workspace.items()
+                }
+
+            known = await asyncio.to_thread(classify)
+            from tools.notion.vector_index import UNCHANGED
+
+            writes: Dict[str, List[Tuple[str, str, Any]]] = {}
+            missing: List[Tuple[str, str, str, str]] = []
+            for ws, items in by_workspace.items():
+                for (page_id, digest, text), found in zip(items, known[ws]):
+                    if isinstance(found, str) and found == UNCHANGED:  # 배열과 == 비교하지 않도록
+                        NOTION_EMBEDDING_ITEMS.labels(result="unchanged").inc()
+                    elif found is not None:
+                        writes.setdefault(ws, []).append((page_id, digest, found))
+                        NOTION_EMBEDDING_ITEMS.labels(result="reused").inc()
+                    else:
+                        missing.append((ws, page_id, digest, text))
+
+            if missing:
+                vectors = await self._embed([text for _, _, _, text in missing])
+                for (ws, page_id, digest, _), vector in zip(missing, vectors):
+                    writes.setdefault(ws, []).append((page_id, digest, vector))
+                NOTION_EMBEDDING_ITEMS.labels(result="embedded").inc(len(missing))
+
+            if writes:
+                import numpy as np
+
+                def write() -> None:
+                    indexes = self.indexes()
+                    for ws, items in writes.items():
+                        indexes.get(ws).upsert(
+                            self._model, [(page_id, digest, np.asarray(v, dtype=np.float32)) for page_id, digest, v in items]
+                        )
+
+                await asyncio.to_thread(write)
+            self._failures = 0
+            return True
+        except asyncio.CancelledError:
+            self._requeue(batch)
+            raise
+        except Exception as e:
+            self._failures += 1
+            delay = min(_RETRY_MAX, self._max_latency * (2 ** self._failures))
+            retry_after = getattr(e, "retry_after", None)
+            if isinstance(e, OpenAIOverloaded) and retry_after:
+                delay = max(delay, retry_after)
+            logger.warning("임베딩 배치 실패 size=%d failures=%d %.1fs 후 재시도: %r", len(batch), self._failures, delay, e)
+            NOTION_EMBEDDING_ITEMS.labels(result="failed").inc(len(batch))
+            self._requeue(batch)
+            if self._timer is None:
+                self._timer = asyncio.get_running_loop().call_later(delay, self._kick)
+            return False
+
+    def _requeue(self, batch: List[Tuple[PageKey, str, str]]) -> None:
+        # 그 사이 새 내용이 들어온 페이지는 새 내용을 유지
+        for key, digest, text in reversed(batch):
+            if key not in self._pending:
+                self._pending[key] = (digest, text)
+                self._pending.move_to_end(key, last=False)
+                self._pending_chars += len(text)
+        NOTION_EMBEDDING_PENDING.set(len(self._pending))
+
+    async def _embed(self, texts: List[str]) -> List[List[float]]:
+        if self._client_provider is None:
+            raise RuntimeError("EmbeddingPipeline is not bound to an OpenAI client")
+        client = self._client_provider()
+        NOTION_EMBEDDING_BATCH_SIZE.observe(len(texts))
+        limiter = self._limiter_provider() if self._limiter_provider is not None else None
+        # 검색 요청에서는 요청 트레이스의 하위 스팬, 배치 처리에서는 단독 트레이스
+        with start_span("openai.embeddings", run_type="embedding", model=self._model, inputs=len(texts)) as span:
+            if limiter is None:
+                response = await client.embeddings.create(model=self._model, input=texts, encoding_format="float")
+            else:
+                # 토큰 예산은 입력 길이로 추정하고, 응답의 실제 사용량으로 정산
+                async with limiter.slot(messages=[{"content": text} for text in texts], max_tokens=1) as permit:
+                    response = await client.embeddings.create(model=self._model, input=texts, encoding_format="float")
+                    permit.settle(response.usage.total_tokens if response.usage else None)
+            span.set(total_tokens=response.usage.total_tokens if response.usage else None)
+        return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+
+    # ------------------------------------------------------------------ 검색
+
+    async def search(self, workspace_id: str, query: str, k: int = 10) -> List[Tuple[str, float]]:
+        # 인덱스가 없으면 질의를 임베딩하지 않음. 조회용으로 열어 파일을 만들지 않음
+        index = await asyncio.to_thread(lambda: self.indexes().find(workspace_id))
+        if index is None:
+            return []
+        vector = (await self._embed([query[: self._max_input_chars]]))[0]
+
+        def scan() -> List[Tuple[str, float]]:
+            import numpy as np
+
+            started = time.perf_counter()
+            try:
+                return index.search(np.asarray(vector, dtype=np.float32), k)
+            finally:
+                NOTION_EMBEDDING_SEARCH_SECONDS.observe(time.perf_counter() - started)
+
+        return await asyncio.to_thread(scan)
+
+    async def aclose(self, timeout: float = 10.0) -> None:
+        """남은 페이지를 가능한 만큼 처리하고 인덱스를 닫습니다."""
+        if self._flusher is not None and not self._flusher.done():
+            self._flusher.cancel()
+            await asyncio.gather(self._flusher, return_exceptions=True)
+        try:
+            await asyncio.wait_for(self.flush(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning("종료 중 임베딩 미처리 pending=%d", len(self._pending))
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._indexes is not None:
+            self._indexes.close()
+
+
+embedding_pipeline = EmbeddingPipeline(
+    index_dir=_INDEX_DIR,
+    model=EMBEDDING_MODEL,
+    batch_size=_BATCH_SIZE,
+    batch_max_chars=_BATCH_MAX_CHARS,
+    max_latency=_MAX_LATENCY,
+    max_input_chars=_MAX_INPUT_CHARS,
+    max_open_indexes=_MAX_OPEN_INDEXES,
+)
+
+if _ENABLED:
+    page_cache.subscribe(embedding_pipeline.on_page_changed, prefetch=True)
+
+
+@router.get("/search")
+async def search(
+    workspace_id: str = Query(...),
+    q: str = Query(..., min_length=1),
+    k: int = Query(10, ge=1, le=100),
+    x_notion_automation_secret: Optional[str] = Header(None),
+    x_admin_token: Optional[str] = Header(None),
+):
+    # 다른 워크스페이스의 페이지를 볼 수 없도록 해당 워크스페이스의 시크릿 또는 관리자 토큰 확인
+    if not is_admin_token(x_admin_token):
+        if not x_notion_automation_secret:
+            raise HTTPException(status_code=401, detail="credential required")
+        if await async_store.get_workspace_id_by_incoming_secret(x_notion_automation_secret) != workspace_id:
+            raise HTTPException(status_code=403, detail="forbidden")
+    if await async_store.get_workspace(workspace_id) is None:
+        raise HTTPException(status_code=404, detail="workspace not found")
+    try:
+        hits = await embedding_pipeline.search(workspace_id, q, k)
+    except OpenAIOverloaded as e:
+        raise HTTPException(
+            status_code=503,
+            detail="검색 요청이 많아 잠시 후 다시 시도해 주세요",
+            headers={"Retry-After": str(max(1, int(e.retry_after)))},
+        )
+    results = []
+    for page_id, score in hits:
+        cached = page_cache.peek(workspace_id, page_id)
+        title = page_title(cached.page) if cached is not None else ""
+        results.append({"page_id": page_id, "score": round(score, 6), "title": title or None})
+    return {"workspace_id": workspace_id, "model": EMBEDDING_MODEL, "results": results}
@@ -0,0 +1,405 @@
+#####################################################
+#                                                   #
+#          Notion 웹훅 이벤트 내구성 큐/워커           #
+#                                                   #
+#####################################################
+
+# 처리 흐름
+#   - /notion/webhook 은 검증 후 이벤트를 SQLite(WAL) 큐에 넣고 바로 응답합니다.
+#   - EventWorkerPool 의 비동기 워커들이 큐를 비우며, 실패한 항목은 지수 백오프로 재시도하고
+#     최대 시도 횟수를 넘으면 dead 상태로 남깁니다.
+#   - 항목은 임대(lease) 방식으로 꺼내므로 워커/프로세스가 죽으면 임대 만료 후 다시 처리됩니다.
+#     꺼낼 때마다 새 lease_token 을 발급하며, 완료/재시도는 토큰이 그대로일 때만 반영합니다.
+#     (임대가 만료되어 다른 워커가 다시 가져간 항목을 늦게 끝난 워커가 지우거나 깊이를 두 번 줄이지 않음)
+#   - ordering_key 로 항목의 페이지 키를 함께 저장하며, 같은 페이지에 아직 끝나지 않은(임대 중이거나
+#     재시도 대기 중인) 앞선 항목이 있으면 뒤 항목은 꺼내지 않습니다. 같은 페이지의 이벤트는 들어온 순서대로 처리됩니다.
+#   - 넣을 때 받은 워크스페이스 등급(tier)을 함께 저장해, 처리 시간 메트릭을 항목마다 다시 조회하지 않고 기록합니다.
+
+import asyncio
+import json
+import os
+import random
+import secrets
+import sqlite3
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+from config.metrics import (
+    NO_TIER,
+    NOTION_EVENT_HANDLER_SECONDS,
+    NOTION_EVENT_QUEUE_DEPTH,
+    NOTION_EVENT_QUEUE_LAG,
+    NOTION_EVENT_QUEUE_PROCESSED,
+    NOTION_EVENT_WORKERS,
+    NOTION_EVENT_WORKERS_BUSY,
+)
+from logs.logging_util import LoggerSingleton
+import logging
+
+
+logger = LoggerSingleton.get_logger(logger_name="notion_event_queue", level=logging.INFO)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    workspace_id TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    enqueued_at REAL NOT NULL,
+    available_at REAL NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    status TEXT NOT NULL DEFAULT 'ready',
+    leased_until REAL,
+    last_error TEXT,
+    page_key TEXT,
+    tier TEXT,
+    lease_token TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_events_status_available ON events(status, available_at);
+"""
+# 나중에 추가된 열. 기존 DB 에는 열 때 추가
+_ADDED_COLUMNS = {"page_key": "TEXT", "tier": "TEXT", "lease_token": "TEXT"}
+_PAGE_INDEX = "CREATE INDEX IF NOT EXISTS idx_events_page ON events(workspace_id, page_key, id)"
+
+# 같은 페이지의 앞선 항목이 끝나지 않았으면(dead 제외) 꺼내지 않음
+_CLAIM_SQL = (
+    "SELECT id, workspace_id, payload, enqueued_at, attempts, tier FROM events AS e "
+    "WHERE ((e.status = ? AND e.available_at <= ?) OR (e.status = ? AND e.leased_until <= ?)) "
+    "AND (e.page_key IS NULL OR NOT EXISTS ("
+    "SELECT 1 FROM events AS p WHERE p.workspace_id = e.workspace_id AND p.page_key = e.page_key "
+    "AND p.id < e.id AND p.status != ?)) "
+    "ORDER BY e.id LIMIT 1"
+)
+
+_READY = "ready"
+_LEASED = "leased"
+_DEAD = "dead"
+
+
+class QueueFull(Exception):
+    """큐 깊이가 한도를 넘어 새 항목을 받을 수 없음."""
+
+
+class QueuedEvent:
+    __slots__ = ("id", "workspace_id", "payload", "enqueued_at", "attempts", "tier", "lease_token")
+
+    def __init__(
+        self,
+        id: int,
+        workspace_id: str,
+        payload: Dict[str, Any],
+        enqueued_at: float,
+        attempts: int,
+        tier: str,
+        lease_token: str,
+    ) -> None:
+        self.id = id
+        self.workspace_id = workspace_id
+        self.payload = payload
+        self.enqueued_at = enqueued_at
+        self.attempts = attempts
+        self.tier = tier
+        self.lease_token = lease_token
+
+
+class EventQueue:
+    """SQLite 파일 하나에 보관되는 내구성 이벤트 큐. DB 작업은 스레드에서 수행합니다."""
+
+    def __init__(
+        self,
+        db_file: str,
+        *,
+        max_depth: int = 10000,
+        lease_seconds: float = 60.0,
+        max_attempts: int = 5,
+        backoff_base: float = 1.0,
+        backoff_max: float = 300.0,
+        ordering_key: Optional[Callable[[Dict[str, Any]], Optional[str]]] = None,
+    ) -> None:
+        self._db_file = db_file
+        self._ordering_key = ordering_key
+        self.max_depth = max_depth
+        self._lease_seconds = lease_seconds
+        self._max_attempts = max_attempts
+        self._backoff_base = backoff_base
+        self._backoff_max = backoff_max
+
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._depth = 0
+        # 같은 프로세스에서 큐가 바뀌면(적재/완료/재시도) 워커를 즉시 깨움.
+        # 변경마다 번호를 올리고 그때까지 기다리던 Event 를 set 한 뒤 버림(한 번 쓰고 버리므로 clear 없음).
+        # 워커는 꺼내기 전에 본 번호가 이미 바뀌었으면 기다리지 않으므로 다른 워커가 깨움을 가로채지 않음
+        self._changed: Optional[asyncio.Event] = None
+        self._changes = 0
+
+    # ------------------------------------------------------------------ 연결
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self._db_file) or ".", exist_ok=True)
+            conn = sqlite3.connect(self._db_file, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=30000")
+            conn.executescript(_SCHEMA)
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(events)")}
+            for column, column_type in _ADDED_COLUMNS.items():
+                if column not in columns:
+                    conn.execute(f"ALTER TABLE events ADD COLUMN {column} {column_type}")
+            conn.execute(_PAGE_INDEX)
+            self._conn = conn
+            self._refresh_depth_locked()
+        return self._conn
+
+    def _refresh_depth_locked(self) -> None:
+        row = self._conn.execute("SELECT COUNT(*) FROM events WHERE status != ?", (_DEAD,)).fetchone()
+        self._depth = row[0]
+        NOTION_EVENT_QUEUE_DEPTH.set(self._depth)
+
+    def _notify(self) -> None:
+        self._changes += 1
+        if self._changed is not None:
+            self._changed.set()
+            self._changed = None
+
+    @property
+    def changes(self) -> int:
+        """큐 변경 번호. claim 전에 읽어 두었다가 빈 결과면 wait_available 에 넘깁니다."""
+        return self._changes
+
+    # ------------------------------------------------------------------ 동기 DB 작업
+
+    def _row(
+        self, workspace_id: str, payload: str, tier: str, now: float
+    ) -> Tuple[str, str, Optional[str], str, float, float]:
+        key = None
+        if self._ordering_key is not None:
+            try:
+                decoded = json.loads(payload)
+            except ValueError:
+                decoded = None
+            if isinstance(decoded, dict):
+                key = self._ordering_key(decoded)
+        return workspace_id, payload, key, tier, now, now
+
+    def _enqueue_sync(self, workspace_id: str, payloads: Iterable[str], count: int, tier: str) -> None:
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            if self._depth + count > self.max_depth:
+                # 다른 프로세스가 비웠을 수 있으므로 한 번 다시 셈
+                self._refresh_depth_locked()
+                # 한도보다 큰 배치는 기다려도 들어갈 수 없으므로 큐가 비어 있으면 받음 (재전송이 끝없이 반복되지 않도록)
+                if self._depth + count > self.max_depth and not (count > self.max_depth and self._depth == 0):
+                    raise QueueFull(f"queue depth {self._depth} + {count} > {self.max_depth}")
+                if count > self.max_depth:
+                    logger.warning("한도보다 큰 배치를 빈 큐에 받음 count=%d max_depth=%d", count, self.max_depth)
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                # 이터레이터를 그대로 넘겨 항목을 한꺼번에 메모리에 올리지 않음
+                conn.executemany(
+                    "INSERT INTO events (workspace_id, payload, page_key, tier, enqueued_at, available_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (self._row(workspace_id, p, tier, now) for p in payloads),
+                )
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+            self._depth += count
+            NOTION_EVENT_QUEUE_DEPTH.set(self._depth)
+
+    def _claim_sync(self) -> Optional[QueuedEvent]:
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            token = secrets.token_hex(8)
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(_CLAIM_SQL, (_READY, now, _LEASED, now, _DEAD)).fetchone()
+                if row is not None:
+                    conn.execute(
+                        "UPDATE events SET status = ?, leased_until = ?, lease_token = ? WHERE id = ?",
+                        (_LEASED, now + self._lease_seconds, token, row[0]),
+                    )
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+            if row is None:
+                self._refresh_depth_locked()
+                return None
+        return QueuedEvent(row[0], row[1], json.loads(row[2]), row[3], row[4], row[5] or NO_TIER, token)
+
+    def _ack_sync(self, event: QueuedEvent) -> bool:
+        """항목을 지우고, 임대를 잃어 지우지 못했으면 False를 반환합니다."""
+        with self._lock:
+            cursor = self._connection().execute(
+                "DELETE FROM events WHERE id = ? AND lease_token = ?", (event.id, event.lease_token)
+            )
+            if cursor.rowcount == 0:
+                return False
+            self._depth = max(0, self._depth - 1)
+            NOTION_EVENT_QUEUE_DEPTH.set(self._depth)
+        return True
+
+    def _retry_sync(self, event: QueuedEvent, error: str) -> bool:
+        """재시도 일정을 잡고, 최대 시도 횟수를 넘어 dead 처리되면 False를 반환합니다.
+
+        임대를 잃은 경우에는 아무것도 바꾸지 않고 True(다른 워커가 처리 중)를 반환합니다.
+        """
+        attempts = event.attempts + 1
+        if attempts >= self._max_attempts:
+            status, available_at = _DEAD, time.time()
+        else:
+            # 지터가 섞인 지수 백오프
+            delay = min(self._backoff_max, self._backoff_base * (2 ** (attempts - 1)))
+            status, available_at = _READY, time.time() + random.uniform(delay / 2, delay)
+        with self._lock:
+            cursor = self._connection().execute(
+                "UPDATE events SET status = ?, attempts = ?, available_at = ?, leased_until = NULL, "
+                "lease_token = NULL, last_error = ? WHERE id = ? AND lease_token = ?",
+                (status, attempts, available_at, error[:1000], event.id, event.lease_token),
+            )
+            if cursor.rowcount == 0:
+                logger.warning("임대가 만료된 항목의 재시도를 건너뜀 id=%s", event.id)
+                return True
+            if status == _DEAD:
+                self._depth = max(0, self._depth - 1)
+                NOTION_EVENT_QUEUE_DEPTH.set(self._depth)
+        return status != _DEAD
+
+    # ------------------------------------------------------------------ 비동기 API
+
+    def depth(self) -> int:
+        return self._depth
+
+    def _open_sync(self) -> None:
+        with self._lock:
+            self._connection()
+
+    async def open(self) -> None:
+        await asyncio.to_thread(self._open_sync)
+
+    async def enqueue(self, workspace_id: str, payloads: List[Dict[str, Any]], *, tier: str = NO_TIER) -> None:
+        """이벤트들을 한 트랜잭션으로 넣습니다. 한도를 넘으면 QueueFull을 발생시킵니다."""
+        encoded = [json.dumps(p, ensure_ascii=False, separators=(",", ":")) for p in payloads]
+        await self.enqueue_raw(workspace_id, encoded, len(encoded), tier=tier)
+
+    async def enqueue_raw(
+        self, workspace_id: str, payloads: Iterable[str], count: int, *, tier: str = NO_TIER
+    ) -> None:
+        """이미 JSON 텍스트인 이벤트 count개를 한 트랜잭션으로 넣습니다. 전부 들어가거나 하나도 들어가지 않습니다."""
+        await asyncio.to_thread(self._enqueue_sync, workspace_id, payloads, count, tier)
+        self._notify()
+
+    async def claim(self) -> Optional[QueuedEvent]:
+        return await asyncio.to_thread(self._claim_sync)
+
+    async def ack(self, event: QueuedEvent) -> bool:
+        acked = await asyncio.to_thread(self._ack_sync, event)
+        # 같은 페이지의 다음 항목을 기다리던 워커를 깨움
+        self._notify()
+        return acked
+
+    async def retry(self, event: QueuedEvent, error: str) -> bool:
+        retried = await asyncio.to_thread(self._retry_sync, event, error)
+        self._notify()
+        return retried
+
+    async def wait_available(self, seen: int, timeout: float) -> None:
+        """변경 번호가 seen 에서 바뀌거나 timeout 이 지날 때까지 기다립니다."""
+        if self._changes != seen:
+            return
+        if self._changed is None:
+            self._changed = asyncio.Event()
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+class EventWorkerPool:
+    """큐를 비우는 비동기 워커 묶음."""
+
+    def __init__(
+        self,
+        queue: EventQueue,
+        handler: Callable[[str, Dict[str, Any]], Awaitable[None]],
+        *,
+        concurrency: int = 4,
+        poll_interval: float = 0.5,
+    ) -> None:
+        self._queue = queue
+        self._handler = handler
+        self._concurrency = max(1, concurrency)
+        self._poll_interval = poll_interval
+        self._tasks: List[asyncio.Task] = []
+        self._busy = 0
+
+    async def start(self) -> None:
+        if self._tasks:
+            return
+        await self._queue.open()
+        NOTION_EVENT_WORKERS.set(self._concurrency)
+        self._tasks = [
+            asyncio.create_task(self._run(), name=f"notion-event-worker-{i}") for i in range(self._concurrency)
+        ]
+        logger.info("이벤트 워커 시작 workers=%s depth=%s", self._concurrency, self._queue.depth())
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        NOTION_EVENT_WORKERS.set(0)
+        self._queue.close()
+
+    async def _run(self) -> None:
+        while True:
+            # 꺼내는 동안 들어온 변경을 놓치지 않도록 먼저 읽어 둠
+            seen = self._queue.changes
+            try:
+                event = await self._queue.claim()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.exception("이벤트 큐 조회 오류: %s", e)
+                await asyncio.sleep(self._poll_interval)
+                continue
+
+            if event is None:
+                await self._queue.wait_available(seen, self._poll_interval)
+                continue
+
+            NOTION_EVENT_QUEUE_LAG.observe(max(0.0, time.time() - event.enqueued_at))
+            self._busy += 1
+            NOTION_EVENT_WORKERS_BUSY.set(self._busy)
+            started = time.perf_counter()
+            try:
+                await self._handler(event.workspace_id, event.payload)
+            except asyncio.CancelledError:
+                # 임대가 만료되면 다른 워커가 다시 처리
+                raise
+            except Exception as e:
+                logger.exception("이벤트 처리 오류 id=%s attempts=%s: %s", event.id, event.attempts + 1, e)
+                retried = await self._queue.retry(event, repr(e))
+                NOTION_EVENT_QUEUE_PROCESSED.labels(result="retry" if retried else "dead").inc()
+            else:
+                if await self._queue.ack(event):
+                    NOTION_EVENT_QUEUE_PROCESSED.labels(result="ok").inc()
+                else:
+                    # 처리가 임대 시간을 넘겨 다른 워커가 다시 가져감 (그쪽 결과가 반영됨)
+                    logger.warning("임대가 만료된 뒤 처리가 끝남 id=%s", event.id)
+                    NOTION_EVENT_QUEUE_PROCESSED.labels(result="lease_lost").inc()
+            finally:
+                NOTION_EVENT_HANDLER_SECONDS.labels(tier=event.tier).observe(time.perf_counter() - started)
+                self._busy -= 1
+                NOTION_EVENT_WORKERS_BUSY.set(self._busy)
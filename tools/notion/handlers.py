@@ -0,0 +1,155 @@
+#####################################################
+#                                                   #
+#         Notion 이벤트 유형별 핸들러 등록/디스패치        #
+#                                                   #
+#####################################################
+
+# 이벤트 항목(events 배열의 원소)을 type 에 맞는 핸들러로 보냅니다.
+#   - 핸들러는 @registry.handler("page.content_updated") 처럼 등록하며, "*" 는 모든 유형에 실행됩니다.
+#   - 유형 -> 핸들러 목록은 등록 시점에 미리 계산한 표에서 찾습니다.
+#   - 큐 항목 하나가 이벤트 하나이므로 항목은 순서대로 처리합니다. 동시성은 이벤트 워커 수
+#     (NOTION_EVENT_WORKERS)로 조절하며, 같은 페이지의 순서는 event_queue 가 꺼낼 때 보장합니다.
+#   - 핸들러마다 제한 시간이 있고, 실패/시간 초과가 있어도 나머지 핸들러/항목은 끝까지 실행한 뒤
+#     HandlerFailed 를 발생시켜 큐가 그 항목을 재시도(백오프, dead)하게 합니다.
+#     재시도 시 성공했던 핸들러도 다시 실행되므로 핸들러는 여러 번 실행되어도 안전해야 합니다.
+
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from config.metrics import NOTION_EVENT_ITEM_HANDLED, NOTION_EVENT_ITEM_SECONDS
+from config.tracing import start_span
+from logs.logging_util import LoggerSingleton
+import logging
+
+
+logger = LoggerSingleton.get_logger(logger_name="notion_handlers", level=logging.INFO)
+
+##### 설정 #####
+# 핸들러 기본 제한 시간(초)
+_HANDLER_TIMEOUT = float(os.getenv("NOTION_EVENT_HANDLER_TIMEOUT", "30"))
+
+EventHandler = Callable[[str, Dict[str, Any]], Awaitable[None]]
+
+_ANY = "*"
+
+
+def event_type(item: Dict[str, Any]) -> str:
+    return item.get("type") or item.get("event") or "unknown"
+
+
+def page_key(item: Dict[str, Any]) -> Optional[str]:
+    """항목이 가리키는 페이지 id. 없으면 None."""
+    page_id = item.get("page_id") or item.get("pageId")
+    if page_id:
+        return page_id
+    entity = item.get("entity")
+    if isinstance(entity, dict) and entity.get("type") in (None, "page") and entity.get("id"):
+        return entity["id"]
+    data = item.get("data")
+    if isinstance(data, dict):
+        return data.get("id")
+    return None
+
+
+class HandlerFailed(Exception):
+    """하나 이상의 핸들러가 실패하거나 시간 초과됨."""
+
+
+class _Registered:
+    __slots__ = ("name", "func", "timeout", "handled", "seconds")
+
+    def __init__(self, name: str, func: EventHandler, timeout: float) -> None:
+        self.name = name
+        self.func = func
+        self.timeout = timeout
+        # labels() 조회를 매 항목마다 하지 않도록 자식 메트릭을 미리 만들어 둠
+        self.handled = {
+            result: NOTION_EVENT_ITEM_HANDLED.labels(handler=name, result=result)
+            for result in ("ok", "error", "timeout")
+        }
+        self.seconds = NOTION_EVENT_ITEM_SECONDS.labels(handler=name)
+
+
+class HandlerRegistry:
+    """이벤트 유형 -> 핸들러 등록부."""
+
+    def __init__(self, *, timeout: float = 30.0) -> None:
+        self._timeout = timeout
+        # 등록 순서를 유지하는 유형별 핸들러
+        self._handlers: "OrderedDict[str, List[_Registered]]" = OrderedDict()
+        # 유형 -> 실행할 핸들러 (등록된 유형 + "*"), 처음 보는 유형은 "*" 만
+        self._table: Dict[str, Tuple[_Registered, ...]] = {}
+        self._fallback: Tuple[_Registered, ...] = ()
+
+    def register(
+        self, event_types: Any, func: EventHandler, *, name: Optional[str] = None, timeout: Optional[float] = None
+    ) -> EventHandler:
+        if isinstance(event_types, str):
+            event_types = [event_types]
+        registered = _Registered(name or func.__name__, func, self._timeout if timeout is None else timeout)
+        for event_type_ in event_types:
+            self._handlers.setdefault(event_type_, []).append(registered)
+        self._rebuild()
+        return func
+
+    def handler(self, *event_types: str, name: Optional[str] = None, timeout: Optional[float] = None):
+        """데코레이터 형태의 register. 예: @registry.handler("page.created", timeout=5)"""
+        def decorator(func: EventHandler) -> EventHandler:
+            return self.register(list(event_types), func, name=name, timeout=timeout)
+        return decorator
+
+    def _rebuild(self) -> None:
+        self._fallback = tuple(self._handlers.get(_ANY, ()))
+        self._table = {
+            event_type_: tuple(handlers) + self._fallback
+            for event_type_, handlers in self._handlers.items()
+            if event_type_ != _ANY
+        }
+
+    def resolve(self, event_type_: str) -> Tuple[_Registered, ...]:
+        return self._table.get(event_type_, self._fallback)
+
+    # ------------------------------------------------------------------ 실행
+
+    async def _run_one(self, registered: _Registered, workspace_id: str, item: Dict[str, Any]) -> bool:
+        started = time.perf_counter()
+        result = "ok"
+        span = start_span(f"handler:{registered.name}", root=False, type=event_type(item), page_id=page_key(item))
+        try:
+            with span:
+                await asyncio.wait_for(registered.func(workspace_id, item), registered.timeout)
+        except asyncio.TimeoutError:
+            result = "timeout"
+            logger.warning(
+                "핸들러 시간 초과 handler=%s ws=%s type=%s page=%s timeout=%ss",
+                registered.name, workspace_id, event_type(item), page_key(item), registered.timeout,
+            )
+        except Exception as e:
+            result = "error"
+            logger.exception(
+                "핸들러 오류 handler=%s ws=%s type=%s page=%s: %s",
+                registered.name, workspace_id, event_type(item), page_key(item), e,
+            )
+        finally:
+            registered.seconds.observe(time.perf_counter() - started)
+        span.set(result=result)
+        registered.handled[result].inc()
+        return result == "ok"
+
+    async def dispatch(self, workspace_id: str, items: List[Dict[str, Any]]) -> None:
+        """항목들을 순서대로 처리합니다. 실패한 핸들러가 있으면 끝난 뒤 HandlerFailed."""
+        failed: List[str] = []
+        for item in items:
+            if not isinstance(item, dict):
+                continue
+            for registered in self.resolve(event_type(item)):
+                if not await self._run_one(registered, workspace_id, item):
+                    failed.append(registered.name)
+        if failed:
+            raise HandlerFailed(f"handlers failed: {', '.join(sorted(set(failed)))}")
+
+
+registry = HandlerRegistry(timeout=_HANDLER_TIMEOUT)
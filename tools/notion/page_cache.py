@@ -0,0 +1,345 @@
+#####################################################
+#                                                   #
+#            Notion 페이지 내용 캐시 (웹훅 기반)            #
+#                                                   #
+#####################################################
+
+# 웹훅으로 페이지 변경을 알게 되면 페이지(속성 + 최상위 블록)를 다시 받아 로컬에 보관합니다.
+#   - 키: (workspace_id, page_id). 토큰은 저장소의 워크스페이스 access token 을 사용
+#   - 같은 페이지에 대한 이벤트가 debounce 창 안에 몰리면 갱신 한 번으로 합침
+#   - 갱신 시 페이지 객체만 먼저 받아 last_edited_time 이 그대로면 블록은 다시 받지 않음
+#   - 인코딩 크기 합이 한도를 넘으면 가장 오래 쓰지 않은 페이지부터 제거 (LRU)
+#
+# Notion 의 last_edited_time 은 분 단위로 잘리므로, 같은 값이라도 이전 수집이
+# 그 분이 끝나기 전에 이루어졌다면 그 뒤의 편집을 놓쳤을 수 있어 블록을 다시 받습니다.
+
+import asyncio
+import datetime
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from config.metrics import (
+    NOTION_PAGE_CACHE_BYTES,
+    NOTION_PAGE_CACHE_COALESCED,
+    NOTION_PAGE_CACHE_ENTRIES,
+    NOTION_PAGE_CACHE_LOOKUPS,
+    NOTION_PAGE_CACHE_REFRESHES,
+)
+from tools.notion.api_client import NotionApiClient
+from tools.notion.store import async_store
+from logs.logging_util import LoggerSingleton
+import logging
+
+
+logger = LoggerSingleton.get_logger(logger_name="notion_page_cache", level=logging.INFO)
+
+##### 설정 #####
+_NOTION_API_BASE = os.getenv("NOTION_API_BASE", "https://api.notion.com")
+_NOTION_VERSION = os.getenv("NOTION_VERSION", "2022-06-28")
+_MAX_BYTES = int(os.getenv("NOTION_PAGE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+_DEBOUNCE = float(os.getenv("NOTION_PAGE_CACHE_DEBOUNCE", "2"))
+# 1이면 캐시에 없던 페이지도 이벤트가 오면 미리 받아 둠 (모든 워크스페이스의 변경 페이지를 받게 되므로 기본은 꺼짐)
+# 임베딩(NOTION_EMBEDDINGS_ENABLED=1)을 켜면 이 값과 관계없이 켜짐 (subscribe(..., prefetch=True))
+_PREFETCH = os.getenv("NOTION_PAGE_CACHE_PREFETCH", "0") == "1"
+# 블록 목록은 100개씩 받으므로, 페이지당 최대 블록 수 = 이 값 x 100
+_MAX_BLOCK_PAGES = int(os.getenv("NOTION_PAGE_CACHE_MAX_BLOCK_PAGES", "10"))
+
+# last_edited_time 의 정밀도(초)
+_EDIT_TIME_GRANULARITY = 60.0
+
+PageKey = Tuple[str, str]
+
+
+def parse_time(value: Optional[str]) -> Optional[float]:
+    """Notion ISO 8601 시각을 epoch 초로 바꿉니다."""
+    if not value:
+        return None
+    try:
+        return datetime.datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return None
+
+
+class CachedPage:
+    __slots__ = ("workspace_id", "page_id", "page", "blocks", "last_edited", "fetched_at", "size", "blocks_size")
+
+    def __init__(
+        self,
+        workspace_id: str,
+        page_id: str,
+        page: Dict[str, Any],
+        blocks: List[Dict[str, Any]],
+        last_edited: Optional[float],
+        fetched_at: float,
+        page_size: int,
+        blocks_size: int,
+    ) -> None:
+        self.workspace_id = workspace_id
+        self.page_id = page_id
+        self.page = page
+        self.blocks = blocks
+        self.last_edited = last_edited
+        # 수집을 시작한 시각. 이보다 이른 이벤트는 이미 반영된 것으로 봄
+        self.fetched_at = fetched_at
+        # 응답 본문 길이 기준의 대략적인 크기
+        self.blocks_size = blocks_size
+        self.size = page_size + blocks_size
+
+
+class PageCache:
+    """워크스페이스별 Notion 페이지 캐시. 이벤트로 갱신하고, 읽을 때 없거나 낡았으면 바로 받습니다."""
+
+    def __init__(
+        self,
+        *,
+        max_bytes: int = 64 * 1024 * 1024,
+        debounce: float = 2.0,
+        prefetch: bool = True,
+        max_block_pages: int = 10,
+        api_base: str = "https://api.notion.com",
+        notion_version: str = "2022-06-28",
+        token_lookup: Optional[Callable[[str], Awaitable[Optional[str]]]] = None,
+    ) -> None:
+        self._max_bytes = max_bytes
+        self._debounce = debounce
+        self._prefetch = prefetch
+        self._max_block_pages = max(1, max_block_pages)
+        self._api_base = api_base.rstrip("/")
+        self._notion_version = notion_version
+        self._token_lookup = token_lookup or async_store.get_access_token_by_workspace
+        self._client_provider: Optional[Callable[[], NotionApiClient]] = None
+
+        self._entries: "OrderedDict[PageKey, CachedPage]" = OrderedDict()
+        self._bytes = 0
+        # 캐시 내용보다 새 변경이 알려진 페이지 -> 가장 최근 이벤트 시각
+        self._dirty: Dict[PageKey, float] = {}
+        # debounce 창을 기다리는 갱신
+        self._pending: Dict[PageKey, asyncio.Task] = {}
+        # 진행 중인 갱신 (같은 페이지 조회는 이 결과를 공유)
+        self._in_flight: Dict[PageKey, asyncio.Task] = {}
+        # 페이지 내용이 새로 확인되거나(entry) 사라질 때(None) 호출할 함수들
+        self._listeners: List[Callable[[str, str, Optional[CachedPage]], None]] = []
+
+    def subscribe(self, listener: Callable[[str, str, Optional[CachedPage]], None], *, prefetch: bool = False) -> None:
+        """갱신 결과를 받을 함수를 등록합니다. LRU 제거는 알리지 않습니다.
+
+        prefetch=True 면 캐시에 없던 페이지도 이벤트가 오면 받아 오도록 prefetch 를 켭니다
+        (캐시에 이미 있던 페이지만이 아니라 변경된 모든 페이지를 받아야 하는 구독자용).
+        """
+        self._listeners.append(listener)
+        if prefetch and not self._prefetch:
+            logger.info("페이지 캐시 prefetch 켜짐 (구독자 요청)")
+            self._prefetch = True
+
+    def _publish(self, key: PageKey, entry: Optional[CachedPage]) -> None:
+        for listener in self._listeners:
+            try:
+                listener(key[0], key[1], entry)
+            except Exception as e:
+                logger.exception("페이지 캐시 구독자 오류 ws=%s page=%s: %s", key[0], key[1], e)
+
+    def bind(self, client_provider: Callable[[], NotionApiClient]) -> None:
+        """Notion API 클라이언트를 얻는 함수를 연결합니다. 앱 lifespan 에서 호출."""
+        self._client_provider = client_provider
+
+    # ------------------------------------------------------------------ 조회
+
+    def peek(self, workspace_id: str, page_id: str) -> Optional[CachedPage]:
+        """네트워크 없이 캐시에 있는 내용만 반환합니다 (낡았을 수 있음)."""
+        return self._entries.get((workspace_id, page_id))
+
+    async def get_page(self, workspace_id: str, page_id: str) -> Optional[CachedPage]:
+        """최신 페이지를 반환합니다. 페이지가 없거나 접근할 수 없으면 None."""
+        key = (workspace_id, page_id)
+        entry = self._entries.get(key)
+        if entry is not None and key not in self._dirty:
+            self._entries.move_to_end(key)
+            NOTION_PAGE_CACHE_LOOKUPS.labels(result="hit").inc()
+            return entry
+        NOTION_PAGE_CACHE_LOOKUPS.labels(result="stale" if entry is not None else "miss").inc()
+        return await self._refresh_now(key)
+
+    # ------------------------------------------------------------------ 이벤트
+
+    def notify(self, workspace_id: str, page_id: str, event_time: Optional[float] = None) -> None:
+        """페이지 변경 이벤트를 알립니다. debounce 창이 지나면 한 번 갱신합니다."""
+        if self._client_provider is None:
+            return
+        key = (workspace_id, page_id)
+        entry = self._entries.get(key)
+        if entry is None and not self._prefetch and key not in self._in_flight:
+            return
+        if entry is not None and event_time is not None and event_time < entry.fetched_at:
+            # 마지막 수집 이후의 변경이 아님
+            NOTION_PAGE_CACHE_REFRESHES.labels(result="skipped").inc()
+            return
+        self._dirty[key] = max(self._dirty.get(key, 0.0), event_time or time.time())
+        if key in self._pending:
+            NOTION_PAGE_CACHE_COALESCED.inc()
+            return
+        self._pending[key] = asyncio.create_task(self._debounced(key))
+
+    def forget(self, workspace_id: str, page_id: str) -> None:
+        """삭제된 페이지 등을 캐시에서 뺍니다."""
+        key = (workspace_id, page_id)
+        pending = self._pending.pop(key, None)
+        if pending is not None:
+            pending.cancel()
+        self._dirty.pop(key, None)
+        self._drop(key)
+        self._publish(key, None)
+
+    async def _debounced(self, key: PageKey) -> None:
+        try:
+            await asyncio.sleep(self._debounce)
+        finally:
+            if self._pending.get(key) is asyncio.current_task():
+                del self._pending[key]
+        try:
+            await self._refresh_now(key)
+        except Exception as e:
+            logger.warning("페이지 갱신 실패 ws=%s page=%s: %r", key[0], key[1], e)
+
+    # ------------------------------------------------------------------ 갱신
+
+    async def _refresh_now(self, key: PageKey) -> Optional[CachedPage]:
+        # 기다리던 debounce 는 지금 갱신으로 대신함
+        pending = self._pending.pop(key, None)
+        if pending is not None and pending is not asyncio.current_task():
+            pending.cancel()
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._refresh(key))
+            self._in_flight[key] = task
+            task.add_done_callback(lambda t: self._forget_task(key, t))
+        return await asyncio.shield(task)
+
+    def _forget_task(self, key: PageKey, task: asyncio.Task) -> None:
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        if not task.cancelled():
+            task.exception()
+
+    async def _refresh(self, key: PageKey) -> Optional[CachedPage]:
+        if self._client_provider is None:
+            raise RuntimeError("PageCache is not bound to a Notion API client")
+        workspace_id, page_id = key
+        # 갱신 중에 들어온 이벤트는 다시 dirty 로 남도록 먼저 지움
+        dirty_since = self._dirty.pop(key, None)
+        started = time.time()
+        try:
+            token = await self._token_lookup(workspace_id)
+            if not token:
+                return self._gone(key)
+            client = self._client_provider()
+            headers = {"Authorization": f"Bearer {token}", "Notion-Version": self._notion_version}
+
+            resp = await client.get(f"{self._api_base}/v1/pages/{page_id}", headers=headers)
+            if resp.status_code in (403, 404):
+                return self._gone(key)
+            resp.raise_for_status()
+            page = resp.json()
+            if page.get("archived") or page.get("in_trash"):
+                return self._gone(key)
+
+            last_edited = parse_time(page.get("last_edited_time"))
+            entry = self._entries.get(key)
+            if (
+                entry is not None
+                and last_edited is not None
+                and entry.last_edited == last_edited
+                and entry.fetched_at - last_edited >= _EDIT_TIME_GRANULARITY
+            ):
+                # 블록은 그대로. 페이지 객체(속성)만 바꿔 둠
+                size = len(resp.content) + entry.blocks_size
+                self._bytes += size - entry.size
+                entry.size = size
+                entry.page = page
+                entry.fetched_at = started
+                self._entries.move_to_end(key)
+                NOTION_PAGE_CACHE_REFRESHES.labels(result="unchanged").inc()
+                # 속성(제목 등)은 바뀌었을 수 있으므로 알림
+                self._publish(key, entry)
+                return entry
+
+            blocks, blocks_size = await self._fetch_blocks(client, headers, page_id)
+        except Exception:
+            # 다음 조회나 이벤트에서 다시 시도
+            self._dirty[key] = max(self._dirty.get(key, 0.0), dirty_since or started)
+            NOTION_PAGE_CACHE_REFRESHES.labels(result="error").inc()
+            raise
+
+        entry = CachedPage(workspace_id, page_id, page, blocks, last_edited, started, len(resp.content), blocks_size)
+        self._store(key, entry)
+        NOTION_PAGE_CACHE_REFRESHES.labels(result="updated").inc()
+        self._publish(key, entry)
+        return entry
+
+    def _gone(self, key: PageKey) -> None:
+        self._drop(key)
+        NOTION_PAGE_CACHE_REFRESHES.labels(result="gone").inc()
+        self._publish(key, None)
+        return None
+
+    async def _fetch_blocks(
+        self, client: NotionApiClient, headers: Dict[str, str], page_id: str
+    ) -> Tuple[List[Dict[str, Any]], int]:
+        blocks: List[Dict[str, Any]] = []
+        size = 0
+        cursor: Optional[str] = None
+        for _ in range(self._max_block_pages):
+            params = {"page_size": 100}
+            if cursor:
+                params["start_cursor"] = cursor
+            resp = await client.get(f"{self._api_base}/v1/blocks/{page_id}/children", headers=headers, params=params)
+            resp.raise_for_status()
+            body = resp.json()
+            blocks.extend(body.get("results", []))
+            size += len(resp.content)
+            cursor = body.get("next_cursor")
+            if not body.get("has_more") or not cursor:
+                break
+        return blocks, size
+
+    # ------------------------------------------------------------------ 보관/제거
+
+    def _store(self, key: PageKey, entry: CachedPage) -> None:
+        self._drop(key)
+        if entry.size > self._max_bytes:
+            return
+        self._entries[key] = entry
+        self._bytes += entry.size
+        while self._bytes > self._max_bytes and self._entries:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= evicted.size
+        self._observe()
+
+    def _drop(self, key: PageKey) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry.size
+            self._observe()
+
+    def _observe(self) -> None:
+        NOTION_PAGE_CACHE_ENTRIES.set(len(self._entries))
+        NOTION_PAGE_CACHE_BYTES.set(self._bytes)
+
+    async def aclose(self) -> None:
+        """기다리던 갱신을 취소합니다."""
+        tasks = list(self._pending.values()) + list(self._in_flight.values())
+        self._pending.clear()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+page_cache = PageCache(
+    max_bytes=_MAX_BYTES,
+    debounce=_DEBOUNCE,
+    prefetch=_PREFETCH,
+    max_block_pages=_MAX_BLOCK_PAGES,
+    api_base=_NOTION_API_BASE,
+    notion_version=_NOTION_VERSION,
+)
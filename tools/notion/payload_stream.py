@@ -0,0 +1,200 @@
+#####################################################
+#                                                   #
+#          Notion 웹훅 본문 스트리밍 JSON 파서          #
+#                                                   #
+#####################################################
+
+# {"type": ..., "events": [{...}, {...}], ...} 형태의 본문을 조각 단위로 파싱합니다.
+#   - events 배열 외의 최상위 필드는 fields 에 모읍니다.
+#   - events 배열의 원소는 완성되는 즉시 원문 JSON 텍스트로 on_event 에 넘기고 버립니다.
+#     객체가 아닌 원소(문자열, 숫자 등)는 넘기지 않고 skipped_events 로만 셉니다.
+# 따라서 파서가 들고 있는 메모리는 "원소 하나 + 조각 하나" 크기로 유지됩니다.
+
+import codecs
+import json
+from typing import Any, Callable, Dict, List, Optional
+
+
+_WHITESPACE = " \t\r\n"
+
+# 값이 아직 다 도착하지 않음
+_NEED_MORE = object()
+
+
+class PayloadStreamParser:
+    """최상위 객체 본문을 조각 단위로 받아 events 원소를 하나씩 내보내는 파서."""
+
+    def __init__(self, on_event: Callable[[str], None], *, events_key: str = "events") -> None:
+        self.fields: Dict[str, Any] = {}
+        self.event_count = 0
+        self.skipped_events = 0
+        # 본문에 events 배열이 있었는지 (빈 배열 포함)
+        self.has_events = False
+        self.error: Optional[str] = None
+
+        self._on_event = on_event
+        self._events_key = events_key
+        self._decoder = json.JSONDecoder()
+        self._utf8 = codecs.getincrementaldecoder("utf-8")()
+        self._buf = ""
+        self._pos = 0
+        # 파싱을 다시 시도하기 전까지 받은 조각은 목록에만 모아 두고, 시도할 때 한 번에 이어 붙임
+        self._pending: List[str] = []
+        self._pending_len = 0
+        self._state = "start"
+        self._key: Optional[str] = None
+        self._value_start = 0
+        # 큰 값이 여러 조각에 걸칠 때 매 조각마다 처음부터 다시 파싱하지 않도록,
+        # 남은 버퍼가 이 길이 이상이 될 때까지 재시도를 미룸 (전체 비용 O(n) 유지)
+        self._retry_len = 0
+
+    @property
+    def done(self) -> bool:
+        return self._state == "done"
+
+    def feed(self, chunk: bytes) -> None:
+        if self.error is not None:
+            return
+        try:
+            text = self._utf8.decode(chunk)
+        except UnicodeDecodeError as e:
+            self.error = f"invalid utf-8: {e}"
+            return
+        if text:
+            self._pending.append(text)
+            self._pending_len += len(text)
+        if len(self._buf) - self._pos + self._pending_len >= self._retry_len:
+            self._join_pending()
+            self._run(final=False)
+
+    def close(self) -> None:
+        if self.error is not None:
+            return
+        try:
+            text = self._utf8.decode(b"", final=True)
+        except UnicodeDecodeError as e:
+            self.error = f"invalid utf-8: {e}"
+            return
+        self._pending.append(text)
+        self._join_pending()
+        self._run(final=True)
+        if self.error is None and self._state != "done":
+            self.error = "incomplete JSON body"
+
+    # ------------------------------------------------------------------ 내부
+
+    def _join_pending(self) -> None:
+        self._buf = "".join([self._buf[self._pos:], *self._pending])
+        self._pos = 0
+        self._pending.clear()
+        self._pending_len = 0
+
+    def _fail(self, message: str) -> None:
+        self.error = f"{message} at offset {self._pos}"
+        self._buf = ""
+        self._pos = 0
+        self._pending.clear()
+        self._pending_len = 0
+
+    def _skip_whitespace(self) -> None:
+        buf, pos = self._buf, self._pos
+        while pos < len(buf) and buf[pos] in _WHITESPACE:
+            pos += 1
+        self._pos = pos
+
+    def _decode(self, final: bool) -> Any:
+        """현재 위치의 JSON 값 하나를 읽습니다. 아직 덜 도착했으면 _NEED_MORE를 반환합니다."""
+        try:
+            value, end = self._decoder.raw_decode(self._buf, self._pos)
+        except json.JSONDecodeError as e:
+            if final:
+                self._fail(f"invalid JSON ({e.msg})")
+            else:
+                self._retry_len = (len(self._buf) - self._pos) * 2
+            return _NEED_MORE
+        # 숫자/리터럴은 뒤따르는 구분자를 봐야 끝났는지 알 수 있음
+        if end >= len(self._buf) and not final:
+            self._retry_len = (len(self._buf) - self._pos) * 2
+            return _NEED_MORE
+        self._retry_len = 0
+        self._value_start, self._pos = self._pos, end
+        return value
+
+    def _run(self, final: bool) -> None:
+        while self.error is None:
+            self._skip_whitespace()
+            if self._pos >= len(self._buf):
+                return
+            c = self._buf[self._pos]
+            state = self._state
+
+            if state == "done":
+                self._fail("unexpected data after JSON body")
+            elif state == "start":
+                if c != "{":
+                    self._fail("top-level value is not an object")
+                    return
+                self._pos += 1
+                self._state = "key_or_end"
+            elif state in ("key_or_end", "key"):
+                if c == "}" and state == "key_or_end":
+                    self._pos += 1
+                    self._state = "done"
+                    continue
+                if c != '"':
+                    self._fail("expected object key")
+                    return
+                key = self._decode(final)
+                if key is _NEED_MORE:
+                    return
+                self._key = key
+                self._state = "colon"
+            elif state == "colon":
+                if c != ":":
+                    self._fail("expected ':'")
+                    return
+                self._pos += 1
+                self._state = "value"
+            elif state == "value":
+                if self._key == self._events_key and c == "[":
+                    self._pos += 1
+                    self.has_events = True
+                    self._state = "event_or_end"
+                    continue
+                value = self._decode(final)
+                if value is _NEED_MORE:
+                    return
+                self.fields[self._key] = value
+                self._state = "comma_or_end"
+            elif state == "comma_or_end":
+                if c == ",":
+                    self._state = "key"
+                elif c == "}":
+                    self._state = "done"
+                else:
+                    self._fail("expected ',' or '}'")
+                    return
+                self._pos += 1
+            elif state in ("event_or_end", "event"):
+                if c == "]" and state == "event_or_end":
+                    self._pos += 1
+                    self._state = "comma_or_end"
+                    continue
+                value = self._decode(final)
+                if value is _NEED_MORE:
+                    return
+                if isinstance(value, dict):
+                    self.event_count += 1
+                    self._on_event(self._buf[self._value_start:self._pos])
+                else:
+                    self.skipped_events += 1
+                self._state = "event_comma_or_end"
+            elif state == "event_comma_or_end":
+                if c == ",":
+                    self._state = "event"
+                elif c == "]":
+                    self._state = "comma_or_end"
+                else:
+                    self._fail("expected ',' or ']'")
+                    return
+                self._pos += 1
@@ -4,38 +4,230 @@
 #                                                   #
 #####################################################
 
-import json
+# 백엔드 선택 (NOTION_STORE_BACKEND)
+#   - journal (기본): 메모리 상태 + 추가 전용 저널 + 스냅샷 압축 (tools/notion/store_journal.py)
+#   - sqlite: WAL 모드 SQLite 파일 (tools/notion/store_sqlite.py), 최초 실행 시 JSON 저장소를 옮겨옴
+# 비동기 핸들러는 async_store 를 사용합니다. 쓰기는 스레드에서 수행되고,
+# 짧은 창 안에 들어온 쓰기들은 하나의 fsync를 공유(group commit)한 뒤 완료됩니다.
+# 워크스페이스/웹훅 레코드 조회는 TTL + LRU 캐시를 거칩니다. 항목은 채울 때의 generation을 함께 기록하여
+# 어느 프로세스든 쓰기가 일어나면 무효가 되고, 이 프로세스의 쓰기는 해당 키를 즉시 지웁니다.
+# 워크스페이스 등급(tier)은 set_workspace_tier 로 저장하며, 웹훅 레코드에도 복사되어 메트릭 라벨로 쓰입니다.
+
+import asyncio
+import atexit
+import functools
+import hmac
 import os
 import threading
-from typing import Dict, Optional, Any, List, Tuple
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Any, List, Tuple
+
+from config.metrics import (
+    NO_TIER,
+    NOTION_STORE_CACHE_HIT_RATIO,
+    NOTION_STORE_CACHE_LOOKUPS,
+    NOTION_STORE_CACHE_SIZE,
+    NOTION_STORE_OP_BYTES,
+    NOTION_STORE_OP_SECONDS,
+    WORKSPACE_TIERS,
+    normalize_tier,
+)
+from config.tracing import start_span
+
+from tools.notion.store_backend import WORKSPACE as _WORKSPACE, WEBHOOK as _WEBHOOK, StoreBackend, secret_hash
 
 
 _STORE_DIR = os.path.join(os.getcwd(), "data")
 _STORE_FILE = os.path.join(_STORE_DIR, "notion_store.json")
+_JOURNAL_FILE = os.path.join(_STORE_DIR, "notion_store.journal")
+_SQLITE_FILE = os.path.join(_STORE_DIR, "notion_store.db")
 _LOCK = threading.Lock()
 
+_BACKEND = os.getenv("NOTION_STORE_BACKEND", "journal").lower()
 
-def _ensure_store_file() -> None:
-    if not os.path.isdir(_STORE_DIR):
-        os.makedirs(_STORE_DIR, exist_ok=True)
-    if not os.path.exists(_STORE_FILE):
-        with open(_STORE_FILE, "w", encoding="utf-8") as f:
-            json.dump({"workspaces": {}, "webhooks": {}}, f, ensure_ascii=False, indent=2)
+# journal: fsync 배치 주기(초)와 압축 임계 크기(바이트)
+_FSYNC_INTERVAL = float(os.getenv("NOTION_STORE_FSYNC_INTERVAL", "0.005"))
+_COMPACT_BYTES = int(os.getenv("NOTION_STORE_COMPACT_BYTES", str(4 * 1024 * 1024)))
 
+# sqlite: 커넥션 풀 크기와 synchronous 수준
+_SQLITE_POOL_SIZE = int(os.getenv("NOTION_STORE_SQLITE_POOL_SIZE", "4"))
+_SQLITE_SYNCHRONOUS = os.getenv("NOTION_STORE_SQLITE_SYNCHRONOUS", "NORMAL").upper()
 
-def _read_store() -> Dict[str, Any]:
-    _ensure_store_file()
-    with open(_STORE_FILE, "r", encoding="utf-8") as f:
-        return json.load(f)
+# 조회 캐시: 최대 항목 수(0이면 사용 안 함)와 TTL(초)
+_CACHE_CAPACITY = int(os.getenv("NOTION_STORE_CACHE_CAPACITY", "10000"))
+_CACHE_TTL = float(os.getenv("NOTION_STORE_CACHE_TTL", "300"))
 
 
-def _write_store(content: Dict[str, Any]) -> None:
-    _ensure_store_file()
-    with open(_STORE_FILE, "w", encoding="utf-8") as f:
-        json.dump(content, f, ensure_ascii=False, indent=2)
+_ENGINE: Optional[StoreBackend] = None
 
 
-def upsert_workspace(
+def _create_engine() -> StoreBackend:
+    if _BACKEND == "sqlite":
+        from tools.notion.store_sqlite import SQLiteStore
+
+        return SQLiteStore(
+            _SQLITE_FILE,
+            pool_size=_SQLITE_POOL_SIZE,
+            synchronous=_SQLITE_SYNCHRONOUS,
+            legacy_snapshot=_STORE_FILE,
+            legacy_journal=_JOURNAL_FILE,
+        )
+    if _BACKEND != "journal":
+        raise ValueError(f"지원하지 않는 NOTION_STORE_BACKEND: {_BACKEND}")
+
+    from tools.notion.store_journal import JournalStore
+
+    return JournalStore(
+        _STORE_DIR,
+        _STORE_FILE,
+        _JOURNAL_FILE,
+        fsync_interval=_FSYNC_INTERVAL,
+        compact_bytes=_COMPACT_BYTES,
+    )
+
+
+def _engine() -> StoreBackend:
+    global _ENGINE
+    if _ENGINE is None:
+        with _LOCK:
+            if _ENGINE is None:
+                _ENGINE = _create_engine()
+                atexit.register(_ENGINE.close)
+    return _ENGINE
+
+
+def flush() -> None:
+    """대기 중인 기록을 즉시 디스크에 반영합니다."""
+    _engine().sync()
+
+
+##### 조회 캐시 #####
+
+# 캐시에 없음 (None 결과도 캐시하므로 별도 표식 사용)
+_MISS = object()
+
+
+class _ReadCache:
+    """(테이블, 키) -> 레코드 TTL + LRU 캐시. 항목은 채울 때의 generation과 같을 때만 유효합니다."""
+
+    def __init__(self, capacity: int, ttl: float) -> None:
+        self._capacity = capacity
+        self._ttl = ttl
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[Any, float, Tuple[int, int]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def _count(self, hit: bool) -> None:
+        if hit:
+            self._hits += 1
+        else:
+            self._misses += 1
+        NOTION_STORE_CACHE_LOOKUPS.labels(result="hit" if hit else "miss").inc()
+        NOTION_STORE_CACHE_HIT_RATIO.set(self._hits / (self._hits + self._misses))
+
+    def get(self, table: str, key: str, generation: Tuple[int, int]) -> Any:
+        if self._capacity <= 0:
+            return _MISS
+        with self._lock:
+            entry = self._entries.get((table, key))
+            if entry is not None and entry[2] == generation and entry[1] > time.monotonic():
+                self._entries.move_to_end((table, key))
+                self._count(True)
+                return entry[0]
+            if entry is not None:
+                del self._entries[(table, key)]
+                NOTION_STORE_CACHE_SIZE.set(len(self._entries))
+            self._count(False)
+        return _MISS
+
+    def put(self, table: str, key: str, value: Any, generation: Tuple[int, int]) -> None:
+        if self._capacity <= 0:
+            return
+        with self._lock:
+            self._entries[(table, key)] = (value, time.monotonic() + self._ttl, generation)
+            self._entries.move_to_end((table, key))
+            while len(self._entries) > self._capacity:
+                self._entries.popitem(last=False)
+            NOTION_STORE_CACHE_SIZE.set(len(self._entries))
+
+    def invalidate(self, table: str, key: str) -> None:
+        with self._lock:
+            if self._entries.pop((table, key), None) is not None:
+                NOTION_STORE_CACHE_SIZE.set(len(self._entries))
+
+
+_CACHE = _ReadCache(_CACHE_CAPACITY, _CACHE_TTL)
+
+
+##### 계측 #####
+
+def workspace_tier(record: Optional[Dict[str, Any]]) -> str:
+    """워크스페이스/웹훅 레코드의 tier 값을 메트릭 라벨용 등급으로 바꿉니다."""
+    return normalize_tier(record.get("tier")) if record else NO_TIER
+
+
+@functools.lru_cache(maxsize=None)
+def _op_metrics(op: str, tier: str) -> Tuple[Any, Any]:
+    # labels() 조회는 잠금을 잡으므로 (연산, 등급)별 자식 메트릭을 재사용
+    return NOTION_STORE_OP_SECONDS.labels(op=op, tier=tier), NOTION_STORE_OP_BYTES.labels(op=op, tier=tier)
+
+
+def _observe(op: str, started: float, record: Optional[Dict[str, Any]], size: Optional[int]) -> None:
+    """백엔드 연산 시간과 크기를 기록합니다.
+
+    크기는 백엔드가 실제로 읽고 쓴 직렬화 바이트(저널 줄, SQLite data)이며, 메모리 조회처럼 없으면 생략합니다.
+    """
+    elapsed = time.perf_counter() - started
+    seconds, size_bytes = _op_metrics(op, workspace_tier(record))
+    seconds.observe(elapsed)
+    if size is not None:
+        size_bytes.observe(size)
+
+
+def _load(table: str, key: str) -> Optional[Dict[str, Any]]:
+    """캐시를 거쳐 레코드를 읽습니다. 반환값은 캐시와 공유되므로 수정하지 않습니다."""
+    engine = _engine()
+    # generation을 먼저 읽어야 조회 도중 쓰기가 끼어들어도 오래된 값이 유효하게 남지 않음
+    generation = engine.generation()
+    record = _CACHE.get(table, key, generation)
+    if record is _MISS:
+        # 캐시 적중은 저장소 캐시 메트릭으로 보고, 백엔드까지 간 조회만 계측
+        started = time.perf_counter()
+        record, size = engine.get_sized(table, key)
+        _observe("read", started, record, size)
+        _CACHE.put(table, key, record, generation)
+    return record
+
+
+def _update(table: str, key: str, mutate: Callable[[Optional[Dict[str, Any]]], List[Any]]) -> int:
+    """백엔드 update를 수행하고 변경된 키들을 캐시에서 바로 지웁니다."""
+    touched: List[Tuple[str, str]] = []
+    written: List[Any] = []
+
+    def tracked(existing: Optional[Dict[str, Any]]) -> List[Any]:
+        changes = mutate(existing)
+        touched[:] = [(t, k) for t, k, _ in changes]
+        written[:] = changes
+        return changes
+
+    started = time.perf_counter()
+    size: Optional[int] = None
+    try:
+        seq, size = _engine().update(table, key, tracked)
+        return seq
+    finally:
+        for t, k in touched:
+            _CACHE.invalidate(t, k)
+        if written:
+            _observe("write", started, written[0][2], size)
+
+
+##### 변경 연산 (기록 순번 반환) #####
+# 읽기-수정-쓰기는 백엔드의 update 안에서 원자적으로 수행됩니다.
+
+def _upsert_workspace(
     *,
     workspace_id: str,
     access_token: str,
@@ -44,12 +236,9 @@ def upsert_workspace(
     webhook_secret: Optional[str] = None,
     webhook_url: Optional[str] = None,
     incoming_secret: Optional[str] = None,
-) -> None:
-    """워크스페이스 매핑 정보를 병합 저장합니다."""
-    with _LOCK:
-        store = _read_store()
-        workspaces = store.setdefault("workspaces", {})
-        existing = workspaces.get(workspace_id, {})
+) -> int:
+    def mutate(existing: Optional[Dict[str, Any]]):
+        existing = existing or {}
         existing.update(
             {
                 "access_token": access_token,
@@ -60,98 +249,267 @@ def upsert_workspace(
                 "incoming_secret": incoming_secret or existing.get("incoming_secret"),
             }
         )
-        workspaces[workspace_id] = existing
+        changes = [(_WORKSPACE, workspace_id, existing)]
 
         # webhooks 역색인도 업데이트
         if webhook_id and (webhook_secret or existing.get("webhook_secret")):
-            webhooks = store.setdefault("webhooks", {})
-            webhooks[webhook_id] = {
-                "workspace_id": workspace_id,
-                "secret": webhook_secret or existing.get("webhook_secret"),
+            changes.append(
+                (
+                    _WEBHOOK,
+                    webhook_id,
+                    _webhook_record(workspace_id, webhook_secret or existing.get("webhook_secret"), existing),
+                )
+            )
+        return changes
+
+    return _update(_WORKSPACE, workspace_id, mutate)
+
+
+def _webhook_record(workspace_id: str, secret: Optional[str], workspace: Dict[str, Any]) -> Dict[str, Any]:
+    record = {"workspace_id": workspace_id, "secret": secret}
+    # 웹훅 경로의 메트릭이 워크스페이스 조회 없이 등급을 알 수 있도록 함께 저장
+    if workspace.get("tier"):
+        record["tier"] = workspace["tier"]
+    return record
+
+
+def _set_incoming_secret(*, workspace_id: str, secret: str) -> int:
+    def mutate(existing: Optional[Dict[str, Any]]):
+        existing = existing or {}
+        existing["incoming_secret"] = secret
+        return [(_WORKSPACE, workspace_id, existing)]
+
+    return _update(_WORKSPACE, workspace_id, mutate)
+
+
+def _set_webhook_info(
+    *, workspace_id: str, webhook_id: str, webhook_secret: str, webhook_url: Optional[str] = None
+) -> int:
+    def mutate(existing: Optional[Dict[str, Any]]):
+        existing = existing or {}
+        existing.update(
+            {
+                "webhook_id": webhook_id,
+                "webhook_secret": webhook_secret,
             }
+        )
+        if webhook_url:
+            existing["webhook_url"] = webhook_url
+
+        return [
+            (_WORKSPACE, workspace_id, existing),
+            (_WEBHOOK, webhook_id, _webhook_record(workspace_id, webhook_secret, existing)),
+        ]
+
+    return _update(_WORKSPACE, workspace_id, mutate)
+
 
-        _write_store(store)
+def _set_workspace_tier(*, workspace_id: str, tier: str) -> int:
+    if tier not in WORKSPACE_TIERS:
+        raise ValueError(f"unknown tier: {tier}")
+
+    def mutate(existing: Optional[Dict[str, Any]]):
+        if existing is None:
+            raise KeyError(workspace_id)
+        existing["tier"] = tier
+        changes = [(_WORKSPACE, workspace_id, existing)]
+        # 웹훅 역색인에도 복사해 웹훅 경로가 워크스페이스 조회 없이 등급을 알 수 있게 함
+        if existing.get("webhook_id") and existing.get("webhook_secret"):
+            changes.append(
+                (
+                    _WEBHOOK,
+                    existing["webhook_id"],
+                    _webhook_record(workspace_id, existing["webhook_secret"], existing),
+                )
+            )
+        return changes
+
+    return _update(_WORKSPACE, workspace_id, mutate)
+
+
+##### 동기 API (호환용 래퍼) #####
+
+def upsert_workspace(
+    *,
+    workspace_id: str,
+    access_token: str,
+    bot_id: Optional[str] = None,
+    webhook_id: Optional[str] = None,
+    webhook_secret: Optional[str] = None,
+    webhook_url: Optional[str] = None,
+    incoming_secret: Optional[str] = None,
+) -> None:
+    """워크스페이스 매핑 정보를 병합 저장합니다."""
+    _upsert_workspace(
+        workspace_id=workspace_id,
+        access_token=access_token,
+        bot_id=bot_id,
+        webhook_id=webhook_id,
+        webhook_secret=webhook_secret,
+        webhook_url=webhook_url,
+        incoming_secret=incoming_secret,
+    )
 
 
 def get_workspace(workspace_id: str) -> Optional[Dict[str, Any]]:
-    with _LOCK:
-        store = _read_store()
-        return store.get("workspaces", {}).get(workspace_id)
+    ws = _load(_WORKSPACE, workspace_id)
+    return dict(ws) if ws is not None else None
 
 
-def list_webhook_secrets() -> List[Tuple[str, str]]:
-    """(webhook_id, secret) 목록을 반환합니다."""
-    with _LOCK:
-        store = _read_store()
-        webhooks = store.get("webhooks", {})
-        return [(wid, info.get("secret", "")) for wid, info in webhooks.items() if info.get("secret")]
+def list_webhook_secrets(limit: Optional[int] = None) -> List[Tuple[str, str]]:
+    """(webhook_id, secret) 목록을 반환합니다. limit이 주어지면 앞에서부터 최대 limit개의 웹훅만 봅니다."""
+    started = time.perf_counter()
+    webhooks = _engine().items(_WEBHOOK, limit)
+    _op_metrics("scan", NO_TIER)[0].observe(time.perf_counter() - started)
+    return [(wid, info.get("secret", "")) for wid, info in webhooks if info.get("secret")]
 
 
 def get_secret_by_webhook_id(webhook_id: str) -> Optional[str]:
-    with _LOCK:
-        store = _read_store()
-        info = store.get("webhooks", {}).get(webhook_id)
-        if info:
-            return info.get("secret")
-        return None
+    info = _load(_WEBHOOK, webhook_id)
+    if info:
+        return info.get("secret")
+    return None
 
 
 def get_access_token_by_workspace(workspace_id: str) -> Optional[str]:
-    ws = get_workspace(workspace_id)
+    ws = _load(_WORKSPACE, workspace_id)
     return ws.get("access_token") if ws else None
 
 
 def get_workspace_id_by_webhook_id(webhook_id: str) -> Optional[str]:
-    with _LOCK:
-        store = _read_store()
-        info = store.get("webhooks", {}).get(webhook_id)
-        if info:
-            return info.get("workspace_id")
-        return None
+    info = _load(_WEBHOOK, webhook_id)
+    if info:
+        return info.get("workspace_id")
+    return None
 
 
 def set_incoming_secret(*, workspace_id: str, secret: str) -> None:
-    with _LOCK:
-        store = _read_store()
-        workspaces = store.setdefault("workspaces", {})
-        existing = workspaces.get(workspace_id, {})
-        existing["incoming_secret"] = secret
-        workspaces[workspace_id] = existing
-        _write_store(store)
+    _set_incoming_secret(workspace_id=workspace_id, secret=secret)
 
 
 def get_workspace_id_by_incoming_secret(secret: str) -> Optional[str]:
-    with _LOCK:
-        store = _read_store()
-        for ws_id, info in store.get("workspaces", {}).items():
-            if info.get("incoming_secret") == secret:
-                return ws_id
+    """시크릿 해시 역색인으로 조회한 뒤 원본 시크릿을 상수 시간 비교합니다."""
+    if not secret:
         return None
+    started = time.perf_counter()
+    found = _engine().find_by_secret_hash(secret_hash(secret))
+    _op_metrics("secret_lookup", NO_TIER)[0].observe(time.perf_counter() - started)
+    if found is None:
+        return None
+    ws_id, stored = found
+    if hmac.compare_digest(stored.encode("utf-8"), secret.encode("utf-8")):
+        return ws_id
+    return None
 
 
 def set_webhook_info(
     *, workspace_id: str, webhook_id: str, webhook_secret: str, webhook_url: Optional[str] = None
 ) -> None:
-    with _LOCK:
-        store = _read_store()
-        workspaces = store.setdefault("workspaces", {})
-        existing = workspaces.get(workspace_id, {})
-        existing.update(
-            {
-                "webhook_id": webhook_id,
-                "webhook_secret": webhook_secret,
-            }
-        )
-        if webhook_url:
-            existing["webhook_url"] = webhook_url
-        workspaces[workspace_id] = existing
+    _set_webhook_info(
+        workspace_id=workspace_id,
+        webhook_id=webhook_id,
+        webhook_secret=webhook_secret,
+        webhook_url=webhook_url,
+    )
+
+
+def set_workspace_tier(*, workspace_id: str, tier: str) -> None:
+    """워크스페이스 등급을 저장합니다. 등록된 등급이 아니면 ValueError, 워크스페이스가 없으면 KeyError."""
+    _set_workspace_tier(workspace_id=workspace_id, tier=tier)
+
+
+##### 비동기 API #####
+
+class AsyncStore:
+    """이벤트 루프를 막지 않는 저장소 인터페이스.
+
+    메모리 백엔드의 조회는 바로 반환하고, 디스크를 읽는 백엔드의 조회와 모든 쓰기는 스레드에서 수행합니다.
+    쓰기는 해당 기록이 영속화될 때까지 기다리며, 같은 창에 들어온 쓰기들은 fsync 한 번을 공유합니다.
+    """
+
+    async def _ready(self) -> StoreBackend:
+        if _ENGINE is None:
+            # 최초 로드(스냅샷/저널 재생, DB 오픈)는 디스크 I/O이므로 스레드에서 수행
+            return await asyncio.to_thread(_engine)
+        return _ENGINE
+
+    async def _read(self, fn: Callable[..., Any], *args: Any) -> Any:
+        # 조회 캐시 적중은 여기까지 오지 않으므로 백엔드까지 간 조회만 스팬으로 남음
+        with start_span("store.read", run_type="tool", root=False, op=fn.__name__):
+            engine = await self._ready()
+            if engine.blocking_reads:
+                return await asyncio.to_thread(fn, *args)
+            return fn(*args)
+
+    async def _load(self, table: str, key: str) -> Optional[Dict[str, Any]]:
+        # 캐시 적중은 스레드를 거치지 않고 바로 반환
+        engine = await self._ready()
+        generation = engine.generation()
+        record = _CACHE.get(table, key, generation)
+        if record is _MISS:
+            started = time.perf_counter()
+            record, size = await self._read(engine.get_sized, table, key)
+            _observe("read", started, record, size)
+            _CACHE.put(table, key, record, generation)
+        return record
+
+    async def _commit(self, fn: Callable[..., int], **kwargs: Any) -> None:
+        with start_span("store.write", run_type="tool", root=False, op=fn.__name__.lstrip("_")):
+            engine = await self._ready()
+            started = time.perf_counter()
+            seq = await asyncio.to_thread(fn, **kwargs)
+
+            loop = asyncio.get_running_loop()
+            durable = loop.create_future()
+
+            def _resolve() -> None:
+                if not durable.done():
+                    durable.set_result(None)
+
+            engine.on_durable(seq, lambda: loop.call_soon_threadsafe(_resolve))
+            await durable
+        # 스레드 전환과 group commit fsync 대기까지 포함한 쓰기 완료 시간
+        _op_metrics("durable_write", NO_TIER)[0].observe(time.perf_counter() - started)
+
+    async def upsert_workspace(self, **kwargs: Any) -> None:
+        await self._commit(_upsert_workspace, **kwargs)
+
+    async def set_incoming_secret(self, *, workspace_id: str, secret: str) -> None:
+        await self._commit(_set_incoming_secret, workspace_id=workspace_id, secret=secret)
+
+    async def set_webhook_info(self, **kwargs: Any) -> None:
+        await self._commit(_set_webhook_info, **kwargs)
+
+    async def set_workspace_tier(self, *, workspace_id: str, tier: str) -> None:
+        await self._commit(_set_workspace_tier, workspace_id=workspace_id, tier=tier)
+
+    async def get_workspace(self, workspace_id: str) -> Optional[Dict[str, Any]]:
+        ws = await self._load(_WORKSPACE, workspace_id)
+        return dict(ws) if ws is not None else None
+
+    async def list_webhook_secrets(self, limit: Optional[int] = None) -> List[Tuple[str, str]]:
+        return await self._read(list_webhook_secrets, limit)
+
+    async def get_secret_by_webhook_id(self, webhook_id: str) -> Optional[str]:
+        info = await self._load(_WEBHOOK, webhook_id)
+        return info.get("secret") if info else None
+
+    async def get_access_token_by_workspace(self, workspace_id: str) -> Optional[str]:
+        ws = await self._load(_WORKSPACE, workspace_id)
+        return ws.get("access_token") if ws else None
+
+    async def get_workspace_id_by_webhook_id(self, webhook_id: str) -> Optional[str]:
+        info = await self._load(_WEBHOOK, webhook_id)
+        return info.get("workspace_id") if info else None
+
+    async def get_workspace_tier(self, workspace_id: str) -> str:
+        return workspace_tier(await self._load(_WORKSPACE, workspace_id))
 
-        webhooks = store.setdefault("webhooks", {})
-        webhooks[webhook_id] = {
-            "workspace_id": workspace_id,
-            "secret": webhook_secret,
-        }
+    async def get_webhook_tier(self, webhook_id: str) -> str:
+        return workspace_tier(await self._load(_WEBHOOK, webhook_id))
 
-        _write_store(store)
+    async def get_workspace_id_by_incoming_secret(self, secret: str) -> Optional[str]:
+        return await self._read(get_workspace_id_by_incoming_secret, secret)
 
 
+async_store = AsyncStore()
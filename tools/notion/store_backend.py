@@ -0,0 +1,157 @@
+#####################################################
+#                                                   #
+#          Notion 저장소 백엔드 공통 인터페이스          #
+#                                                   #
+#####################################################
+
+import hashlib
+import mmap
+import os
+import struct
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows 등: 프로세스 간 잠금 없이 동작
+    fcntl = None
+
+
+# 테이블 종류
+WORKSPACE = "ws"
+WEBHOOK = "wh"
+
+# (table, key, record) - record가 None이면 삭제
+Change = Tuple[str, str, Optional[Dict[str, Any]]]
+
+
+def secret_hash(secret: str) -> str:
+    return hashlib.sha256(secret.encode("utf-8")).hexdigest()
+
+
+def fsync_dir(path: str) -> None:
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+class FileLock:
+    """flock 기반 프로세스 간 잠금.
+
+    flock은 열린 파일 단위로 걸리므로 같은 프로세스의 스레드끼리는 별도의 스레드 락으로
+    먼저 직렬화한 뒤 사용해야 합니다.
+    """
+
+    def __init__(self, path: str) -> None:
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+
+    @contextmanager
+    def _locked(self, operation: int) -> Iterator[None]:
+        if fcntl is None:
+            yield
+            return
+        fcntl.flock(self._fd, operation)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def exclusive(self):
+        return self._locked(fcntl.LOCK_EX if fcntl else 0)
+
+    def shared(self):
+        return self._locked(fcntl.LOCK_SH if fcntl else 0)
+
+    def close(self) -> None:
+        try:
+            os.close(self._fd)
+        except OSError:
+            pass
+
+
+class SharedGeneration:
+    """여러 프로세스가 mmap으로 공유하는 (generation, epoch) 헤더.
+
+    generation은 쓰기마다, epoch는 저장 파일 구성이 바뀔 때(저널 회전 등) 증가합니다.
+    읽기는 잠금 없이 메모리만 보므로 변경 여부 확인 비용이 매우 작습니다.
+    증가(bump)는 FileLock.exclusive() 안에서 호출해야 합니다.
+    """
+
+    _HEADER = struct.Struct("<QQ")
+
+    def __init__(self, path: str) -> None:
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if os.fstat(fd).st_size < self._HEADER.size:
+                os.ftruncate(fd, self._HEADER.size)
+            self._mmap = mmap.mmap(fd, self._HEADER.size)
+        finally:
+            os.close(fd)
+
+    def read(self) -> Tuple[int, int]:
+        return self._HEADER.unpack_from(self._mmap, 0)
+
+    def bump(self, *, epoch: bool = False) -> Tuple[int, int]:
+        generation, current_epoch = self.read()
+        value = (generation + 1, current_epoch + 1 if epoch else current_epoch)
+        self._HEADER.pack_into(self._mmap, 0, *value)
+        return value
+
+    def close(self) -> None:
+        try:
+            self._mmap.close()
+        except (BufferError, ValueError):
+            pass
+
+
+class StoreBackend(ABC):
+    """워크스페이스/웹훅 레코드를 보관하는 저장소 백엔드."""
+
+    # 조회가 디스크 I/O를 수반하는지 여부 (비동기 API가 스레드로 넘길지 판단)
+    blocking_reads = False
+
+    @abstractmethod
+    def generation(self) -> Tuple[int, int]:
+        """모든 프로세스의 쓰기를 반영하는 (generation, epoch) 값을 반환합니다."""
+
+    @abstractmethod
+    def get(self, table: str, key: str) -> Optional[Dict[str, Any]]:
+        """레코드 사본을 반환합니다."""
+
+    def get_sized(self, table: str, key: str) -> Tuple[Optional[Dict[str, Any]], Optional[int]]:
+        """(레코드 사본, 읽은 직렬화 바이트 수)를 반환합니다. 직렬화된 형태를 읽지 않는 백엔드는 크기가 None."""
+        return self.get(table, key), None
+
+    @abstractmethod
+    def items(self, table: str, limit: Optional[int] = None) -> List[Tuple[str, Dict[str, Any]]]:
+        """(key, record) 목록을 최대 limit개 반환합니다."""
+
+    @abstractmethod
+    def find_by_secret_hash(self, secret_hash: str) -> Optional[Tuple[str, str]]:
+        """incoming_secret 해시로 (workspace_id, 저장된 시크릿)을 찾습니다."""
+
+    @abstractmethod
+    def update(
+        self, table: str, key: str, mutate: Callable[[Optional[Dict[str, Any]]], List[Change]]
+    ) -> Tuple[int, int]:
+        """기존 레코드를 mutate에 넘겨 얻은 변경들을 원자적으로 반영하고 (기록 순번, 기록한 바이트 수)를 반환합니다."""
+
+    @abstractmethod
+    def on_durable(self, seq: int, callback: Callable[[], None]) -> None:
+        """seq 까지의 기록이 영속화되면 callback을 호출합니다."""
+
+    @abstractmethod
+    def sync(self) -> None:
+        """대기 중인 기록을 즉시 영속화합니다."""
+
+    @abstractmethod
+    def close(self) -> None:
+        """리소스를 정리합니다."""
@@ -0,0 +1,403 @@
+#####################################################
+#                                                   #
+#          Notion 저장소 - 저널 + 스냅샷 백엔드          #
+#                                                   #
+#####################################################
+
+# 저장 구조
+#   - 상태는 메모리에 보관하고, 모든 변경은 추가 전용 저널(notion_store.journal)에 한 줄씩 기록합니다.
+#   - 저널 fsync는 백그라운드 스레드가 짧은 주기로 묶어서 수행합니다(group commit).
+#   - 저널이 일정 크기를 넘으면 백그라운드에서 스냅샷(notion_store.json)으로 압축합니다.
+#   - 저널 레코드는 "최종 레코드 전체"를 담으므로 재생(replay)은 멱등입니다.
+#
+# 다중 프로세스(uvicorn --workers N)
+#   - 쓰기와 저널 회전은 notion_store.lock 에 대한 flock(LOCK_EX) 안에서 수행합니다.
+#   - notion_store.gen 을 mmap으로 공유하여 쓰기마다 generation, 저널 회전마다 epoch를 올립니다.
+#   - 각 프로세스는 조회 시 헤더만 비교하고, 다른 프로세스가 실제로 기록했을 때만
+#     저널에서 새로 추가된 줄(또는 회전된 경우 전체)을 다시 읽습니다.
+
+import itertools
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from tools.notion.store_backend import (
+    WORKSPACE,
+    WEBHOOK,
+    Change,
+    FileLock,
+    SharedGeneration,
+    StoreBackend,
+    fsync_dir,
+    secret_hash,
+)
+from logs.logging_util import LoggerSingleton
+import logging
+
+
+logger = LoggerSingleton.get_logger(logger_name="notion_store", level=logging.INFO)
+
+
+def _read_records(path: str, start: int = 0) -> Iterator[Tuple[str, str, Optional[Dict[str, Any]], int]]:
+    """저널을 start 위치부터 읽어 (table, key, value, 다음 위치)를 내보냅니다. 손상된 줄에서 멈춥니다."""
+    valid = start
+    with open(path, "rb") as f:
+        f.seek(start)
+        for line in f:
+            if not line.endswith(b"\n"):
+                return
+            try:
+                record = json.loads(line)
+                table, key, value = record["t"], record["k"], record["v"]
+            except (ValueError, KeyError, TypeError):
+                return
+            if table not in (WORKSPACE, WEBHOOK):
+                return
+            valid += len(line)
+            yield table, key, value, valid
+
+
+def load_journal_state(snapshot_file: str, journal_file: str) -> Dict[str, Dict[str, Dict[str, Any]]]:
+    """스냅샷과 저널을 읽기 전용으로 재생한 최종 상태({table: {key: record}})를 반환합니다.
+
+    JournalStore 와 달리 잠금/세대 파일을 만들지 않고, 손상된 마지막 줄도 잘라내지 않습니다(마이그레이션용).
+    """
+    tables: Dict[str, Dict[str, Dict[str, Any]]] = {WORKSPACE: {}, WEBHOOK: {}}
+    if os.path.exists(snapshot_file):
+        with open(snapshot_file, "r", encoding="utf-8") as f:
+            snapshot = json.load(f)
+        tables[WORKSPACE].update(snapshot.get("workspaces", {}))
+        tables[WEBHOOK].update(snapshot.get("webhooks", {}))
+
+    for path in (journal_file + ".1", journal_file):
+        if not os.path.exists(path):
+            continue
+        for table, key, value, _ in _read_records(path):
+            if value is None:
+                tables[table].pop(key, None)
+            else:
+                tables[table][key] = value
+    return tables
+
+
+class JournalStore(StoreBackend):
+    """메모리 상태 + 추가 전용 저널 + 백그라운드 스냅샷 압축 저장 엔진."""
+
+    def __init__(
+        self,
+        store_dir: str,
+        snapshot_file: str,
+        journal_file: str,
+        *,
+        fsync_interval: float = 0.005,
+        compact_bytes: int = 4 * 1024 * 1024,
+    ) -> None:
+        self._store_dir = store_dir
+        self._fsync_interval = fsync_interval
+        self._compact_bytes = compact_bytes
+        self._snapshot_file = snapshot_file
+        self._journal_file = journal_file
+        self._rotated_file = journal_file + ".1"
+
+        # 레코드는 변경 시 새 dict로 교체(copy-on-write)하므로 스냅샷은 얕은 복사로 충분합니다.
+        self._tables: Dict[str, Dict[str, Dict[str, Any]]] = {WORKSPACE: {}, WEBHOOK: {}}
+        # sha256(incoming_secret) -> workspace_id 역색인
+        self._secret_index: Dict[str, str] = {}
+
+        # 잠금 순서: _fsync_lock -> _lock -> _flock
+        self._lock = threading.Lock()
+        self._fsync_lock = threading.Lock()
+        self._dirty = threading.Event()
+        self._journal = None
+        self._journal_offset = 0
+        self._compacting = False
+        self._closed = False
+
+        # 기록 순번과 fsync 완료 순번, fsync 완료를 기다리는 콜백들
+        self._seq = 0
+        self._synced_seq = 0
+        self._waiters: List[Tuple[int, Callable[[], None]]] = []
+
+        os.makedirs(self._store_dir, exist_ok=True)
+        base = os.path.splitext(self._journal_file)[0]
+        self._flock = FileLock(base + ".lock")
+        self._header = SharedGeneration(base + ".gen")
+        # 이 프로세스가 마지막으로 반영한 (generation, epoch)
+        self._seen = (0, 0)
+
+        with self._lock, self._flock.exclusive():
+            self._reload_locked(truncate=True)
+        if self._journal_offset >= self._compact_bytes:
+            self._start_compaction()
+
+        self._flusher = threading.Thread(target=self._flush_loop, name="notion-store-fsync", daemon=True)
+        self._flusher.start()
+
+    # ------------------------------------------------------------------ 로드
+
+    def _reload_locked(self, *, truncate: bool = False) -> None:
+        """스냅샷과 저널 전체를 다시 읽습니다. _lock 과 _flock 을 잡은 상태에서 호출합니다."""
+        self._seen = self._header.read()
+        self._tables = {WORKSPACE: {}, WEBHOOK: {}}
+        self._secret_index = {}
+
+        if os.path.exists(self._snapshot_file):
+            with open(self._snapshot_file, "r", encoding="utf-8") as f:
+                snapshot = json.load(f)
+            self._tables[WORKSPACE] = dict(snapshot.get("workspaces", {}))
+            self._tables[WEBHOOK] = dict(snapshot.get("webhooks", {}))
+            for ws_id, info in self._tables[WORKSPACE].items():
+                if info.get("incoming_secret"):
+                    self._secret_index[secret_hash(info["incoming_secret"])] = ws_id
+
+        # 압축 도중 종료되었다면 회전된 저널이 남아 있을 수 있음 (재생은 멱등)
+        if os.path.exists(self._rotated_file):
+            self._replay(self._rotated_file)
+        self._journal_offset = (
+            self._replay(self._journal_file, truncate=truncate) if os.path.exists(self._journal_file) else 0
+        )
+
+        # 다른 프로세스가 저널을 회전했다면 기존 핸들은 회전된 파일을 가리키므로 다시 엶
+        # (기존 핸들에 기록된 내용은 회전 전에 fsync되었으므로 다음 sync에서 완료 처리됨)
+        if self._journal is not None:
+            self._journal.close()
+            self._dirty.set()
+        self._journal = open(self._journal_file, "a", encoding="utf-8")
+
+    def _refresh_locked(self) -> None:
+        """다른 프로세스의 기록을 반영합니다. _lock 과 _flock 을 잡은 상태에서 호출합니다."""
+        current = self._header.read()
+        if current == self._seen:
+            return
+        if current[1] != self._seen[1]:
+            self._reload_locked()
+            return
+        self._seen = current
+        self._journal_offset = self._replay(self._journal_file, start=self._journal_offset)
+
+    def _ensure_fresh_locked(self) -> None:
+        """_lock 만 잡은 상태에서 호출하며, 변경이 있을 때만 공유 잠금을 잡고 다시 읽습니다."""
+        if self._header.read() != self._seen:
+            with self._flock.shared():
+                self._refresh_locked()
+
+    def _replay(self, path: str, *, start: int = 0, truncate: bool = False) -> int:
+        """저널을 start 위치부터 재생하고 마지막 정상 레코드 다음 위치를 반환합니다."""
+        valid = start
+        for table, key, value, valid in _read_records(path, start):
+            self._apply(table, key, value)
+        torn = os.path.getsize(path) != valid
+
+        if torn and truncate:
+            # 기록 도중 종료된 마지막 줄을 잘라내어 이후 추가 기록이 오염되지 않도록 함
+            logger.warning("저널 손상 구간 제거 path=%s offset=%s", path, valid)
+            with open(path, "r+b") as f:
+                f.truncate(valid)
+        return valid
+
+    def _apply(self, table: str, key: str, value: Optional[Dict[str, Any]]) -> None:
+        if table == WORKSPACE:
+            self._reindex_secret(key, self._tables[table].get(key), value)
+        if value is None:
+            self._tables[table].pop(key, None)
+        else:
+            self._tables[table][key] = value
+
+    def _reindex_secret(
+        self, workspace_id: str, old: Optional[Dict[str, Any]], new: Optional[Dict[str, Any]]
+    ) -> None:
+        old_secret = (old or {}).get("incoming_secret")
+        new_secret = (new or {}).get("incoming_secret")
+        if old_secret == new_secret:
+            return
+        if old_secret:
+            old_hash = secret_hash(old_secret)
+            if self._secret_index.get(old_hash) == workspace_id:
+                del self._secret_index[old_hash]
+        if new_secret:
+            self._secret_index[secret_hash(new_secret)] = workspace_id
+
+    # ------------------------------------------------------------------ 조회
+
+    def generation(self) -> Tuple[int, int]:
+        return self._header.read()
+
+    def get(self, table: str, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            self._ensure_fresh_locked()
+            record = self._tables[table].get(key)
+        return dict(record) if record is not None else None
+
+    def items(self, table: str, limit: Optional[int] = None) -> List[Tuple[str, Dict[str, Any]]]:
+        with self._lock:
+            self._ensure_fresh_locked()
+            return list(itertools.islice(self._tables[table].items(), limit))
+
+    def find_by_secret_hash(self, secret_hash: str) -> Optional[Tuple[str, str]]:
+        """시크릿 해시로 (workspace_id, 저장된 시크릿)을 찾습니다."""
+        with self._lock:
+            self._ensure_fresh_locked()
+            ws_id = self._secret_index.get(secret_hash)
+            if ws_id is None:
+                return None
+            return ws_id, self._tables[WORKSPACE][ws_id].get("incoming_secret") or ""
+
+    # ------------------------------------------------------------------ 변경
+
+    def update(
+        self, table: str, key: str, mutate: Callable[[Optional[Dict[str, Any]]], List[Change]]
+    ) -> Tuple[int, int]:
+        with self._lock, self._flock.exclusive():
+            self._refresh_locked()
+            existing = self._tables[table].get(key)
+            changes = mutate(dict(existing) if existing is not None else None)
+            offset = self._journal_offset
+            seq, compact = self._append_locked(changes)
+            written = self._journal_offset - offset
+        self._dirty.set()
+        if compact:
+            self._start_compaction()
+        return seq, written
+
+    def _append_locked(self, changes: List[Change]) -> Tuple[int, bool]:
+        """변경들을 메모리에 반영하고 저널에 추가합니다. _lock 과 _flock(배타)을 잡은 상태에서 호출합니다."""
+        lines = "".join(
+            json.dumps({"t": t, "k": k, "v": v}, ensure_ascii=False, separators=(",", ":")) + "\n"
+            for t, k, v in changes
+        )
+        for t, k, v in changes:
+            self._apply(t, k, v)
+        self._journal.write(lines)
+        # 프로세스 종료에는 flush로 충분하며, 전원 손실 대비 fsync는 배치 스레드가 담당
+        self._journal.flush()
+        self._journal_offset += len(lines.encode("utf-8"))
+        self._seen = self._header.bump()
+        self._seq += 1
+        compact = self._journal_offset >= self._compact_bytes and not self._compacting
+        return self._seq, compact
+
+    def on_durable(self, seq: int, callback: Callable[[], None]) -> None:
+        """seq 까지의 기록이 fsync되면 callback을 (fsync 스레드에서) 호출합니다."""
+        with self._lock:
+            if seq > self._synced_seq:
+                self._waiters.append((seq, callback))
+                callback = None
+        if callback is not None:
+            callback()
+        else:
+            self._dirty.set()
+
+    def _mark_synced(self, seq: int) -> None:
+        with self._lock:
+            self._synced_seq = max(self._synced_seq, seq)
+            ready = [cb for s, cb in self._waiters if s <= self._synced_seq]
+            self._waiters = [(s, cb) for s, cb in self._waiters if s > self._synced_seq]
+        for callback in ready:
+            try:
+                callback()
+            except Exception as e:
+                logger.warning("fsync 완료 콜백 오류: %s", e)
+
+    # ------------------------------------------------------------------ fsync
+
+    def _flush_loop(self) -> None:
+        while not self._closed:
+            self._dirty.wait()
+            # 짧은 창 동안 들어온 쓰기를 한 번의 fsync로 묶음
+            time.sleep(self._fsync_interval)
+            self._dirty.clear()
+            self.sync()
+
+    def sync(self) -> None:
+        with self._fsync_lock:
+            with self._lock:
+                journal = self._journal
+                # update는 락 안에서 flush까지 마치므로 이 순번까지는 OS 버퍼에 있음
+                target = self._seq
+            if journal is None or journal.closed:
+                return
+            try:
+                journal.flush()
+                os.fsync(journal.fileno())
+            except (OSError, ValueError) as e:
+                logger.warning("저널 fsync 실패: %s", e)
+                return
+        self._mark_synced(target)
+
+    # ------------------------------------------------------------------ 압축
+
+    def _start_compaction(self) -> None:
+        with self._lock:
+            if self._compacting or self._closed:
+                return
+            self._compacting = True
+        threading.Thread(target=self._compact, name="notion-store-compact", daemon=True).start()
+
+    def _compact(self) -> None:
+        try:
+            with self._fsync_lock, self._lock, self._flock.exclusive():
+                self._refresh_locked()
+                # 이전 압축(또는 다른 프로세스의 압축)이 진행 중이면 회전하지 않고 스냅샷만 갱신
+                rotate = not os.path.exists(self._rotated_file)
+                synced = self._seq
+                if rotate:
+                    self._journal.flush()
+                    os.fsync(self._journal.fileno())
+                    self._journal.close()
+                    os.replace(self._journal_file, self._rotated_file)
+                    self._journal = open(self._journal_file, "a", encoding="utf-8")
+                    self._journal_offset = 0
+                    self._seen = self._header.bump(epoch=True)
+                snapshot = {
+                    "workspaces": dict(self._tables[WORKSPACE]),
+                    "webhooks": dict(self._tables[WEBHOOK]),
+                }
+                epoch = self._seen[1]
+            if rotate:
+                self._mark_synced(synced)
+
+            tmp_file = f"{self._snapshot_file}.{os.getpid()}.tmp"
+            with open(tmp_file, "w", encoding="utf-8") as f:
+                json.dump(snapshot, f, ensure_ascii=False, separators=(",", ":"))
+                f.flush()
+                os.fsync(f.fileno())
+
+            # 다른 프로세스가 스냅샷과 회전 저널을 읽는 도중 바뀌지 않도록 잠금 안에서 교체
+            with self._lock, self._flock.exclusive():
+                if self._header.read()[1] != epoch:
+                    # 그 사이 다른 프로세스가 더 최신 스냅샷을 만들고 저널을 다시 회전함
+                    os.remove(tmp_file)
+                    logger.info("저장소 압축 취소: 더 최신 스냅샷이 존재함")
+                    return
+                os.replace(tmp_file, self._snapshot_file)
+                fsync_dir(self._store_dir)
+                # 스냅샷이 회전 저널의 내용을 모두 포함하므로 제거
+                try:
+                    os.remove(self._rotated_file)
+                except FileNotFoundError:
+                    pass
+            logger.info(
+                "저장소 압축 완료 workspaces=%s webhooks=%s",
+                len(snapshot["workspaces"]), len(snapshot["webhooks"]),
+            )
+        except Exception as e:
+            logger.exception("저장소 압축 실패: %s", e)
+        finally:
+            with self._lock:
+                self._compacting = False
+
+    # ------------------------------------------------------------------ 종료
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        self._dirty.set()
+        self.sync()
+        with self._fsync_lock, self._lock:
+            if self._journal is not None:
+                self._journal.close()
+            self._header.close()
+            self._flock.close()
@@ -0,0 +1,283 @@
+#####################################################
+#                                                   #
+#          Notion 저장소 - SQLite(WAL) 백엔드          #
+#                                                   #
+#####################################################
+
+# 저장 구조
+#   - workspaces(workspace_id PK, incoming_secret_hash 색인, webhook_id 색인, data JSON)
+#   - webhooks(webhook_id PK, workspace_id 색인, data JSON)
+#   - WAL 모드로 읽기는 쓰기와 동시에 진행되고, 쓰기는 BEGIN IMMEDIATE 트랜잭션으로 직렬화됩니다.
+#   - 최초 실행 시 기존 notion_store.json(+저널)을 한 번만 옮깁니다(meta.json_migrated).
+#   - 커밋 후 공유 헤더(notion_store.db.gen)의 generation을 올려 다른 프로세스의 캐시가 변경을 감지하게 합니다.
+
+import json
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from tools.notion.store_backend import (
+    WORKSPACE,
+    WEBHOOK,
+    Change,
+    FileLock,
+    SharedGeneration,
+    StoreBackend,
+    secret_hash,
+)
+from logs.logging_util import LoggerSingleton
+import logging
+
+
+logger = LoggerSingleton.get_logger(logger_name="notion_store", level=logging.INFO)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS workspaces (
+    workspace_id TEXT PRIMARY KEY,
+    incoming_secret_hash TEXT,
+    webhook_id TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_workspaces_secret_hash ON workspaces(incoming_secret_hash);
+CREATE INDEX IF NOT EXISTS idx_workspaces_webhook_id ON workspaces(webhook_id);
+CREATE TABLE IF NOT EXISTS webhooks (
+    webhook_id TEXT PRIMARY KEY,
+    workspace_id TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_webhooks_workspace_id ON webhooks(workspace_id);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+# 테이블 종류 -> (테이블명, 키 컬럼)
+_TABLES = {
+    WORKSPACE: ("workspaces", "workspace_id"),
+    WEBHOOK: ("webhooks", "webhook_id"),
+}
+
+
+class SQLiteStore(StoreBackend):
+    """SQLite(WAL) 파일 하나에 레코드를 보관하는 백엔드. 커넥션은 작은 풀로 재사용합니다."""
+
+    blocking_reads = True
+
+    def __init__(
+        self,
+        db_file: str,
+        *,
+        pool_size: int = 4,
+        synchronous: str = "NORMAL",
+        legacy_snapshot: Optional[str] = None,
+        legacy_journal: Optional[str] = None,
+    ) -> None:
+        self._db_file = db_file
+        self._synchronous = synchronous
+        self._pool: "queue.Queue[sqlite3.Connection]" = queue.Queue()
+        self._connections: List[sqlite3.Connection] = []
+        self._seq_lock = threading.Lock()
+        self._seq = 0
+
+        os.makedirs(os.path.dirname(db_file) or ".", exist_ok=True)
+        self._flock = FileLock(db_file + ".lock")
+        self._header = SharedGeneration(db_file + ".gen")
+        for _ in range(max(1, pool_size)):
+            conn = self._connect()
+            self._connections.append(conn)
+            self._pool.put(conn)
+
+        with self._connection() as conn:
+            conn.executescript(_SCHEMA)
+
+        if legacy_snapshot:
+            migrate_json_store(self, legacy_snapshot, legacy_journal)
+
+    def _connect(self) -> sqlite3.Connection:
+        # isolation_level=None: 자동 커밋 모드, 쓰기 트랜잭션은 직접 BEGIN IMMEDIATE로 시작
+        conn = sqlite3.connect(self._db_file, timeout=30, isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(f"PRAGMA synchronous={self._synchronous}")
+        conn.execute("PRAGMA busy_timeout=30000")
+        return conn
+
+    @contextmanager
+    def _connection(self) -> Iterator[sqlite3.Connection]:
+        conn = self._pool.get()
+        try:
+            yield conn
+        finally:
+            self._pool.put(conn)
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        with self._connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+    # ------------------------------------------------------------------ 조회
+
+    @staticmethod
+    def _select_raw(conn: sqlite3.Connection, table: str, key: str) -> Optional[str]:
+        name, column = _TABLES[table]
+        row = conn.execute(f"SELECT data FROM {name} WHERE {column} = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    @classmethod
+    def _select(cls, conn: sqlite3.Connection, table: str, key: str) -> Optional[Dict[str, Any]]:
+        data = cls._select_raw(conn, table, key)
+        return json.loads(data) if data is not None else None
+
+    def generation(self) -> Tuple[int, int]:
+        return self._header.read()
+
+    def get(self, table: str, key: str) -> Optional[Dict[str, Any]]:
+        with self._connection() as conn:
+            return self._select(conn, table, key)
+
+    def get_sized(self, table: str, key: str) -> Tuple[Optional[Dict[str, Any]], Optional[int]]:
+        with self._connection() as conn:
+            data = self._select_raw(conn, table, key)
+        if data is None:
+            return None, 0
+        # 크기는 저장된 JSON 텍스트 길이(문자 수)
+        return json.loads(data), len(data)
+
+    def items(self, table: str, limit: Optional[int] = None) -> List[Tuple[str, Dict[str, Any]]]:
+        name, column = _TABLES[table]
+        with self._connection() as conn:
+            rows = conn.execute(
+                f"SELECT {column}, data FROM {name} LIMIT ?",
+                (-1 if limit is None else limit,),
+            ).fetchall()
+        return [(key, json.loads(data)) for key, data in rows]
+
+    def find_by_secret_hash(self, secret_hash: str) -> Optional[Tuple[str, str]]:
+        with self._connection() as conn:
+            row = conn.execute(
+                "SELECT workspace_id, data FROM workspaces WHERE incoming_secret_hash = ? LIMIT 1",
+                (secret_hash,),
+            ).fetchone()
+        if not row:
+            return None
+        return row[0], json.loads(row[1]).get("incoming_secret") or ""
+
+    # ------------------------------------------------------------------ 변경
+
+    @staticmethod
+    def _write(conn: sqlite3.Connection, changes: List[Change]) -> int:
+        """변경들을 기록하고 기록한 JSON 텍스트 길이의 합을 반환합니다."""
+        written = 0
+        for table, key, record in changes:
+            name, column = _TABLES[table]
+            if record is None:
+                conn.execute(f"DELETE FROM {name} WHERE {column} = ?", (key,))
+                continue
+
+            data = json.dumps(record, ensure_ascii=False, separators=(",", ":"))
+            written += len(data)
+            if table == WORKSPACE:
+                incoming = record.get("incoming_secret")
+                conn.execute(
+                    "INSERT INTO workspaces (workspace_id, incoming_secret_hash, webhook_id, data) "
+                    "VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT(workspace_id) DO UPDATE SET "
+                    "incoming_secret_hash = excluded.incoming_secret_hash, "
+                    "webhook_id = excluded.webhook_id, "
+                    "data = excluded.data",
+                    (key, secret_hash(incoming) if incoming else None, record.get("webhook_id"), data),
+                )
+            else:
+                conn.execute(
+                    "INSERT INTO webhooks (webhook_id, workspace_id, data) VALUES (?, ?, ?) "
+                    "ON CONFLICT(webhook_id) DO UPDATE SET "
+                    "workspace_id = excluded.workspace_id, "
+                    "data = excluded.data",
+                    (key, record.get("workspace_id") or "", data),
+                )
+        return written
+
+    def update(
+        self, table: str, key: str, mutate: Callable[[Optional[Dict[str, Any]]], List[Change]]
+    ) -> Tuple[int, int]:
+        with self._transaction() as conn:
+            written = self._write(conn, mutate(self._select(conn, table, key)))
+        return self._bump(), written
+
+    def _bump(self) -> int:
+        # 커밋 이후에 올려야 새 generation을 본 프로세스가 커밋된 내용을 읽음
+        with self._seq_lock, self._flock.exclusive():
+            self._header.bump()
+            self._seq += 1
+            return self._seq
+
+    def on_durable(self, seq: int, callback: Callable[[], None]) -> None:
+        # update는 커밋 후에 반환하므로 반환된 순번은 이미 영속화되어 있음
+        callback()
+
+    def sync(self) -> None:
+        with self._connection() as conn:
+            conn.execute("PRAGMA wal_checkpoint(PASSIVE)")
+
+    def close(self) -> None:
+        for conn in self._connections:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+        self._connections = []
+        self._header.close()
+        self._flock.close()
+
+    # ------------------------------------------------------------------ 마이그레이션
+
+    def is_migrated(self) -> bool:
+        with self._connection() as conn:
+            row = conn.execute("SELECT value FROM meta WHERE key = 'json_migrated'").fetchone()
+        return row is not None
+
+    def bulk_load(self, changes: List[Change], source: str) -> None:
+        """변경들을 한 트랜잭션으로 반영하고 마이그레이션 완료를 기록합니다."""
+        with self._transaction() as conn:
+            self._write(conn, changes)
+            conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('json_migrated', ?)",
+                (source,),
+            )
+        self._bump()
+
+
+def migrate_json_store(backend: SQLiteStore, snapshot_file: str, journal_file: Optional[str] = None) -> int:
+    """기존 JSON 스냅샷(+저널)의 내용을 SQLite로 한 번만 옮기고 옮긴 워크스페이스 수를 반환합니다."""
+    if backend.is_migrated():
+        return 0
+
+    sources = [p for p in (snapshot_file, journal_file) if p and os.path.exists(p)]
+    if not sources:
+        backend.bulk_load([], source="")
+        return 0
+
+    # 스냅샷과 저널을 읽기 전용으로 재생해 최종 상태를 얻음 (원본 파일은 건드리지 않음)
+    from tools.notion.store_journal import load_journal_state
+
+    legacy = load_journal_state(snapshot_file, journal_file or snapshot_file + ".journal")
+    workspaces = list(legacy[WORKSPACE].items())
+    webhooks = list(legacy[WEBHOOK].items())
+
+    changes: List[Change] = [(WORKSPACE, k, v) for k, v in workspaces]
+    changes += [(WEBHOOK, k, v) for k, v in webhooks]
+    backend.bulk_load(changes, source=snapshot_file)
+    logger.info(
+        "JSON 저장소 마이그레이션 완료 workspaces=%s webhooks=%s source=%s",
+        len(workspaces), len(webhooks), snapshot_file,
+    )
+    return len(workspaces)
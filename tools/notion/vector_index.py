@@ -0,0 +1,329 @@
+#####################################################
+#                                                   #
+#          워크스페이스별 임베딩 벡터 인덱스 (NumPy)         #
+#                                                   #
+#####################################################
+
+# 저장 구조 (워크스페이스마다 디렉터리 하나)
+#   - vectors.npy : float32 (capacity, dim) 행렬. L2 정규화해 저장하므로 내적 = 코사인 유사도
+#                   np.load(mmap_mode="r+") 로 열어 필요한 부분만 메모리에 올라옴
+#   - rows.json   : 행 번호 -> (page_id, 내용 해시) 스냅샷과 모델/차원
+#   - rows.log    : 스냅샷 이후 바뀐 행을 한 줄씩 추가. 일정 길이를 넘으면 스냅샷으로 압축
+#   - index.lock  : 프로세스 간 쓰기 잠금. 다른 프로세스가 쓴 내용은 조회 전에 로그를 이어 읽어 반영
+#
+# 검색용으로는 read_only 로 열어 디렉터리나 잠금 파일을 만들지 않습니다 (IndexStore.find).
+#
+# 벡터를 먼저 쓰고 flush 한 뒤 행 메타데이터를 기록하므로, 메타데이터가 가리키는 벡터는 항상 완성된 상태입니다.
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from tools.notion.store_backend import FileLock, fsync_dir
+from logs.logging_util import LoggerSingleton
+import logging
+
+
+logger = LoggerSingleton.get_logger(logger_name="notion_vector_index", level=logging.INFO)
+
+_INITIAL_CAPACITY = 256
+# 로그 줄 수가 이 값과 행 수 중 큰 쪽을 넘으면 스냅샷으로 압축
+_COMPACT_MIN_LINES = 1024
+
+# classify 결과: 같은 페이지에 같은 내용이 이미 있음
+UNCHANGED = "unchanged"
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+class VectorIndex:
+    """워크스페이스 하나의 메모리 매핑 임베딩 행렬과 행 메타데이터."""
+
+    def __init__(self, directory: str, *, read_only: bool = False) -> None:
+        if not read_only:
+            os.makedirs(directory, exist_ok=True)
+        self.read_only = read_only
+        self._dir = directory
+        self._vectors_file = os.path.join(directory, "vectors.npy")
+        self._snapshot_file = os.path.join(directory, "rows.json")
+        self._log_file = os.path.join(directory, "rows.log")
+        self._lock = threading.Lock()
+        # 읽기 전용이면 잠금 파일도 만들지 않음 (조회는 잠금 없이 스냅샷/로그를 읽음)
+        self._file_lock = None if read_only else FileLock(os.path.join(directory, "index.lock"))
+
+        self._snapshot_stamp: Optional[Tuple[int, int]] = None
+        self._log_offset = 0
+        self._log_lines = 0
+        self._vectors: Optional[np.ndarray] = None
+        self._vectors_ino: Optional[int] = None
+        self._reset()
+
+    def _reset(self) -> None:
+        self.dim: Optional[int] = None
+        self.model: Optional[str] = None
+        self._ids: List[Optional[str]] = []
+        self._hashes: List[Optional[str]] = []
+        self._by_id: Dict[str, int] = {}
+        self._by_hash: Dict[str, int] = {}
+        self._free: Set[int] = set()
+        self._mask: Optional[np.ndarray] = None
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    # ------------------------------------------------------------------ 메타데이터
+
+    def _apply(self, row: int, page_id: Optional[str], content_hash: Optional[str]) -> None:
+        while len(self._ids) <= row:
+            self._free.add(len(self._ids))
+            self._ids.append(None)
+            self._hashes.append(None)
+        old_id, old_hash = self._ids[row], self._hashes[row]
+        if old_id is not None and self._by_id.get(old_id) == row:
+            del self._by_id[old_id]
+        if old_hash is not None and self._by_hash.get(old_hash) == row:
+            del self._by_hash[old_hash]
+        self._ids[row], self._hashes[row] = page_id, content_hash
+        if page_id is None:
+            self._free.add(row)
+        else:
+            self._free.discard(row)
+            self._by_id[page_id] = row
+            self._by_hash[content_hash] = row
+        self._mask = None
+
+    def _sync(self) -> None:
+        """다른 프로세스가 기록한 스냅샷/로그를 반영합니다."""
+        try:
+            st = os.stat(self._snapshot_file)
+            stamp = (st.st_ino, st.st_mtime_ns)
+        except FileNotFoundError:
+            stamp = None
+        if stamp != self._snapshot_stamp:
+            self._reset()
+            if stamp is not None:
+                with open(self._snapshot_file, "r", encoding="utf-8") as f:
+                    snapshot = json.load(f)
+                self.dim, self.model = snapshot.get("dim"), snapshot.get("model")
+                for row, (page_id, content_hash) in enumerate(snapshot.get("rows", [])):
+                    self._apply(row, page_id, content_hash)
+            self._snapshot_stamp = stamp
+            self._log_offset = 0
+            self._log_lines = 0
+
+        try:
+            with open(self._log_file, "rb") as f:
+                f.seek(self._log_offset)
+                data = f.read()
+        except FileNotFoundError:
+            return
+        # 쓰는 중인 마지막 줄은 다음에 읽음
+        complete = data[: data.rfind(b"\n") + 1]
+        for line in complete.splitlines():
+            row, page_id, content_hash = json.loads(line)
+            self._apply(row, page_id, content_hash)
+            self._log_lines += 1
+        self._log_offset += len(complete)
+
+    def _append_log(self, rows: Sequence[Tuple[int, Optional[str], Optional[str]]]) -> None:
+        data = "".join(json.dumps(list(r), ensure_ascii=False) + "\n" for r in rows).encode("utf-8")
+        with open(self._log_file, "ab") as f:
+            f.write(data)
+        self._log_offset += len(data)
+        self._log_lines += len(rows)
+        if self._log_lines > max(_COMPACT_MIN_LINES, len(self._ids)):
+            self._write_snapshot()
+
+    def _write_snapshot(self) -> None:
+        tmp = self._snapshot_file + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"dim": self.dim, "model": self.model, "rows": list(zip(self._ids, self._hashes))}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self._snapshot_file)
+        fsync_dir(self._dir)
+        # 스냅샷이 로그 내용을 모두 담으므로 로그를 비움
+        open(self._log_file, "wb").close()
+        st = os.stat(self._snapshot_file)
+        self._snapshot_stamp = (st.st_ino, st.st_mtime_ns)
+        self._log_offset = 0
+        self._log_lines = 0
+
+    # ------------------------------------------------------------------ 벡터 파일
+
+    def _matrix(self) -> Optional[np.ndarray]:
+        try:
+            ino = os.stat(self._vectors_file).st_ino
+        except FileNotFoundError:
+            self._vectors = self._vectors_ino = None
+            return None
+        # 다른 프로세스가 파일을 키웠으면(교체) 다시 엶
+        if self._vectors is None or ino != self._vectors_ino:
+            self._vectors = np.load(self._vectors_file, mmap_mode="r" if self.read_only else "r+")
+            self._vectors_ino = ino
+        return self._vectors
+
+    def _ensure_capacity(self, rows: int) -> np.ndarray:
+        matrix = self._matrix()
+        if matrix is not None and matrix.shape[0] >= rows and matrix.shape[1] == self.dim:
+            return matrix
+        capacity = max(_INITIAL_CAPACITY, rows, 2 * (matrix.shape[0] if matrix is not None else 0))
+        tmp = self._vectors_file + ".tmp"
+        grown = np.lib.format.open_memmap(tmp, mode="w+", dtype=np.float32, shape=(capacity, self.dim))
+        if matrix is not None and matrix.shape[1] == self.dim:
+            used = min(len(self._ids), matrix.shape[0])
+            grown[:used] = matrix[:used]
+        grown.flush()
+        del grown
+        self._vectors = None
+        os.replace(tmp, self._vectors_file)
+        return self._matrix()
+
+    # ------------------------------------------------------------------ API
+
+    def classify(self, items: Sequence[Tuple[str, str]]) -> List[Any]:
+        """(page_id, 내용 해시)마다 UNCHANGED, 같은 해시의 기존 벡터(복사본), None(새로 임베딩 필요) 중 하나를 반환합니다."""
+        with self._lock:
+            self._sync()
+            matrix = self._matrix()
+            results: List[Any] = []
+            for page_id, content_hash in items:
+                row = self._by_id.get(page_id)
+                if row is not None and self._hashes[row] == content_hash:
+                    results.append(UNCHANGED)
+                    continue
+                row = self._by_hash.get(content_hash)
+                if row is not None and matrix is not None and row < matrix.shape[0]:
+                    results.append(np.array(matrix[row]))
+                else:
+                    results.append(None)
+            return results
+
+    def upsert(self, model: str, items: Sequence[Tuple[str, str, np.ndarray]]) -> None:
+        """(page_id, 내용 해시, 벡터) 목록을 기록합니다. 모델이나 차원이 바뀌면 인덱스를 비우고 새로 만듭니다."""
+        if not items:
+            return
+        if self.read_only:
+            raise PermissionError(f"vector index opened read-only: {self._dir}")
+        vectors = normalize(np.stack([v for _, _, v in items]))
+        with self._lock, self._file_lock.exclusive():
+            self._sync()
+            if self.dim is not None and (self.dim != vectors.shape[1] or self.model != model):
+                logger.warning(
+                    "임베딩 모델/차원 변경으로 인덱스 초기화 dir=%s %s/%s -> %s/%s",
+                    self._dir, self.model, self.dim, model, vectors.shape[1],
+                )
+                self._reset()
+            if self.dim is None:
+                self.dim, self.model = int(vectors.shape[1]), model
+                self._write_snapshot()
+
+            rows: List[Tuple[int, Optional[str], Optional[str]]] = []
+            for (page_id, content_hash, _), vector in zip(items, vectors):
+                row = self._by_id.get(page_id)
+                if row is None:
+                    row = min(self._free) if self._free else len(self._ids)
+                matrix = self._ensure_capacity(row + 1)
+                matrix[row] = vector
+                self._apply(row, page_id, content_hash)
+                rows.append((row, page_id, content_hash))
+            self._matrix().flush()
+            self._append_log(rows)
+
+    def delete(self, page_id: str) -> bool:
+        if self.read_only:
+            raise PermissionError(f"vector index opened read-only: {self._dir}")
+        with self._lock, self._file_lock.exclusive():
+            self._sync()
+            row = self._by_id.get(page_id)
+            if row is None:
+                return False
+            self._apply(row, None, None)
+            self._append_log([(row, None, None)])
+            return True
+
+    def search(self, query: np.ndarray, k: int) -> List[Tuple[str, float]]:
+        """코사인 유사도 상위 k개의 (page_id, 점수)를 높은 순으로 반환합니다."""
+        with self._lock:
+            self._sync()
+            matrix = self._matrix()
+            used = len(self._ids)
+            live = len(self._by_id)
+            if matrix is None or live == 0 or k <= 0:
+                return []
+            if query.shape[-1] != matrix.shape[1]:
+                raise ValueError(f"query dimension {query.shape[-1]} != index dimension {matrix.shape[1]}")
+            if self._mask is None:
+                self._mask = np.fromiter((page_id is not None for page_id in self._ids), dtype=bool, count=used)
+            scores = matrix[:used] @ normalize(query)
+            scores[~self._mask] = -np.inf
+            k = min(k, live)
+            top = np.argpartition(scores, used - k)[used - k:]
+            top = top[np.argsort(scores[top])[::-1]]
+            return [(self._ids[i], float(scores[i])) for i in top]
+
+    def close(self) -> None:
+        with self._lock:
+            self._vectors = None
+            if self._file_lock is not None:
+                self._file_lock.close()
+
+    def __del__(self) -> None:
+        if getattr(self, "_file_lock", None) is not None:
+            self._file_lock.close()
+
+
+class IndexStore:
+    """워크스페이스 id -> VectorIndex. 최근에 쓴 인덱스만 열어 둡니다."""
+
+    def __init__(self, base_dir: str, *, max_open: int = 64) -> None:
+        self._base_dir = base_dir
+        self._max_open = max(1, max_open)
+        self._indexes: "OrderedDict[str, VectorIndex]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _path(self, workspace_id: str) -> str:
+        # 워크스페이스 id 를 그대로 경로에 쓰지 않음
+        return os.path.join(self._base_dir, hashlib.sha256(workspace_id.encode("utf-8")).hexdigest()[:32])
+
+    def _open(self, workspace_id: str, read_only: bool) -> VectorIndex:
+        index = self._indexes[workspace_id] = VectorIndex(self._path(workspace_id), read_only=read_only)
+        # 밀려난 인덱스는 진행 중인 작업이 끝나 참조가 사라질 때 닫힘 (__del__)
+        while len(self._indexes) > self._max_open:
+            self._indexes.popitem(last=False)
+        return index
+
+    def get(self, workspace_id: str) -> VectorIndex:
+        """쓰기용 인덱스. 없으면 디렉터리를 만듭니다."""
+        with self._lock:
+            index = self._indexes.get(workspace_id)
+            if index is None or index.read_only:
+                return self._open(workspace_id, read_only=False)
+            self._indexes.move_to_end(workspace_id)
+            return index
+
+    def find(self, workspace_id: str) -> Optional[VectorIndex]:
+        """조회용 인덱스. 디스크에 인덱스가 없으면 아무것도 만들지 않고 None 을 반환합니다."""
+        with self._lock:
+            index = self._indexes.get(workspace_id)
+            if index is not None:
+                self._indexes.move_to_end(workspace_id)
+                return index
+            if not os.path.exists(os.path.join(self._path(workspace_id), "rows.json")):
+                return None
+            return self._open(workspace_id, read_only=True)
+
+    def close(self) -> None:
+        with self._lock:
+            for index in self._indexes.values():
+                index.close()
+            self._indexes.clear()
@@ -4,27 +4,91 @@
 #                                                   #
 #####################################################
 
+import asyncio
 import hmac
 import hashlib
-import json
-from typing import Optional, Tuple
+import os
+import tempfile
+import time
+from collections import OrderedDict
+from typing import BinaryIO, List, Optional, Set, Tuple
 
 from fastapi import APIRouter, Request, HTTPException
 from fastapi.responses import JSONResponse
 
-from tools.notion.store import (
-    list_webhook_secrets,
-    get_workspace_id_by_webhook_id,
-    get_workspace_id_by_incoming_secret,
+from tools.notion.store import async_store
+from tools.notion.event_queue import EventQueue, EventWorkerPool, QueueFull
+from tools.notion.dedup import DeliveryDedup, delivery_key
+from tools.notion.payload_stream import PayloadStreamParser
+from tools.notion.handlers import page_key, registry as handler_registry
+from tools.notion.page_cache import page_cache, parse_time
+from config.tracing import start_span
+from config.metrics import (
+    NO_TIER,
+    NOTION_EVENT_QUEUE_REJECTED,
+    NOTION_SIGNATURE_FALLBACK_REJECTS,
+    NOTION_SIGNATURE_FALLBACK_SCANS,
+    NOTION_WEBHOOK_EVENTS_PER_DELIVERY,
+    NOTION_WEBHOOK_HMAC_SECONDS,
+    NOTION_WEBHOOK_SECRETS_TRIED,
 )
 from logs.logging_util import LoggerSingleton
 import logging
 
 
 logger = LoggerSingleton.get_logger(logger_name="notion_webhook", level=logging.INFO)
+# 이벤트 항목마다 찍는 로그는 큰 배치에서 출력량이 폭증하므로 초당 개수/표본 비율로 제한
+item_logger = LoggerSingleton.get_sampled_logger(
+    "notion_webhook.items",
+    level=logging.INFO,
+    rate=float(os.getenv("NOTION_WEBHOOK_ITEM_LOG_RATE", "20")),
+    burst=float(os.getenv("NOTION_WEBHOOK_ITEM_LOG_BURST", "100")),
+    sample=float(os.getenv("NOTION_WEBHOOK_ITEM_LOG_SAMPLE", "1.0")),
+)
+
+# 식별자 없는 서명 거절은 인증 전 요청이 얼마든지 만들 수 있으므로 초당 개수를 제한
+signature_logger = LoggerSingleton.get_sampled_logger(
+    "notion_webhook.signature", level=logging.INFO, rate=1.0, burst=10.0, sample=1.0
+)
 
 router = APIRouter(prefix="/notion", tags=["notion-webhook"])
 
+# 웹훅 식별자가 없을 때 먼저 확인할 최근 일치 웹훅 수
+_FALLBACK_RECENT = int(os.getenv("NOTION_WEBHOOK_FALLBACK_RECENT", "16"))
+# 식별자 없는 전달 하나에 대해 HMAC 을 계산할 시크릿 최대 개수(최근 일치 포함). 넘으면 401
+_FALLBACK_SCAN_LIMIT = int(os.getenv("NOTION_WEBHOOK_FALLBACK_SCAN_LIMIT", "64"))
+_RECENT_FALLBACK: "OrderedDict[str, None]" = OrderedDict()
+# 시크릿별로 키가 적용된 HMAC 객체 캐시 크기
+_HMAC_CACHE_SIZE = int(os.getenv("NOTION_WEBHOOK_HMAC_CACHE_SIZE", "1024"))
+_HMAC_CACHE: "OrderedDict[str, hmac.HMAC]" = OrderedDict()
+
+# 본문 최대 크기와, 본문/이벤트 임시 보관 시 메모리에 둘 최대 크기(넘으면 디스크로 넘김)
+_MAX_BODY_BYTES = int(os.getenv("NOTION_WEBHOOK_MAX_BODY_BYTES", str(10 * 1024 * 1024)))
+_SPOOL_MEMORY_BYTES = int(os.getenv("NOTION_WEBHOOK_SPOOL_MEMORY_BYTES", str(1024 * 1024)))
+_READ_CHUNK = 64 * 1024
+
+# 이벤트 큐: 검증된 요청은 큐에 넣고 바로 응답하며, event_workers 가 비동기로 처리
+event_queue = EventQueue(
+    os.path.join(os.getcwd(), "data", "notion_events.db"),
+    max_depth=int(os.getenv("NOTION_EVENT_QUEUE_MAX_DEPTH", "10000")),
+    max_attempts=int(os.getenv("NOTION_EVENT_MAX_ATTEMPTS", "5")),
+    # 같은 페이지의 이벤트는 워커가 여럿이어도 들어온 순서대로 처리
+    ordering_key=page_key,
+)
+# 큐가 가득 찼을 때 Retry-After 로 안내할 시간(초)
+_QUEUE_FULL_RETRY_AFTER = os.getenv("NOTION_EVENT_QUEUE_RETRY_AFTER", "30")
+
+# 재전송 중복 판정 캐시 (NOTION_DEDUP_PERSIST=1 이면 재시작 후에도 유지)
+delivery_dedup = DeliveryDedup(
+    capacity=int(os.getenv("NOTION_DEDUP_CAPACITY", "100000")),
+    ttl=float(os.getenv("NOTION_DEDUP_TTL", "3600")),
+    db_file=(
+        os.path.join(os.getcwd(), "data", "notion_dedup.db")
+        if os.getenv("NOTION_DEDUP_PERSIST", "0") == "1"
+        else None
+    ),
+)
+
 
 def _get_signature_from_headers(request: Request) -> Optional[str]:
     candidates = [
@@ -43,6 +107,27 @@ def _get_signature_from_headers(request: Request) -> Optional[str]:
     return None
 
 
+def _get_webhook_id_from_headers(request: Request) -> Optional[str]:
+    for key in ("X-Notion-Webhook-Id", "X-Notion-Subscription-Id"):
+        value = request.headers.get(key)
+        if value:
+            return value
+    return None
+
+
+def _get_webhook_id(request: Request, payload: dict) -> Optional[str]:
+    """헤더 또는 페이로드에서 웹훅/구독 식별자를 찾습니다."""
+    webhook_id = _get_webhook_id_from_headers(request)
+    if webhook_id:
+        return webhook_id
+    if isinstance(payload, dict):
+        for key in ("webhook_id", "webhookId", "subscription_id", "subscriptionId"):
+            value = payload.get(key)
+            if isinstance(value, str) and value:
+                return value
+    return None
+
+
 def _constant_time_equals(a: str, b: str) -> bool:
     try:
         return hmac.compare_digest(a.encode("utf-8"), b.encode("utf-8"))
@@ -50,79 +135,273 @@ def _constant_time_equals(a: str, b: str) -> bool:
         return False
 
 
-def _formats(body: bytes, secret: str) -> Tuple[str, str]:
-    digest = hmac.new(secret.encode("utf-8"), body, hashlib.sha256).hexdigest()
-    return digest, f"sha256={digest}"
+def _keyed_hmac(secret: str) -> "hmac.HMAC":
+    """시크릿 키가 적용된 HMAC 객체를 캐시에서 복제해 반환합니다."""
+    base = _HMAC_CACHE.get(secret)
+    if base is None:
+        base = hmac.new(secret.encode("utf-8"), digestmod=hashlib.sha256)
+        _HMAC_CACHE[secret] = base
+        if len(_HMAC_CACHE) > _HMAC_CACHE_SIZE:
+            _HMAC_CACHE.popitem(last=False)
+    else:
+        _HMAC_CACHE.move_to_end(secret)
+    return base.copy()
+
+
+def _hmac_hexdigest(body: BinaryIO, secret: str) -> str:
+    """임시 보관된 본문을 조각 단위로 읽어 HMAC-SHA256 digest를 계산합니다."""
+    mac = _keyed_hmac(secret)
+    body.seek(0)
+    for chunk in iter(lambda: body.read(_READ_CHUNK), b""):
+        mac.update(chunk)
+    return mac.hexdigest()
+
+
+def _digest_matches(signature_header: str, digest: str) -> bool:
+    return _constant_time_equals(signature_header, digest) or _constant_time_equals(signature_header, f"sha256={digest}")
+
+
+def _scan_secrets_sync(body: BinaryIO, signature_header: str, secrets: List[Tuple[str, str]]) -> Tuple[Optional[str], int]:
+    # 스레드에서 실행되므로 이벤트 루프가 쓰는 _HMAC_CACHE 는 건드리지 않음
+    tried = 0
+    for candidate_id, secret in secrets:
+        tried += 1
+        mac = hmac.new(secret.encode("utf-8"), digestmod=hashlib.sha256)
+        body.seek(0)
+        for chunk in iter(lambda: body.read(_READ_CHUNK), b""):
+            mac.update(chunk)
+        if _digest_matches(signature_header, mac.hexdigest()):
+            return candidate_id, tried
+    return None, tried
+
+
+def _remember_fallback_match(webhook_id: str) -> None:
+    _RECENT_FALLBACK[webhook_id] = None
+    _RECENT_FALLBACK.move_to_end(webhook_id)
+    while len(_RECENT_FALLBACK) > _FALLBACK_RECENT:
+        _RECENT_FALLBACK.popitem(last=False)
+
+
+async def _match_signature(
+    body: BinaryIO,
+    signature_header: str,
+    webhook_id: Optional[str] = None,
+    precomputed_digest: Optional[str] = None,
+) -> Optional[str]:
+    """시그니처와 일치하는 webhook_id를 반환합니다.
+
+    식별자가 있으면 해당 시크릿 하나만 검증하고, 없으면 최근 일치한 웹훅부터 확인한 뒤
+    나머지를 순회하되 전체 시도 수는 _FALLBACK_SCAN_LIMIT 로 제한합니다.
+    precomputed_digest 는 본문 수신 중 webhook_id 의 시크릿으로 미리 계산해 둔 digest 입니다.
+    """
+    with start_span("webhook.verify_signature", root=False, webhook_id=webhook_id) as span:
+        started = time.perf_counter()
+        matched, tried = await _find_signature_match(body, signature_header, webhook_id, precomputed_digest)
+        elapsed = time.perf_counter() - started
+        span.set(matched=matched is not None, secrets_tried=tried)
+
+    tier = await async_store.get_webhook_tier(matched) if matched else NO_TIER
+    NOTION_WEBHOOK_HMAC_SECONDS.labels(tier=tier).observe(elapsed)
+    NOTION_WEBHOOK_SECRETS_TRIED.labels(tier=tier).observe(tried)
+    return matched
+
+
+async def _find_signature_match(
+    body: BinaryIO,
+    signature_header: str,
+    webhook_id: Optional[str],
+    precomputed_digest: Optional[str],
+) -> Tuple[Optional[str], int]:
+    """(일치한 webhook_id, 검증에 사용한 시크릿 수)를 반환합니다."""
+    if webhook_id:
+        digest = precomputed_digest
+        if digest is None:
+            secret = await async_store.get_secret_by_webhook_id(webhook_id)
+            if not secret:
+                return None, 0
+            digest = _hmac_hexdigest(body, secret)
+        return (webhook_id if _digest_matches(signature_header, digest) else None), 1
+
+    NOTION_SIGNATURE_FALLBACK_SCANS.inc()
+    tried = 0
+    seen: Set[str] = set()
+    # 같은 발신처는 보통 반복해서 식별자 없이 보내므로 최근 일치한 웹훅부터 (캐시된 HMAC 키 사용)
+    for candidate_id in list(reversed(_RECENT_FALLBACK))[:_FALLBACK_SCAN_LIMIT]:
+        seen.add(candidate_id)
+        secret = await async_store.get_secret_by_webhook_id(candidate_id)
+        if not secret:
+            continue
+        tried += 1
+        if _digest_matches(signature_header, _hmac_hexdigest(body, secret)):
+            _remember_fallback_match(candidate_id)
+            return candidate_id, tried
+
+    # 마지막 수단으로 나머지를 순회. 인증 전 요청이 시크릿 수 x 본문 크기만큼 HMAC 을 시키지 못하도록 한도를 두고,
+    # 한도 안에서도 본문 HMAC 을 여러 번 계산하므로 이벤트 루프 밖에서
+    budget = max(0, _FALLBACK_SCAN_LIMIT - tried)
+    # 한도를 넘는 시크릿이 있는지 알기 위해 하나 더 가져옴
+    listed = await async_store.list_webhook_secrets(limit=budget + len(seen) + 1)
+    rest = [(wid, secret) for wid, secret in listed if wid not in seen]
+    truncated = len(rest) > budget
+    matched, scanned = await asyncio.to_thread(_scan_secrets_sync, body, signature_header, rest[:budget])
+    tried += scanned
+    if matched:
+        _remember_fallback_match(matched)
+    elif truncated:
+        NOTION_SIGNATURE_FALLBACK_REJECTS.labels(reason="scan_limit").inc()
+        signature_logger.warning(
+            "식별자 없는 웹훅 서명 검증이 순회 한도에서 멈춤 tried=%d limit=%d", tried, _FALLBACK_SCAN_LIMIT
+        )
+    else:
+        NOTION_SIGNATURE_FALLBACK_REJECTS.labels(reason="no_match").inc()
+        signature_logger.warning("식별자 없는 웹훅 서명과 일치하는 시크릿 없음 tried=%d", tried)
+    return matched, tried
 
 
-def _match_signature(body: bytes, signature_header: str) -> Optional[str]:
-    """저장된 모든 시크릿에 대해 시그니처를 비교하여 일치하는 webhook_id를 반환합니다."""
-    for webhook_id, secret in list_webhook_secrets():
-        raw, prefixed = _formats(body, secret)
-        if _constant_time_equals(signature_header, raw) or _constant_time_equals(signature_header, prefixed):
-            return webhook_id
-    return None
+class _PayloadTooLarge(Exception):
+    pass
 
 
 @router.post("/webhook")
 async def notion_webhook(request: Request):
-    # challenge 핸드셰이크 지원
-    raw_body = await request.body()
-    try:
-        payload = json.loads(raw_body.decode("utf-8")) if raw_body else {}
-    except Exception:
-        payload = {}
-
-    # Notion/일반 웹훅에서 종종 challenge 필드 사용
-    if isinstance(payload, dict) and payload.get("challenge"):
-        return JSONResponse({"challenge": payload.get("challenge")})
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > _MAX_BODY_BYTES:
+        raise HTTPException(status_code=413, detail="payload too large")
 
     signature = _get_signature_from_headers(request)
-
-    workspace_id = None
-
-    # 1) 공식 웹훅 서명(HMAC) 검증 경로
-    matched_webhook_id = None
-    if signature and signature.lower().startswith("sha256="):
-        matched_webhook_id = _match_signature(raw_body, signature)
-        if not matched_webhook_id:
-            logger.warning("시그니처 불일치")
-            raise HTTPException(status_code=401, detail="invalid signature")
-        workspace_id = get_workspace_id_by_webhook_id(matched_webhook_id)
-
-    # 2) 자동화 비밀 헤더 경로
-    if not workspace_id:
-        automation_secret = request.headers.get("X-Notion-Automation-Secret") or request.headers.get("x-notion-automation-secret")
-        if automation_secret:
-            workspace_id = get_workspace_id_by_incoming_secret(automation_secret)
-            if not workspace_id:
-                logger.warning("자동화 시크릿 불일치")
-                raise HTTPException(status_code=401, detail="invalid automation secret")
-
-    if not workspace_id:
-        # 페이로드에 workspace_id가 있으면 보강
-        workspace_id = (
-            (payload or {}).get("workspace_id")
-            or (payload or {}).get("workspaceId")
-        )
-
-    if not workspace_id:
-        logger.warning("워크스페이스 식별 실패 webhook_id=%s", matched_webhook_id)
-        raise HTTPException(status_code=400, detail="workspace not found")
-
-    # 이벤트 처리
+    has_hmac_signature = bool(signature and signature.lower().startswith("sha256="))
+
+    # 헤더로 웹훅이 식별되면 본문이 도착하는 대로 HMAC을 갱신
+    streaming_mac = None
+    header_webhook_id = _get_webhook_id_from_headers(request)
+    if has_hmac_signature and header_webhook_id:
+        secret = await async_store.get_secret_by_webhook_id(header_webhook_id)
+        if secret:
+            streaming_mac = _keyed_hmac(secret)
+
+    # 본문과 events 원소는 일정 크기까지만 메모리에 두고 넘치면 디스크에 보관
+    body = tempfile.SpooledTemporaryFile(max_size=_SPOOL_MEMORY_BYTES)
+    events = tempfile.SpooledTemporaryFile(max_size=_SPOOL_MEMORY_BYTES, mode="w+", encoding="utf-8")
     try:
-        await _handle_events(workspace_id=workspace_id, payload=payload)
-    except Exception as e:
-        logger.exception("이벤트 처리 오류: %s", e)
-        # 2xx가 아니면 재시도 정책을 유발할 수 있음. 처리 실패는 200으로 흡수하고 내부 알림으로 대체 가능
-    return JSONResponse({"ok": True})
+        # JSON 문자열 안에는 줄바꿈이 이스케이프되어 있으므로 바깥 공백의 줄바꿈만 치환하면 한 줄이 됨
+        parser = PayloadStreamParser(
+            lambda raw: events.write(raw.replace("\r", " ").replace("\n", " ") + "\n")
+        )
+        body_sha256 = hashlib.sha256()
+        try:
+            await _receive_body(request, body, body_sha256, streaming_mac, parser)
+        except _PayloadTooLarge:
+            raise HTTPException(status_code=413, detail="payload too large")
+
+        # 파싱 실패 시 빈 페이로드로 취급
+        payload = parser.fields if parser.error is None else {}
+        event_count = parser.event_count if parser.error is None else 0
+        # events 배열이 있으면 원소만 처리 (빈 배열이면 처리할 항목 없음). 없으면 본문 자체가 항목 하나
+        has_events = parser.error is None and parser.has_events
+        if parser.error is not None and body.tell():
+            logger.warning("웹훅 본문 파싱 실패: %s", parser.error)
+        elif parser.skipped_events:
+            logger.warning("객체가 아닌 events 원소 %d개를 건너뜀", parser.skipped_events)
+
+        # Notion/일반 웹훅에서 종종 challenge 필드 사용
+        if payload.get("challenge"):
+            return JSONResponse({"challenge": payload.get("challenge")})
+
+        workspace_id = None
+
+        # 1) 공식 웹훅 서명(HMAC) 검증 경로
+        matched_webhook_id = None
+        if has_hmac_signature:
+            matched_webhook_id = await _match_signature(
+                body,
+                signature,
+                _get_webhook_id(request, payload),
+                streaming_mac.hexdigest() if streaming_mac else None,
+            )
+            if not matched_webhook_id:
+                logger.warning("시그니처 불일치")
+                raise HTTPException(status_code=401, detail="invalid signature")
+            workspace_id = await async_store.get_workspace_id_by_webhook_id(matched_webhook_id)
+
+        # 2) 자동화 비밀 헤더 경로
+        if not workspace_id:
+            automation_secret = request.headers.get("X-Notion-Automation-Secret") or request.headers.get("x-notion-automation-secret")
+            if automation_secret:
+                workspace_id = await async_store.get_workspace_id_by_incoming_secret(automation_secret)
+                if not workspace_id:
+                    logger.warning("자동화 시크릿 불일치")
+                    raise HTTPException(status_code=401, detail="invalid automation secret")
+
+        if not workspace_id:
+            # 페이로드에 workspace_id가 있으면 보강
+            workspace_id = payload.get("workspace_id") or payload.get("workspaceId")
+
+        if not workspace_id:
+            logger.warning("워크스페이스 식별 실패 webhook_id=%s", matched_webhook_id)
+            raise HTTPException(status_code=400, detail="workspace not found")
+
+        # 등급은 전달마다 한 번만 조회해 큐 항목에 함께 저장 (워커의 처리 시간 메트릭 라벨)
+        tier = await async_store.get_workspace_tier(workspace_id)
+
+        # 재전송된 전달은 핸들러 실행 없이 바로 200 응답. 원본이 처리 중이면 적재 결과를 기다림
+        # 예약 뒤에는 적재 성공(confirm)이나 해제(release) 전까지 다른 await 를 두지 않음
+        dedup_key = delivery_key(workspace_id, payload, body_sha256.hexdigest())
+        if await delivery_dedup.check_and_reserve(dedup_key):
+            logger.info("중복 전달 무시 key=%s", dedup_key)
+            return JSONResponse({"ok": True, "duplicate": True})
+
+        # 이벤트는 큐에 넣고 바로 응답. 배치는 원소 하나씩 큐 항목이 되며, 처리 실패는 워커가 백오프로 재시도
+        try:
+            if event_count:
+                events.seek(0)
+                await event_queue.enqueue_raw(
+                    workspace_id, (line.rstrip("\n") for line in events), event_count, tier=tier
+                )
+            elif not has_events:
+                await event_queue.enqueue(workspace_id, [payload], tier=tier)
+        except QueueFull:
+            delivery_dedup.release(dedup_key)
+            NOTION_EVENT_QUEUE_REJECTED.inc()
+            logger.warning("이벤트 큐 포화 depth=%s workspace=%s", event_queue.depth(), workspace_id)
+            return JSONResponse(
+                {"ok": False, "detail": "event queue full"},
+                status_code=503,
+                headers={"Retry-After": _QUEUE_FULL_RETRY_AFTER},
+            )
+        except BaseException:
+            # 연결이 끊겨 취소된 경우도 해제해 재전송(또는 기다리던 중복)이 처리하게 함
+            delivery_dedup.release(dedup_key)
+            raise
+        await delivery_dedup.confirm(dedup_key)
+        NOTION_WEBHOOK_EVENTS_PER_DELIVERY.labels(tier=tier).observe(event_count if has_events else 1)
+        return JSONResponse({"ok": True})
+    finally:
+        body.close()
+        events.close()
+
+
+async def _receive_body(request: Request, body: BinaryIO, body_sha256, streaming_mac, parser: PayloadStreamParser) -> None:
+    """본문을 조각 단위로 받으며 보관, 해시/HMAC 갱신, 파싱을 동시에 진행합니다."""
+    size = 0
+    async for chunk in request.stream():
+        if not chunk:
+            continue
+        size += len(chunk)
+        if size > _MAX_BODY_BYTES:
+            raise _PayloadTooLarge()
+        body.write(chunk)
+        body_sha256.update(chunk)
+        if streaming_mac is not None:
+            streaming_mac.update(chunk)
+        parser.feed(chunk)
+    parser.close()
 
 
 async def _handle_events(*, workspace_id: str, payload: dict) -> None:
-    """이벤트 유형별 처리. 필요에 맞게 확장."""
-    event_type = payload.get("type") or payload.get("event") or "unknown"
-    logger.info("workspace=%s event=%s", workspace_id, event_type)
+    """이벤트 유형별 처리. 항목별 동작은 handler_registry 에 등록한 핸들러로 확장."""
+    # 큐 항목마다(이벤트마다) 실행되므로 DEBUG. 항목 로그는 표본 추출되는 _log_item 이 남김
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("workspace=%s event=%s", workspace_id, payload.get("type") or payload.get("event") or "unknown")
 
     # 단일/배치 모두 지원
     items = []
@@ -132,16 +411,52 @@ async def _handle_events(*, workspace_id: str, payload: dict) -> None:
         else:
             items = [payload]
 
-    for item in items:
-        _log_item(workspace_id, item)
+    # 항목별 처리는 유형별로 등록된 핸들러가 담당 (tools/notion/handlers.py)
+    await handler_registry.dispatch(workspace_id, items)
+
+
+async def _log_item(workspace_id: str, item: dict) -> None:
+    # 출력하지 않을 항목은 page_id/키 목록도 만들지 않음
+    if not item_logger.should_log():
+        return
+    item_logger.info("[NOTION] ws=%s page=%s item_keys=%s", workspace_id, page_key(item), list(item.keys()))
+
 
+# 모든 유형의 항목을 로그로 남김. 유형별 자동화는 handler_registry.handler("page.created") 등으로 추가
+handler_registry.register("*", _log_item, name="log")
 
-def _log_item(workspace_id: str, item: dict) -> None:
-    page_id = (
-        item.get("page_id")
-        or item.get("pageId")
-        or item.get("data", {}).get("id")
-    )
-    logger.info("[NOTION] ws=%s page=%s item_keys=%s", workspace_id, page_id, list(item.keys()))
 
+# 페이지 변경 이벤트로 페이지 캐시를 갱신 (debounce 후 한 번에 다시 받음)
+@handler_registry.handler(
+    "page.created", "page.content_updated", "page.properties_updated", "page.moved", "page.undeleted",
+    name="page_cache",
+)
+async def _refresh_page_cache(workspace_id: str, item: dict) -> None:
+    page_id = page_key(item)
+    if page_id:
+        page_cache.notify(workspace_id, page_id, parse_time(item.get("timestamp")))
+
+
+@handler_registry.handler("page.deleted", name="page_cache_evict")
+async def _evict_page_cache(workspace_id: str, item: dict) -> None:
+    page_id = page_key(item)
+    if page_id:
+        page_cache.forget(workspace_id, page_id)
+
+
+async def _process_queued(workspace_id: str, payload: dict) -> None:
+    if not isinstance(payload, dict):
+        # 이전 버전이 넣은 객체가 아닌 항목은 재시도해도 실패하므로 버림
+        logger.warning("객체가 아닌 큐 항목을 건너뜀 workspace=%s type=%s", workspace_id, type(payload).__name__)
+        return
+    # 큐에서 꺼낸 이벤트 처리는 요청과 분리된 별도 트레이스. 처리 시간 메트릭은 워커 풀이 기록
+    with start_span("notion.handle_events", workspace_id=workspace_id, type=payload.get("type")):
+        await _handle_events(workspace_id=workspace_id, payload=payload)
 
+
+# 이벤트 처리 동시성은 워커 수로 조절 (워커 하나가 큐 항목 = 이벤트 하나를 처리)
+event_workers = EventWorkerPool(
+    event_queue,
+    _process_queued,
+    concurrency=int(os.getenv("NOTION_EVENT_WORKERS", "4")),
+)